@@ -7,17 +7,22 @@ Notifier 主脚本 - 发送代码提交通知
     python notify.py --test       # 测试模式，不实际发送
     python notify.py --email-only # 只发邮件
     python notify.py --tg-only    # 只发 Telegram
+
+各渠道并发发送，每个渠道有独立的超时（.notify-config.json 中 email.timeout /
+telegram.timeout，单位秒），总耗时取决于最慢的渠道而不是各渠道之和。
 """
 
 import json
 import subprocess
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
 # 导入发送模块
-from send_email import send_email, format_email_body, format_email_html
-from send_telegram import send_telegram, format_telegram_message
+from send_email import send_email, format_email_body, format_email_html, DEFAULT_TIMEOUT as EMAIL_TIMEOUT
+from send_telegram import send_telegram, format_telegram_message, DEFAULT_TIMEOUT as TG_TIMEOUT
 
 
 def load_project_config() -> dict:
@@ -46,8 +51,85 @@ def load_secrets() -> dict:
         return json.load(f)
 
 
+# 一次 git 调用取得提交时间、提交信息和变更文件：
+# 根提交与空树比较；合并提交只与第一个父提交比较（-m --first-parent），即合并进来的改动
+GIT_LOG_CMD = ['git', 'log', '-1', '-m', '--first-parent', '--name-status', '-z',
+               '--format=%ci%x00%s%x00']
+REMOTE_CACHE_NAME = 'notifier-remote.json'
+
+
+def find_git_dir(start: Path):
+    """向上查找 .git 目录，返回 (git 目录, 公共目录)；工作树和子模块的 .git 文件同样处理"""
+    for directory in (start, *start.parents):
+        dot_git = directory / '.git'
+        if dot_git.is_dir():
+            git_dir = dot_git
+        elif dot_git.is_file():
+            content = dot_git.read_text(encoding='utf-8').strip()
+            if not content.startswith('gitdir:'):
+                return None
+            git_dir = (directory / content[len('gitdir:'):].strip()).resolve()
+        else:
+            continue
+        common = git_dir
+        commondir = git_dir / 'commondir'
+        if commondir.is_file():
+            common = (git_dir / commondir.read_text(encoding='utf-8').strip()).resolve()
+        return git_dir, common
+    return None
+
+
+def get_remote_url(cwd: Path) -> str:
+    """
+    获取 origin 的 URL，按仓库缓存
+
+    缓存保存在仓库公共目录的 notifier-remote.json 中，以 .git/config 的修改时间为键，
+    配置未变时不启动 git 进程。
+    """
+    found = find_git_dir(cwd)
+    cache_path = stamp = None
+    if found:
+        config = found[1] / 'config'
+        cache_path = found[1] / REMOTE_CACHE_NAME
+        try:
+            stat = config.stat()
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            cache = json.loads(cache_path.read_text(encoding='utf-8'))
+            if cache.get('stamp') == stamp:
+                return cache.get('url', '')
+        except (OSError, ValueError):
+            pass
+
+    result = subprocess.run(
+        ['git', 'remote', 'get-url', 'origin'],
+        capture_output=True, text=True, cwd=cwd
+    )
+    url = result.stdout.strip() if result.returncode == 0 else ''
+
+    if cache_path and stamp:
+        try:
+            cache_path.write_text(json.dumps({'stamp': stamp, 'url': url}), encoding='utf-8')
+        except OSError:
+            pass
+    return url
+
+
+def iter_log_tokens(proc):
+    """流式读取 -z 输出，逐个返回以 NUL 分隔的字段，变更文件很多时也不必一次读入全部输出"""
+    pending = b''
+    while True:
+        chunk = proc.stdout.read(65536)
+        if not chunk:
+            break
+        *tokens, pending = (pending + chunk).split(b'\0')
+        for token in tokens:
+            yield token.decode('utf-8', errors='replace')
+    if pending:
+        yield pending.decode('utf-8', errors='replace')
+
+
 def get_git_info() -> dict:
-    """获取 git 信息"""
+    """获取 git 信息（远程地址走缓存，提交信息只调用一次 git log）"""
     info = {
         'project': Path.cwd().name,
         'commit_msg': '',
@@ -58,45 +140,40 @@ def get_git_info() -> dict:
     
     try:
         # 获取项目名（从 remote url 或目录名）
-        result = subprocess.run(
-            ['git', 'remote', 'get-url', 'origin'],
-            capture_output=True, text=True, cwd=Path.cwd()
-        )
-        if result.returncode == 0:
-            remote_url = result.stdout.strip()
-            # 解析仓库名
-            if 'github.com' in remote_url:
-                # git@github.com:user/repo.git -> repo
-                # https://github.com/user/repo.git -> repo
-                info['project'] = remote_url.split('/')[-1].replace('.git', '')
-                # 转换为 https 链接
-                if remote_url.startswith('git@'):
-                    remote_url = remote_url.replace(':', '/').replace('git@', 'https://')
-                info['repo_url'] = remote_url.replace('.git', '')
-        
-        # 获取最近一次 commit 信息
-        result = subprocess.run(
-            ['git', 'log', '-1', '--pretty=format:%s'],
-            capture_output=True, text=True, cwd=Path.cwd()
-        )
-        if result.returncode == 0:
-            info['commit_msg'] = result.stdout.strip()
+        remote_url = get_remote_url(Path.cwd())
+        if 'github.com' in remote_url:
+            # git@github.com:user/repo.git -> repo
+            # https://github.com/user/repo.git -> repo
+            info['project'] = remote_url.split('/')[-1].replace('.git', '')
+            # 转换为 https 链接
+            if remote_url.startswith('git@'):
+                remote_url = remote_url.replace(':', '/').replace('git@', 'https://')
+            info['repo_url'] = remote_url.replace('.git', '')
         
-        # 获取 commit 时间
-        result = subprocess.run(
-            ['git', 'log', '-1', '--pretty=format:%ci'],
-            capture_output=True, text=True, cwd=Path.cwd()
-        )
-        if result.returncode == 0:
-            info['commit_time'] = result.stdout.strip()[:19]
+        # 提交时间、提交信息、变更文件（--name-status: 状态\0路径，重命名/复制为 状态\0旧路径\0新路径）
+        proc = subprocess.Popen(GIT_LOG_CMD, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                cwd=Path.cwd())
+        try:
+            tokens = iter_log_tokens(proc)
+            commit_time = next(tokens, '')
+            commit_msg = next(tokens, '')
+            for token in tokens:
+                status = token.strip('\n')
+                if not status:
+                    continue
+                paths = 2 if status[0] in 'RC' else 1
+                path = ''
+                for _ in range(paths):
+                    path = next(tokens, '')
+                if path:
+                    info['changed_files'].append(path)
+        finally:
+            proc.stdout.close()
+            proc.wait()
         
-        # 获取变更文件
-        result = subprocess.run(
-            ['git', 'diff', '--name-only', 'HEAD~1', 'HEAD'],
-            capture_output=True, text=True, cwd=Path.cwd()
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            info['changed_files'] = result.stdout.strip().split('\n')
+        if proc.returncode == 0 and commit_time:
+            info['commit_time'] = commit_time.strip()[:19]
+            info['commit_msg'] = commit_msg.strip()
         
     except Exception as e:
         print(f"获取 git 信息时出错: {e}")
@@ -104,6 +181,44 @@ def get_git_info() -> dict:
     return info
 
 
+def dispatch(jobs: list) -> list:
+    """
+    并发发送各渠道通知并汇总结果
+
+    每个渠道在独立的守护线程中发送，等待到各自的超时为止；超时的渠道记为失败，
+    其线程不再等待（进程退出时随之结束），不会阻塞提交钩子。
+
+    Args:
+        jobs: [(渠道名, 超时秒数, 发送函数)]，发送函数返回是否成功
+
+    Returns:
+        list: [{channel, ok, timed_out, elapsed}]，顺序同 jobs
+    """
+    start = time.monotonic()
+    running = []
+    for name, timeout, send in jobs:
+        result = {'channel': name, 'ok': False, 'timed_out': False, 'elapsed': 0.0}
+
+        def run(result=result, send=send):
+            began = time.monotonic()
+            try:
+                result['ok'] = bool(send())
+            except Exception as e:
+                print(f"{result['channel']} 发送失败: {e}")
+            result['elapsed'] = time.monotonic() - began
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        running.append((thread, timeout, result))
+
+    for thread, timeout, result in running:
+        thread.join(max(0.0, start + timeout - time.monotonic()))
+        if thread.is_alive():
+            result['timed_out'] = True
+            result['elapsed'] = timeout
+    return [result for _, _, result in running]
+
+
 def main():
     # 解析参数
     test_mode = '--test' in sys.argv
@@ -137,8 +252,9 @@ def main():
         return
     
     channels = config.get('channels', [])
+    jobs = []
     
-    # 发送邮件
+    # 邮件
     if 'email' in channels and not tg_only:
         email_config = config.get('email', {})
         recipients = email_config.get('recipients', [])
@@ -163,13 +279,16 @@ def main():
                 repo_url=git_info['repo_url']
             )
             
-            send_email(secrets['smtp'], recipients, subject, body, html)
+            timeout = email_config.get('timeout', EMAIL_TIMEOUT)
+            jobs.append(('邮件', timeout,
+                         lambda: send_email(secrets['smtp'], recipients, subject, body, html, timeout)))
         else:
             print("邮件配置不完整，跳过邮件通知")
     
-    # 发送 Telegram
+    # Telegram
     if 'telegram' in channels and not email_only:
         tg_secrets = secrets.get('telegram', {})
+        tg_config = config.get('telegram', {})
         
         if tg_secrets.get('bot_token') and tg_secrets.get('chat_id'):
             message = format_telegram_message(
@@ -180,11 +299,28 @@ def main():
                 repo_url=git_info['repo_url']
             )
             
-            send_telegram(tg_secrets['bot_token'], tg_secrets['chat_id'], message)
+            tg_timeout = tg_config.get('timeout', TG_TIMEOUT)
+            jobs.append(('Telegram', tg_timeout,
+                         lambda: send_telegram(tg_secrets['bot_token'], tg_secrets['chat_id'],
+                                               message, tg_timeout)))
         else:
             print("Telegram 配置不完整，跳过 Telegram 通知")
     
-    print("\n通知发送完成")
+    if not jobs:
+        print("\n没有可发送的渠道")
+        return
+    
+    results = dispatch(jobs)
+    
+    print()
+    for result in results:
+        if result['timed_out']:
+            status = f"✗ 超时（{result['elapsed']:g}s）"
+        else:
+            status = f"{'✓' if result['ok'] else '✗'} {result['elapsed']:.1f}s"
+        print(f"{result['channel']}: {status}")
+    sent = sum(1 for result in results if result['ok'])
+    print(f"\n通知发送完成: {sent}/{len(results)} 个渠道成功")
 
 
 if __name__ == "__main__":
@@ -7,7 +7,11 @@ from email.mime.multipart import MIMEMultipart
 from email.header import Header
 
 
-def send_email(smtp_config: dict, recipients: list, subject: str, body: str, html: str = None) -> bool:
+DEFAULT_TIMEOUT = 15
+
+
+def send_email(smtp_config: dict, recipients: list, subject: str, body: str, html: str = None,
+               timeout: float = DEFAULT_TIMEOUT) -> bool:
     """
     发送邮件
     
@@ -17,6 +21,7 @@ def send_email(smtp_config: dict, recipients: list, subject: str, body: str, htm
         subject: 邮件主题
         body: 邮件正文（纯文本）
         html: HTML 正文（可选）
+        timeout: 连接及每次网络读写的超时（秒）
     
     Returns:
         bool: 是否发送成功
@@ -38,9 +43,9 @@ def send_email(smtp_config: dict, recipients: list, subject: str, body: str, htm
         port = smtp_config.get('port', 465)
         
         if port == 465:
-            server = smtplib.SMTP_SSL(smtp_config['host'], port)
+            server = smtplib.SMTP_SSL(smtp_config['host'], port, timeout=timeout)
         else:
-            server = smtplib.SMTP(smtp_config['host'], port)
+            server = smtplib.SMTP(smtp_config['host'], port, timeout=timeout)
             server.starttls()
         
         server.login(smtp_config['username'], smtp_config['password'])
@@ -6,7 +6,10 @@ import urllib.parse
 import json
 
 
-def send_telegram(bot_token: str, chat_id: str, message: str) -> bool:
+DEFAULT_TIMEOUT = 10
+
+
+def send_telegram(bot_token: str, chat_id: str, message: str, timeout: float = DEFAULT_TIMEOUT) -> bool:
     """
     发送 Telegram 消息
     
@@ -14,6 +17,7 @@ def send_telegram(bot_token: str, chat_id: str, message: str) -> bool:
         bot_token: Bot token
         chat_id: Chat ID
         message: 消息内容
+        timeout: 请求超时（秒）
     
     Returns:
         bool: 是否发送成功
@@ -31,7 +35,7 @@ def send_telegram(bot_token: str, chat_id: str, message: str) -> bool:
         
         req = urllib.request.Request(url, data=data_encoded, method='POST')
         
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
             result = json.loads(response.read().decode('utf-8'))
             
             if result.get('ok'):
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+优先级老化模拟 - 比较静态优先级与不同老化间隔下任务的等待时间分布
+
+用法：python aging_sim.py [选项]
+
+选项：
+  --tasks <N>            任务数（默认 300）
+  --shape <形状>         DAG 形状（chain|fanout|layered，默认 layered）
+  --agents <K>           并行 agent 数（默认 4）
+  --fail-rate <比例>     任务首次执行失败并插入 P0 修复任务的概率（默认 0.2）
+  --duration <分钟>      任务平均耗时（默认 30，对数正态分布；修复任务为一半）
+  --intervals <分钟,...> 老化间隔，0 表示静态优先级（默认 0,480,120,30）
+  --runs <N>             每种策略模拟的次数（不同随机种子，结果合并统计，默认 5）
+  --seed <N>             起始随机种子（默认 42）
+  --json                 输出 JSON
+
+模型：K 个 agent 任一空闲即认领排序最前的可执行任务（同 next_task.py：有效优先级 > 文档顺序），
+有效优先级由 taskgraph.aged_priority 计算，与查询时的老化规则一致。失败的任务像 replan.py 一样
+插入一个 P0 修复任务并依赖它，修复完成后重新执行（第二次必定成功）。同一种子下各策略的
+DAG、优先级、耗时和失败任务完全相同，差异只来自认领顺序。
+
+等待时间 = 认领时间 - 进入可执行状态的时间，按全部认领和 P3 任务分别统计分位数；
+老化的代价体现在 P0 任务等待时间和完工时间上。
+"""
+
+import sys
+import json
+import heapq
+import math
+import random
+from pathlib import Path
+
+from gen_plan import SHAPES, PRIORITIES, build_dependencies, get_option
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from taskgraph import aged_priority
+
+
+def build_scenario(n: int, shape: str, fail_rate: float, duration: float, seed: int) -> dict:
+    """生成一次模拟的输入：依赖、优先级、耗时、首次执行是否失败"""
+    rng = random.Random(seed)
+    deps = build_dependencies(n, shape, seed=seed)
+    sigma = 0.8
+    mu = math.log(duration) - sigma ** 2 / 2     # 使均值为 duration
+    return {
+        'deps': deps,
+        'priority': [int(rng.choice(PRIORITIES)[1:]) for _ in range(n)],
+        'duration': [rng.lognormvariate(mu, sigma) for _ in range(n)],
+        'fails': [rng.random() < fail_rate for _ in range(n)],
+        'fix_duration': [rng.lognormvariate(mu - math.log(2), sigma) for _ in range(n)],
+    }
+
+
+def simulate(scenario: dict, agents: int, interval: float) -> dict:
+    """离散事件模拟，返回每次认领的 (基础优先级, 等待分钟) 与完工时间"""
+    deps = [list(d) for d in scenario['deps']]
+    priority = list(scenario['priority'])
+    duration = list(scenario['duration'])
+    fails = list(scenario['fails'])
+    n = len(deps)
+    dependents = [[] for _ in range(n)]
+    for i, ds in enumerate(deps):
+        for d in ds:
+            dependents[d].append(i)
+    remaining = [len(ds) for ds in deps]
+    ready = {i: 0.0 for i in range(n) if not deps[i]}    # 任务下标 -> 就绪时间
+    running = []      # (完成时间, 任务下标)
+    waits = []
+    now = 0.0
+    free = agents
+
+    def key(i):
+        level = priority[i]
+        return (aged_priority(level, now - ready[i], interval) if interval else level, i)
+
+    while ready or running:
+        while free and ready:
+            i = min(ready, key=key)
+            waits.append((priority[i], now - ready.pop(i)))
+            heapq.heappush(running, (now + duration[i], i))
+            free -= 1
+        now, i = heapq.heappop(running)
+        free += 1
+        if i < len(fails) and fails[i]:
+            # 与 replan.py 相同：插入 P0 修复任务，失败任务依赖它并重置为 pending
+            fails[i] = False
+            fix = len(deps)
+            deps.append([])
+            dependents.append([i])
+            priority.append(0)
+            duration.append(scenario['fix_duration'][i])
+            remaining.append(0)
+            remaining[i] = 1
+            ready[fix] = now
+            continue
+        for child in dependents[i]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready[child] = now
+    return {'waits': waits, 'makespan': now, 'fixes': len(deps) - n}
+
+
+def pad(text: str, width: int, right: bool = False) -> str:
+    """按显示宽度补齐（中文字符占两列）"""
+    fill = ' ' * max(0, width - sum(2 if ord(c) > 0x2e80 else 1 for c in text))
+    return fill + text if right else text + fill
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(results: list) -> dict:
+    waits = [w for r in results for _, w in r['waits']]
+    by_level = {}
+    for r in results:
+        for level, w in r['waits']:
+            by_level.setdefault(level, []).append(w)
+    summary = {
+        'claims': len(waits),
+        'fixes': sum(r['fixes'] for r in results),
+        'makespan': sum(r['makespan'] for r in results) / len(results),
+    }
+    for name, values in (('all', waits), ('p0', by_level.get(0, [])), ('p3', by_level.get(3, []))):
+        summary[name] = {'p50': percentile(values, 0.5), 'p90': percentile(values, 0.9),
+                         'p99': percentile(values, 0.99), 'max': max(values, default=0.0)}
+    return summary
+
+
+def main():
+    n = int(get_option('--tasks', 300))
+    shape = get_option('--shape', 'layered')
+    if shape not in SHAPES:
+        print(f"✗ 未知的 DAG 形状: {shape}（可选: {', '.join(SHAPES)}）")
+        sys.exit(1)
+    agents = int(get_option('--agents', 4))
+    fail_rate = float(get_option('--fail-rate', 0.2))
+    duration = float(get_option('--duration', 30))
+    intervals = [float(v) for v in get_option('--intervals', '0,480,120,30').split(',')]
+    runs = int(get_option('--runs', 5))
+    seed = int(get_option('--seed', 42))
+
+    scenarios = [build_scenario(n, shape, fail_rate, duration, seed + k) for k in range(runs)]
+    report = []
+    for interval in intervals:
+        summary = summarize([simulate(s, agents, interval) for s in scenarios])
+        report.append(dict(summary, interval=interval))
+
+    if '--json' in sys.argv:
+        print(json.dumps({'tasks': n, 'shape': shape, 'agents': agents, 'fail_rate': fail_rate,
+                          'duration': duration, 'runs': runs, 'policies': report},
+                         ensure_ascii=False, indent=2))
+        return
+
+    print(f"优先级老化模拟: {n} 个任务（{shape}），{agents} 个 agent，失败率 {fail_rate:g}，"
+          f"平均耗时 {duration:g} 分钟，{runs} 次模拟")
+    print("等待时间单位：小时")
+    print()
+    widths = (16, 10, 8, 8, 8, 9, 9, 9, 8)
+    print(''.join(pad(title, w, right=k > 0) for k, (title, w) in enumerate(zip(
+        ('策略', '全部 p50', 'p90', 'p99', '最大', 'P3 p99', 'P3 最大', 'P0 p99', '完工'), widths))))
+    print('-' * sum(widths))
+    for row in report:
+        name = f"老化 {row['interval']:g} 分钟" if row['interval'] else '静态优先级'
+        values = (row['all']['p50'], row['all']['p90'], row['all']['p99'], row['all']['max'],
+                  row['p3']['p99'], row['p3']['max'], row['p0']['p99'], row['makespan'])
+        print(pad(name, widths[0]) + ''.join(pad(f"{v / 60:.1f}", w, right=True)
+                                             for v, w in zip(values, widths[1:])))
+    print()
+    print(f"认领 {report[0]['claims']} 次，其中修复任务 {report[0]['fixes']} 个")
+
+
+if __name__ == '__main__':
+    main()
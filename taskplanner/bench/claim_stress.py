@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+并发认领压力测试 - 多个 agent 同时对同一个 TASKS.md 执行 认领 → 完成 循环
+
+用法：python claim_stress.py [选项]
+
+选项：
+  --agents <N,...>     并发 agent 数（默认 4,16,64）
+  --tasks <N>          任务数（默认 200，全部无依赖，均可认领）
+  --pick <N>           每个 agent 从前 N 个可认领任务中随机选择（默认 4，越小竞争越激烈）
+  --inprocess          在 worker 进程内直接调用函数，不启动脚本子进程（排除解释器启动开销）
+  --seed <N>           随机种子（默认 42）
+
+测量：成功认领吞吐（次/秒）、认领与完成的延迟分位数（p50/p95/p99/max）、认领冲突数。
+校验（任一失败则退出码为 1）：
+1. 没有任务被成功认领两次
+2. 没有丢失的状态变更：每次成功完成的任务在最终文档中均为 completed，且执行者为认领它的会话
+3. 最终文档仍可解析，任务数不变，没有残留的 in_progress
+"""
+
+import sys
+import time
+import random
+import tempfile
+import subprocess
+import multiprocessing
+from collections import Counter
+from pathlib import Path
+
+from gen_plan import render_plan, get_option
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import claim_task
+import complete_task
+from taskgraph import TaskGraph
+
+
+def ready_tasks(plan: Path) -> list:
+    """当前可认领的任务 ID（依赖全部完成的 pending 任务）"""
+    return [task.id for task in TaskGraph.load(plan).ready()]
+
+
+def _claim(plan: Path, task_id: str, inprocess: bool) -> tuple:
+    if inprocess:
+        return claim_task.claim_task(plan, task_id)
+    result = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'claim_task.py'), str(plan), task_id],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return False, result.stdout.strip()
+    session = result.stdout.split('会话 ID:')[-1].strip()
+    return True, session
+
+
+def _complete(plan: Path, task_id: str, inprocess: bool) -> tuple:
+    if inprocess:
+        return complete_task.complete_task(plan, task_id)
+    result = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'complete_task.py'), str(plan), task_id],
+                            capture_output=True, text=True)
+    return result.returncode == 0, result.stdout.strip()
+
+
+def worker(plan: str, worker_id: int, pick: int, inprocess: bool, seed: int, queue):
+    """agent 进程：反复 查看 → 认领 → 完成，直到没有可认领任务"""
+    rng = random.Random(seed + worker_id)
+    plan = Path(plan)
+    events = []
+    while True:
+        candidates = ready_tasks(plan)
+        if not candidates:
+            break
+        task_id = rng.choice(candidates[:pick])
+
+        start = time.perf_counter()
+        ok, result = _claim(plan, task_id, inprocess)
+        events.append(('claim', task_id, ok, result if ok else None, time.perf_counter() - start))
+        if not ok:
+            continue
+
+        start = time.perf_counter()
+        ok, _ = _complete(plan, task_id, inprocess)
+        events.append(('complete', task_id, ok, None, time.perf_counter() - start))
+    queue.put(events)
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def verify(plan: Path, n: int, events: list) -> list:
+    """校验并发执行后的不变量，返回违规列表"""
+    violations = []
+
+    claims = Counter(e[1] for e in events if e[0] == 'claim' and e[2])
+    for task_id, count in claims.items():
+        if count > 1:
+            violations.append(f"{task_id} 被成功认领 {count} 次")
+
+    try:
+        graph = TaskGraph.load(plan)
+    except Exception as e:
+        return violations + [f"最终文档无法解析: {e}"]
+    if len(graph) != n:
+        violations.append(f"最终文档任务数为 {len(graph)}，应为 {n}")
+
+    sessions = {e[1]: e[3] for e in events if e[0] == 'claim' and e[2]}
+    for task_id in {e[1] for e in events if e[0] == 'complete' and e[2]}:
+        task = graph.tasks.get(task_id)
+        status = task.status if task else None
+        if status != 'completed':
+            violations.append(f"{task_id} 已成功完成，但最终状态为 {status}")
+            continue
+        if task.get('执行者') != sessions.get(task_id):
+            violations.append(f"{task_id} 的执行者不是认领它的会话 {sessions.get(task_id)}")
+
+    leftover = [task.id for task in graph if task.status == 'in_progress']
+    if leftover:
+        violations.append(f"残留 in_progress 任务: {', '.join(leftover[:10])}")
+
+    return violations
+
+
+def run(agents: int, n: int, pick: int, inprocess: bool, seed: int) -> dict:
+    """启动 agents 个 worker 对同一个计划执行认领循环，返回统计与校验结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        plan = Path(tmp) / 'TASKS.md'
+        plan.write_text(render_plan(n, [[] for _ in range(n)], completed_ratio=0), encoding='utf-8')
+
+        ctx = multiprocessing.get_context('spawn')
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(str(plan), i, pick, inprocess, seed, queue))
+                 for i in range(agents)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        events = [e for _ in procs for e in queue.get()]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        violations = verify(plan, n, events)
+
+    claim_latency = [e[4] for e in events if e[0] == 'claim']
+    complete_latency = [e[4] for e in events if e[0] == 'complete']
+    claimed = sum(1 for e in events if e[0] == 'claim' and e[2])
+    return {
+        'agents': agents,
+        'elapsed': elapsed,
+        'claims': claimed,
+        'conflicts': sum(1 for e in events if e[0] == 'claim' and not e[2]),
+        'claims_per_sec': claimed / elapsed if elapsed else 0,
+        'claim_latency': claim_latency,
+        'complete_latency': complete_latency,
+        'violations': violations,
+    }
+
+
+def format_latency(values: list) -> str:
+    return ' '.join(f"{name} {percentile(values, p) * 1000:>7.1f}"
+                    for name, p in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)))
+
+
+def main():
+    agent_counts = [int(a) for a in get_option('--agents', '4,16,64').split(',')]
+    n = int(get_option('--tasks', 200))
+    pick = int(get_option('--pick', 4))
+    seed = int(get_option('--seed', 42))
+    inprocess = '--inprocess' in sys.argv
+
+    print(f"并发认领压力测试: {n} 个任务，{'进程内调用' if inprocess else '脚本子进程'}")
+    print("=" * 72)
+
+    failed = False
+    for agents in agent_counts:
+        r = run(agents, n, pick, inprocess, seed)
+        print(f"\n[{agents} agents] 用时 {r['elapsed']:.2f}s，成功认领 {r['claims']} 次，"
+              f"冲突 {r['conflicts']} 次，吞吐 {r['claims_per_sec']:.1f} 认领/s")
+        print(f"  认领延迟(ms): {format_latency(r['claim_latency'])}")
+        print(f"  完成延迟(ms): {format_latency(r['complete_latency'])}")
+        if r['violations']:
+            failed = True
+            print(f"  ✗ 发现 {len(r['violations'])} 处不变量违规:")
+            for v in r['violations'][:20]:
+                print(f"    - {v}")
+        else:
+            print("  ✓ 不变量校验通过")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+合成任务计划生成器 - 生成与 SKILL.md 格式完全一致的 TASKS.md
+
+用法：python gen_plan.py <任务数> <输出路径> [选项]
+
+选项：
+  --shape <chain|fanout|layered>  DAG 形状（默认 layered）
+  --width <N>                     fanout 的分支数 / layered 的每层任务数
+  --max-deps <N>                  layered 每个任务最多依赖数（默认 3）
+  --completed <比例>              按拓扑顺序标记为已完成的比例（默认 0.25）
+  --seed <N>                      随机种子（默认 42）
+
+形状：
+- chain:   TASK-i 依赖 TASK-(i-1)，无并行度
+- fanout:  树形扇出，每个任务依赖其父节点，宽度由 --width 决定
+- layered: 随机分层 DAG，每个任务依赖上一层（或上两层）中的若干任务
+"""
+
+import sys
+import math
+import random
+from pathlib import Path
+
+
+SHAPES = ('chain', 'fanout', 'layered')
+
+MODULES = ['基础设施', '用户认证', '团队管理', '任务管理', '实时通信', '数据统计', '前端', '测试']
+PRIORITIES = ['P0', 'P1', 'P2', 'P3']
+
+
+def task_id(index: int) -> str:
+    """第 index 个任务（从 0 开始）的 ID"""
+    return f"TASK-{index + 1:03d}"
+
+
+def build_dependencies(n: int, shape: str, width: int = None, max_deps: int = 3,
+                       seed: int = 42) -> list:
+    """生成依赖关系，返回 deps[i] = 任务 i 依赖的任务下标列表（均小于 i，保证无环）"""
+    rng = random.Random(seed)
+    deps = [[] for _ in range(n)]
+
+    if shape == 'chain':
+        for i in range(1, n):
+            deps[i] = [i - 1]
+
+    elif shape == 'fanout':
+        width = width or 100
+        for i in range(1, n):
+            deps[i] = [(i - 1) // width]
+
+    elif shape == 'layered':
+        width = width or max(2, int(math.sqrt(n)))
+        for i in range(width, n):
+            layer_start = (i // width) * width
+            # 从上一层（偶尔上两层）中随机选取依赖
+            low = max(0, layer_start - width * rng.choice((1, 1, 1, 2)))
+            candidates = range(low, layer_start)
+            k = rng.randint(1, min(max_deps, len(candidates)))
+            deps[i] = sorted(rng.sample(candidates, k))
+
+    else:
+        raise ValueError(f"未知的 DAG 形状: {shape}")
+
+    return deps
+
+
+def render_plan(n: int, deps: list, completed_ratio: float = 0.25, seed: int = 42,
+                title: str = '合成基准') -> str:
+    """按 SKILL.md 的输出文档格式渲染 TASKS.md"""
+    rng = random.Random(seed)
+    completed = int(n * completed_ratio)
+    lines = [
+        f"# {title} 开发任务计划",
+        "",
+        "## 元信息",
+        "- **PRD**: PRD.md",
+        "- **Spec**: Spec.md",
+        "- **生成时间**: 2026-01-29 15:30",
+        f"- **任务总数**: {n}",
+        "",
+        "## 任务依赖图",
+        "",
+        "### Mermaid 视图",
+        "```mermaid",
+        "graph TD",
+    ]
+    for i in range(n):
+        for d in deps[i]:
+            lines.append(f"    {task_id(d)} --> {task_id(i)}")
+    lines += ["```", "", "### 依赖列表"]
+    for i in range(n):
+        if deps[i]:
+            lines.append(f"- {task_id(i)}: 依赖 [{', '.join(task_id(d) for d in deps[i])}]")
+        else:
+            lines.append(f"- {task_id(i)}: 无依赖")
+    lines += ["", "## 任务列表", ""]
+
+    for i in range(n):
+        module_index = rng.randrange(len(MODULES))
+        module = MODULES[module_index]
+        done = i < completed
+        dep_str = f"[{', '.join(task_id(d) for d in deps[i])}]" if deps[i] else '无'
+        files = ', '.join(
+            f"backend/src/m{module_index}/f{rng.randrange(max(1, n // 4))}.ts"
+            for _ in range(rng.randint(1, 3))
+        )
+        lines += [
+            f"### {task_id(i)}: 合成任务 {i + 1}",
+            f"- **状态**: {'completed' if done else 'pending'}",
+            f"- **执行者**: {f'session-20260129-153500-{i % 1000:03d}' if done else '-'}",
+            f"- **认领时间**: {'2026-01-29 15:35:00' if done else '-'}",
+            f"- **优先级**: {rng.choice(PRIORITIES)}",
+            f"- **依赖**: {dep_str}",
+            f"- **模块**: {module}",
+            f"- **描述**: 合成任务 {i + 1}，用于基准测试",
+            f"- **验收标准**: 合成任务 {i + 1} 可验证",
+            f"- **相关文件**: {files}",
+            "",
+        ]
+
+    return '\n'.join(lines)
+
+
+def generate_plan(n: int, shape: str = 'layered', width: int = None, max_deps: int = 3,
+                  completed_ratio: float = 0.25, seed: int = 42) -> str:
+    """生成 n 个任务的 TASKS.md 内容"""
+    deps = build_dependencies(n, shape, width, max_deps, seed)
+    return render_plan(n, deps, completed_ratio, seed, title=f"合成基准 {shape}-{n}")
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("用法: python gen_plan.py <任务数> <输出路径> [--shape chain|fanout|layered] "
+              "[--width N] [--max-deps N] [--completed 比例] [--seed N]")
+        sys.exit(1)
+
+    n = int(sys.argv[1])
+    output = Path(sys.argv[2])
+    shape = get_option('--shape', 'layered')
+    if shape not in SHAPES:
+        print(f"✗ 未知的 DAG 形状: {shape}（可选: {', '.join(SHAPES)}）")
+        sys.exit(1)
+
+    width = get_option('--width')
+    content = generate_plan(
+        n,
+        shape,
+        width=int(width) if width else None,
+        max_deps=int(get_option('--max-deps', 3)),
+        completed_ratio=float(get_option('--completed', 0.25)),
+        seed=int(get_option('--seed', 42))
+    )
+    output.write_text(content, encoding='utf-8')
+    print(f"✓ 已生成 {n} 个任务（{shape}）: {output}")
+
+
+if __name__ == '__main__':
+    main()
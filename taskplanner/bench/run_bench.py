@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+taskplanner 脚本基准测试
+
+用法：python run_bench.py [选项]
+
+选项：
+  --sizes <N,...>          任务规模（默认 100,1000,10000,100000）
+  --shapes <形状,...>      DAG 形状（默认 chain,fanout,layered）
+  --ops <操作,...>         只测指定操作（默认全部）
+  --repeat <N>             每项重复次数，取最快一次（默认 3）
+  --timeout <秒>           单项超时（默认 60），超时记为 timeout
+  --no-memory              不测量内存峰值
+  --save <路径>            保存结果 JSON（包含版本信息，可跨版本对比）
+  --compare <基准JSON>     与之前保存的结果对比
+
+每个操作在独立子进程中执行（fork），计时使用 perf_counter，
+内存峰值为单独一次 tracemalloc 运行中 Python 分配的峰值。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+
+from gen_plan import SHAPES, generate_plan, get_option
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def op_parse(plan: Path, workdir: Path):
+    from taskgraph import TaskGraph
+    TaskGraph.load(plan)
+
+
+def op_validate_dag(plan: Path, workdir: Path):
+    from taskgraph import TaskGraph
+    TaskGraph.load(plan).validate()
+
+
+def op_next_task(plan: Path, workdir: Path):
+    from taskgraph import TaskGraph
+    TaskGraph.load(plan).ready()
+
+
+def _prepare_claimable(plan: Path, workdir: Path) -> tuple:
+    from taskgraph import TaskGraph
+    copy = workdir / 'TASKS.md'
+    shutil.copyfile(plan, copy)
+    ready = TaskGraph.load(copy).ready()
+    return copy, ready[0].id if ready else None
+
+
+def op_claim(plan: Path, workdir: Path, prepared: tuple):
+    import claim_task
+    copy, tid = prepared
+    ok, result = claim_task.claim_task(copy, tid)
+    if not ok:
+        raise RuntimeError(result)
+
+
+def _prepare_claimed(plan: Path, workdir: Path) -> tuple:
+    import claim_task
+    copy, tid = _prepare_claimable(plan, workdir)
+    claim_task.claim_task(copy, tid)
+    return copy, tid
+
+
+def op_complete(plan: Path, workdir: Path, prepared: tuple):
+    import complete_task
+    copy, tid = prepared
+    ok, result = complete_task.complete_task(copy, tid)
+    if not ok:
+        raise RuntimeError(result)
+
+
+def op_reset(plan: Path, workdir: Path, prepared: tuple):
+    import reset_task
+    copy, tid = prepared
+    ok, result = reset_task.reset_task(copy, tid)
+    if not ok:
+        raise RuntimeError(result)
+
+
+def _prepare_copy(plan: Path, workdir: Path) -> Path:
+    copy = workdir / 'TASKS.md'
+    shutil.copyfile(plan, copy)
+    return copy
+
+
+def op_reprioritize(plan: Path, workdir: Path, copy: Path):
+    import replan
+    replan.reprioritize_tasks(copy)
+
+
+def _prepare_packed(plan: Path, workdir: Path) -> tuple:
+    import plan_pack
+    copy, tid = _prepare_claimable(plan, workdir)
+    packed = workdir / 'TASKS.tpk'
+    plan_pack.pack_file(copy, packed)
+    return packed, tid
+
+
+def op_packed_claim(plan: Path, workdir: Path, prepared: tuple):
+    import plan_pack
+    packed, tid = prepared
+    plan_pack.PackedPlan(packed).claim(tid)
+
+
+def op_checkpoint(plan: Path, workdir: Path):
+    import checkpoint
+    checkpoint.run_checkpoint(plan, workdir, skip_lint=True)
+
+
+# 操作名 -> (计时函数, 准备函数)；准备阶段不计时，每次重复前都会重新执行
+OPERATIONS = {
+    'parse': (op_parse, None),
+    'validate_dag': (op_validate_dag, None),
+    'next_task': (op_next_task, None),
+    'claim': (op_claim, _prepare_claimable),
+    'complete': (op_complete, _prepare_claimed),
+    'reset': (op_reset, _prepare_claimed),
+    'reprioritize': (op_reprioritize, _prepare_copy),
+    'packed_claim': (op_packed_claim, _prepare_packed),
+    'checkpoint': (op_checkpoint, None),
+}
+
+
+def _run_once(op: str, plan: Path, measure_memory: bool) -> tuple:
+    """执行一次操作，返回 (秒数, 内存峰值字节或 None)"""
+    func, prepare = OPERATIONS[op]
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        args = (plan, workdir) if prepare is None else (plan, workdir, prepare(plan, workdir))
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            func(*args)
+            elapsed = time.perf_counter() - start
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] if measure_memory else None
+            if measure_memory:
+                tracemalloc.stop()
+    return elapsed, peak
+
+
+def _child(op: str, plan: str, repeat: int, measure_memory: bool, queue):
+    """子进程入口：计时运行 repeat 次取最快，再单独运行一次测内存"""
+    try:
+        best = min(_run_once(op, Path(plan), False)[0] for _ in range(repeat))
+        peak = _run_once(op, Path(plan), True)[1] if measure_memory else None
+        queue.put({'seconds': best, 'peak_bytes': peak, 'error': None})
+    except BaseException as e:  # 记录 RecursionError 等失败，而不是中断整个基准
+        queue.put({'seconds': None, 'peak_bytes': None, 'error': f"{type(e).__name__}: {e}"[:200]})
+
+
+def run_operation(op: str, plan: Path, repeat: int, timeout: float, measure_memory: bool) -> dict:
+    """在独立子进程中运行一项操作，超时则终止"""
+    ctx = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(op, str(plan), repeat, measure_memory, queue))
+    proc.start()
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+        return {'seconds': None, 'peak_bytes': None, 'error': 'timeout'}
+    if queue.empty():
+        return {'seconds': None, 'peak_bytes': None, 'error': f"exit code {proc.exitcode}"}
+    return queue.get()
+
+
+def git_revision() -> str:
+    """当前仓库版本（含未提交修改标记）"""
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=SCRIPTS_DIR).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', str(SCRIPTS_DIR)],
+                               capture_output=True, text=True, cwd=SCRIPTS_DIR).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except FileNotFoundError:
+        return 'unknown'
+
+
+def format_result(r: dict) -> str:
+    if r['error']:
+        return f"{r['shape']:<8} {r['size']:>7} {r['op']:<13} {r['error']}"
+    peak = f"{r['peak_bytes'] / 1024 / 1024:>8.1f} MB" if r['peak_bytes'] is not None else '        -'
+    return (f"{r['shape']:<8} {r['size']:>7} {r['op']:<13} "
+            f"{r['seconds'] * 1000:>10.2f} ms {r['throughput']:>12.0f} 任务/s {peak}")
+
+
+def compare(baseline: dict, current: dict):
+    """按 (shape, size, op) 对比两次结果"""
+    base = {(r['shape'], r['size'], r['op']): r for r in baseline['results']}
+    print(f"\n对比 {baseline['meta']['revision']} → {current['meta']['revision']}")
+    print("-" * 72)
+    for r in current['results']:
+        old = base.get((r['shape'], r['size'], r['op']))
+        if not old:
+            continue
+        if old['seconds'] and r['seconds']:
+            ratio = r['seconds'] / old['seconds']
+            change = f"{ratio:>6.2f}x {'↑ 变慢' if ratio > 1.1 else '↓ 变快' if ratio < 0.9 else ''}"
+        else:
+            change = f"{old['error'] or 'ok'} → {r['error'] or 'ok'}"
+        print(f"{r['shape']:<8} {r['size']:>7} {r['op']:<13} {change}")
+
+
+def main():
+    sizes = [int(s) for s in get_option('--sizes', ','.join(map(str, DEFAULT_SIZES))).split(',')]
+    shapes = get_option('--shapes', ','.join(SHAPES)).split(',')
+    ops = get_option('--ops', ','.join(OPERATIONS)).split(',')
+    repeat = int(get_option('--repeat', 3))
+    timeout = float(get_option('--timeout', 60))
+    measure_memory = '--no-memory' not in sys.argv
+
+    for name in ops:
+        if name not in OPERATIONS:
+            print(f"✗ 未知操作: {name}（可选: {', '.join(OPERATIONS)}）")
+            sys.exit(1)
+    for shape in shapes:
+        if shape not in SHAPES:
+            print(f"✗ 未知的 DAG 形状: {shape}（可选: {', '.join(SHAPES)}）")
+            sys.exit(1)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for shape in shapes:
+            for size in sizes:
+                plan = Path(tmp) / f"{shape}-{size}.md"
+                plan.write_text(generate_plan(size, shape), encoding='utf-8')
+                for op in ops:
+                    r = run_operation(op, plan, repeat, timeout, measure_memory)
+                    r.update({
+                        'shape': shape,
+                        'size': size,
+                        'op': op,
+                        'file_bytes': plan.stat().st_size,
+                        'throughput': size / r['seconds'] if r['seconds'] else None,
+                    })
+                    results.append(r)
+                    print(format_result(r), flush=True)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+    if get_option('--save'):
+        Path(get_option('--save')).write_text(json.dumps(report, ensure_ascii=False, indent=2),
+                                              encoding='utf-8')
+        print(f"\n✓ 结果已保存: {get_option('--save')}")
+
+    if get_option('--compare'):
+        baseline = json.loads(Path(get_option('--compare')).read_text(encoding='utf-8'))
+        compare(baseline, report)
+
+
+if __name__ == '__main__':
+    main()
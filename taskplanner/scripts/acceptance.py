@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+可执行验收标准 - 供 checkpoint.py 使用
+
+任务可以用 **验收命令** 字段声明验收命令，多条命令分别用反引号括起：
+
+    - **验收命令**: `npm test -- auth`, `curl -sf http://localhost:3000/api/health`
+
+没有反引号时整个字段值视为一条命令。命令在项目根目录下以 shell 执行，退出码 0 为通过。
+
+- 所有已完成且声明了验收命令的任务都参与检查（不只最近一轮），命令在有界线程池中并行执行，
+  单条命令超时后连同其子进程一起终止（复用 check_runner.run_check）
+- 通过的结果按 (相关文件内容哈希, 命令) 缓存在任务文档旁的 .<文件名>.acceptance.json 中，
+  相关文件未变化的任务不再重复执行；未通过的结果不缓存，下一轮重新执行
+  （例如本地服务尚未启动导致的失败，服务启动后会自动恢复）
+"""
+
+import os
+import json
+import glob
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from check_runner import IGNORED_DIRS, DEFAULT_JOBS, run_check
+
+
+ACCEPTANCE_FIELD = '验收命令'
+DEFAULT_TIMEOUT = 120
+OUTPUT_TAIL = 2000       # 报告中保留的命令输出长度
+
+
+def cache_path(task_file: Path) -> Path:
+    """任务文档对应的验收结果缓存文件路径"""
+    task_file = Path(task_file)
+    return task_file.with_name(f".{task_file.name}.acceptance.json")
+
+
+def parse_commands(value: str) -> list:
+    """解析验收命令字段：`cmd1`, `cmd2` -> [cmd1, cmd2]"""
+    if value is None or value.strip() in ('无', '-', ''):
+        return []
+    parts = value.split('`')
+    if len(parts) >= 3:
+        return [cmd.strip() for cmd in parts[1::2] if cmd.strip()]
+    return [value.strip()]
+
+
+def _expand(project_root: Path, pattern: str) -> list:
+    """相关文件条目 -> 实际文件列表（目录递归展开，支持通配）"""
+    pattern = pattern.strip()
+    if not pattern or pattern == '-':
+        return []
+    if any(c in pattern for c in '*?['):
+        matches = glob.glob(str(project_root / pattern), recursive=True)
+    else:
+        matches = [str(project_root / pattern.rstrip('/'))]
+    files = []
+    for match in matches:
+        if os.path.isdir(match):
+            for dirpath, dirnames, filenames in os.walk(match):
+                dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+                files.extend(os.path.join(dirpath, f) for f in sorted(filenames))
+        else:
+            files.append(match)
+    return files
+
+
+def files_hash(project_root: Path, related_files: list, commands: list) -> str:
+    """相关文件内容与验收命令的哈希（不存在的文件也计入，文件出现或消失都会改变哈希）"""
+    digest = hashlib.sha1('\0'.join(commands).encode('utf-8'))
+    for pattern in related_files:
+        paths = _expand(project_root, pattern)
+        if not paths:
+            digest.update(f"\0missing:{pattern}".encode('utf-8'))
+        for path in paths:
+            digest.update(f"\0{os.path.relpath(path, project_root)}\0".encode('utf-8'))
+            try:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(chunk)
+            except OSError:
+                digest.update(b'missing')
+    return digest.hexdigest()
+
+
+def load_cache(task_file: Path) -> dict:
+    try:
+        return json.loads(cache_path(task_file).read_text(encoding='utf-8')).get('tasks', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(task_file: Path, cache: dict):
+    from plan_lock import atomic_write
+    atomic_write(cache_path(task_file), json.dumps({'tasks': cache}, ensure_ascii=False, indent=1))
+
+
+def _shell(command: str) -> list:
+    return ['sh', '-c', command] if os.name == 'posix' else ['cmd', '/c', command]
+
+
+def run_acceptance(task_file: Path, project_root: Path, tasks: list, max_workers: int = DEFAULT_JOBS,
+                   timeout: int = DEFAULT_TIMEOUT, use_cache: bool = True, keep_ids=None) -> list:
+    """
+    执行任务的验收命令（命中缓存的任务跳过）
+
+    Args:
+        tasks: 声明了验收命令的任务列表
+        keep_ids: 缓存中保留的任务 ID（默认为 tasks）；只重新执行部分任务时传入全部声明了验收命令的
+                  已完成任务，避免删掉其他任务的缓存
+
+    Returns:
+        list: [{task, ok, cached, commands: [{command, ok, timed_out, output, wall_ms}]}]，顺序同 tasks
+    """
+    if not tasks:
+        return []
+    cache = load_cache(task_file) if use_cache else {}
+    results, jobs = {}, []
+    keys = {}
+    for task in tasks:
+        commands = parse_commands(task.get(ACCEPTANCE_FIELD))
+        keys[task.id] = files_hash(project_root, task.related_files, commands)
+        entry = cache.get(task.id)
+        if entry and entry.get('key') == keys[task.id]:
+            results[task.id] = dict(entry['result'], cached=True)
+            continue
+        results[task.id] = {'task': task.id, 'ok': True, 'cached': False, 'commands': []}
+        jobs += [{'task': task.id, 'location': '.', 'adapter': 'acceptance', 'cwd': str(project_root),
+                  'command': _shell(command), 'shell': command} for command in commands]
+
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            outcomes = list(pool.map(lambda job: run_check(job, timeout), jobs))
+        for job, outcome in zip(jobs, outcomes):
+            result = results[job['task']]
+            if outcome is None:       # shell 不可用
+                outcome = {'ok': False, 'timed_out': False, 'output': '无法启动 shell', 'wall_ms': 0}
+            result['commands'].append({
+                'command': job['shell'],
+                'ok': outcome['ok'],
+                'timed_out': outcome['timed_out'],
+                'output': outcome['output'][-OUTPUT_TAIL:],
+                'wall_ms': outcome['wall_ms'],
+            })
+            result['ok'] = result['ok'] and outcome['ok']
+
+    if use_cache:
+        keep = set(keys) if keep_ids is None else set(keep_ids) | set(keys)
+        cache = {tid: entry for tid, entry in cache.items() if tid in keep}
+        for tid, result in results.items():
+            if not result['cached'] and result['ok']:
+                cache[tid] = {'key': keys[tid], 'result': dict(result, cached=False)}
+            elif not result['ok']:
+                cache.pop(tid, None)
+        save_cache(task_file, cache)
+    return [results[task.id] for task in tasks]
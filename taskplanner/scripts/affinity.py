@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+会话亲和度 - 优先把与会话近期工作相近的任务分给它，减少 agent 重新加载上下文的开销
+
+- 每个会话保留一份最近接触的 相关文件 / 模块 的 LRU 历史，存放在任务文档旁的
+  .<文件名>.sessions.json 中（认领时在文档锁内更新）
+- affinity_score(): 任务相关文件与历史路径的公共前缀越长、历史越新，得分越高；同模块加分
+- rank_for_session(): 排序时先看优先级，再看是否位于剩余工作的关键路径上，
+  最后才按亲和度排序，亲和度不会让低优先级或非关键路径任务插队
+"""
+
+import json
+from pathlib import Path
+
+from path_index import split_path
+
+
+HISTORY_SIZE = 32        # 每个会话保留的历史条目数
+MAX_SESSIONS = 64        # 最多保留的会话数（最久未活动的先淘汰）
+MODULE_WEIGHT = 1.0      # 同模块加分
+
+
+def history_path(file_path: Path) -> Path:
+    """任务文档对应的会话历史文件路径"""
+    file_path = Path(file_path)
+    return file_path.with_name(f".{file_path.name}.sessions.json")
+
+
+class SessionHistory:
+    """会话 -> 最近接触的条目（新的在前）；条目为相关文件路径或 "module:<模块>" """
+
+    def __init__(self, sessions: dict = None):
+        self.sessions = sessions or {}
+
+    @classmethod
+    def load(cls, file_path: Path) -> 'SessionHistory':
+        path = history_path(file_path)
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return cls()
+        return cls(data.get('sessions', {}))
+
+    def save(self, file_path: Path):
+        from plan_lock import atomic_write
+        content = json.dumps({'sessions': self.sessions}, ensure_ascii=False, indent=1)
+        atomic_write(history_path(file_path), content)
+
+    def entries(self, session_id: str) -> list:
+        return self.sessions.get(session_id, [])
+
+    def record(self, session_id: str, task):
+        """记录会话接触了任务的相关文件和模块（移到最前，超出容量的旧条目淘汰）"""
+        touched = ['/'.join(split_path(p)) for p in task.related_files]
+        if task.module:
+            touched.append(f"module:{task.module}")
+        history = [e for e in self.sessions.pop(session_id, []) if e not in touched]
+        self.sessions[session_id] = (touched + history)[:HISTORY_SIZE]
+        # 字典按插入顺序保存，最近活动的会话在末尾
+        while len(self.sessions) > MAX_SESSIONS:
+            del self.sessions[next(iter(self.sessions))]
+
+
+def _common_prefix(a: list, b: list) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def affinity_score(task, entries: list) -> float:
+    """任务与会话历史的亲和度：每个相关文件取与历史路径的最长公共前缀分段数（按历史新旧衰减），
+    同一文件额外加 1，同模块加 MODULE_WEIGHT"""
+    if not entries:
+        return 0.0
+    paths = []
+    modules = set()
+    for rank, entry in enumerate(entries):
+        weight = 1.0 / (1 + rank * 0.1)
+        if entry.startswith('module:'):
+            modules.add(entry[len('module:'):])
+        else:
+            paths.append((split_path(entry), weight))
+
+    score = 0.0
+    for path in task.related_files:
+        parts = split_path(path)
+        best = 0.0
+        for hist, weight in paths:
+            common = _common_prefix(parts, hist)
+            if common == len(parts) == len(hist):
+                common += 1
+            best = max(best, common * weight)
+        score += best
+    if task.module in modules:
+        score += MODULE_WEIGHT
+    return round(score, 3)
+
+
+def rank_for_session(graph, tasks: list, entries: list) -> list:
+    """按 (优先级, 是否关键路径, 亲和度, 文档顺序) 排序，返回 [(task, 亲和度)]；
+    关键路径长度按预估耗时累计（stats.py --write-estimates 写入后生效），
+    配置了优先级老化时按有效优先级（见 TaskGraph.priority_key）"""
+    depths = graph.remaining_depths(weighted=True)
+    critical = max((depths.get(t.id, 1) for t in tasks), default=0)
+    order = graph.index['order']
+    priority = graph.priority_key()
+    scored = [(task, affinity_score(task, entries)) for task in tasks]
+    scored.sort(key=lambda item: (priority(item[0]),
+                                  depths.get(item[0].id, 1) < critical - 1e-9,
+                                  -item[1],
+                                  order[item[0].id]))
+    return scored
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+检查运行器 - 供 checkpoint.py 调用的代码检查子系统
+
+功能：
+1. 一次遍历发现工作区内所有项目根目录（tsconfig.json、package.json、pyproject.toml 等）
+2. 通过可插拔的适配器将项目映射为检查命令
+3. 在有界进程池中调度检查，每个检查单独超时
+4. 只检查受本轮变更文件影响的项目
+
+扩展：调用 register_adapter() 注册新的适配器即可支持其他语言。
+"""
+
+import os
+import re
+import sys
+import time
+import signal
+import shutil
+import json
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# 遍历时跳过的目录（依赖、构建产物、缓存）
+IGNORED_DIRS = {
+    'node_modules', '.git', '.hg', '.svn', 'dist', 'build', 'out', 'coverage',
+    '.next', '.nuxt', '.turbo', '.cache', '__pycache__', '.venv', 'venv',
+    '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache', '.eggs',
+}
+
+DEFAULT_TIMEOUT = 60
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+
+# 已注册的适配器，按注册顺序匹配
+ADAPTERS = []
+
+
+def register_adapter(name: str, markers: tuple, build_command) -> None:
+    """
+    注册检查适配器
+
+    Args:
+        name: 适配器名称（如 typescript）
+        markers: 标识项目根目录的文件名
+        build_command: 函数 (project) -> 命令列表或 None，返回 None 表示不适用
+    """
+    ADAPTERS.append({
+        'name': name,
+        'markers': set(markers),
+        'build_command': build_command,
+    })
+
+
+def _typescript_command(project: dict) -> list:
+    """TypeScript 项目：tsc 类型检查"""
+    if 'tsconfig.json' not in project['markers']:
+        return None
+    return ['npx', 'tsc', '--noEmit', '--pretty', 'false']
+
+
+def _npm_lint_command(project: dict) -> list:
+    """无 tsconfig 的 Node 项目：执行 package.json 中的 lint 脚本"""
+    if 'package.json' not in project['markers'] or 'tsconfig.json' in project['markers']:
+        return None
+    try:
+        package = json.loads((project['root'] / 'package.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if 'lint' not in package.get('scripts', {}):
+        return None
+    return ['npm', 'run', 'lint', '--silent']
+
+
+def _python_command(project: dict) -> list:
+    """Python 项目：优先使用 ruff，否则做语法编译检查"""
+    if shutil.which('ruff'):
+        return ['ruff', 'check', '--quiet', '--output-format', 'concise', '.']
+    excluded = '|'.join(sorted(IGNORED_DIRS)).replace('.', r'\.')
+    return [sys.executable, '-m', 'compileall', '-q', '-x', rf'/({excluded})/', '.']
+
+
+register_adapter('typescript', ('tsconfig.json',), _typescript_command)
+register_adapter('npm-lint', ('package.json',), _npm_lint_command)
+register_adapter('python', ('pyproject.toml', 'setup.py', 'setup.cfg'), _python_command)
+
+
+def discover_projects(project_root: Path) -> list:
+    """一次遍历发现所有项目根目录，返回 [{root, rel, markers}]"""
+    all_markers = set()
+    for adapter in ADAPTERS:
+        all_markers |= adapter['markers']
+
+    projects = []
+    for dirpath, dirnames, filenames in os.walk(project_root):
+        # 原地剪枝，避免进入依赖和构建目录
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+        markers = all_markers.intersection(filenames)
+        if markers:
+            root = Path(dirpath)
+            rel = root.relative_to(project_root).as_posix()
+            projects.append({
+                'root': root,
+                'rel': '' if rel == '.' else rel,
+                'markers': markers,
+            })
+    return projects
+
+
+def build_jobs(projects: list) -> list:
+    """通过适配器将项目映射为检查任务"""
+    jobs = []
+    for project in projects:
+        for adapter in ADAPTERS:
+            if not adapter['markers'] & project['markers']:
+                continue
+            command = adapter['build_command'](project)
+            if command:
+                jobs.append({
+                    'location': project['rel'] or '.',
+                    'adapter': adapter['name'],
+                    'cwd': project['root'],
+                    'command': command,
+                })
+    return jobs
+
+
+def _is_under(path: str, prefix: str) -> bool:
+    """path 是否位于目录 prefix 之内（prefix 为空表示根目录）"""
+    return not prefix or path == prefix or path.startswith(prefix + '/')
+
+
+def select_affected(projects: list, changed_files: list) -> list:
+    """
+    筛选受变更影响的项目
+
+    普通文件只影响包含它的最深层项目；目录（以 / 结尾）还会影响其下所有嵌套项目。
+    """
+    affected = set()
+    # 最深的项目优先匹配
+    by_depth = sorted(projects, key=lambda p: p['rel'].count('/') + bool(p['rel']), reverse=True)
+
+    for changed in changed_files:
+        if not changed or changed == '-':
+            continue
+        is_dir = changed.endswith('/')
+        path = changed.strip().strip('/')
+
+        for project in by_depth:
+            if _is_under(path, project['rel']):
+                affected.add(project['rel'])
+                break
+        if is_dir:
+            for project in projects:
+                if _is_under(project['rel'], path):
+                    affected.add(project['rel'])
+
+    return [p for p in projects if p['rel'] in affected]
+
+
+# 诊断输出格式：tsc、file:line:col（eslint unix / ruff / gcc 风格）、Python traceback
+DIAGNOSTIC_PATTERNS = [
+    re.compile(r'^(?P<file>[^\s(][^(]*)\((?P<line>\d+),(?P<col>\d+)\):\s*(?P<severity>error|warning)\s+(?P<code>TS\d+):\s*(?P<message>.*)$'),
+    re.compile(r'^(?P<file>[^\s:][^:]*):(?P<line>\d+):(?P<col>\d+):\s*(?:(?P<severity>error|warning)\s*:?\s*)?(?P<code>[A-Z]+\d+)?\s*(?P<message>.*)$'),
+    re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+)(?P<col>)(?P<severity>)(?P<code>)(?P<message>)'),
+]
+
+
+def parse_diagnostics(output: str, location: str = '') -> list:
+    """将检查输出解析为 [{file, line, col, severity, code, message}]，文件路径相对项目根目录"""
+    diagnostics = []
+    for raw in output.splitlines():
+        line = raw.rstrip()
+        for pattern in DIAGNOSTIC_PATTERNS:
+            match = pattern.match(line)
+            if not match:
+                continue
+            file = match.group('file').strip()
+            if file.startswith('./'):
+                file = file[2:]
+            if location and location != '.' and not os.path.isabs(file):
+                file = f"{location}/{file}"
+            diagnostics.append({
+                'file': file,
+                'line': int(match.group('line')),
+                'col': int(match.group('col')) if match.group('col') else None,
+                'severity': match.group('severity') or 'error',
+                'code': match.group('code') or None,
+                'message': match.group('message').strip(),
+            })
+            break
+    return diagnostics
+
+
+def _wait_with_rusage(proc: subprocess.Popen, timeout: int) -> tuple:
+    """等待子进程结束，返回 (是否超时, 子进程 CPU 秒数)；不支持 wait4 的平台 CPU 为 None"""
+    if not hasattr(os, 'wait4'):
+        try:
+            proc.wait(timeout=timeout)
+            return False, None
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            return True, None
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        # 连同 npx 等包装器派生的子进程一起终止
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    finally:
+        timer.cancel()
+    # 已通过 wait4 回收，告知 Popen 不要再次等待
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return timed_out.is_set(), usage.ru_utime + usage.ru_stime
+
+
+def run_check(job: dict, timeout: int = DEFAULT_TIMEOUT) -> dict:
+    """
+    执行单个检查
+
+    Returns:
+        dict: {location, adapter, command, ok, timed_out, output, diagnostics, wall_ms, cpu_ms}；
+        工具缺失时返回 None
+    """
+    started = time.perf_counter()
+    with tempfile.TemporaryFile() as out:
+        try:
+            proc = subprocess.Popen(
+                job['command'],
+                cwd=job['cwd'],
+                stdout=out,
+                stderr=subprocess.STDOUT,
+                start_new_session=os.name == 'posix'
+            )
+        except FileNotFoundError:
+            return None
+        timed_out, cpu = _wait_with_rusage(proc, timeout)
+        out.seek(0)
+        output = out.read().decode('utf-8', errors='replace')
+
+    if timed_out:
+        output = f"检查超时（{timeout}s）: {' '.join(job['command'])}\n" + output
+    return {
+        'location': job['location'],
+        'adapter': job['adapter'],
+        'command': job['command'],
+        'ok': not timed_out and proc.returncode == 0,
+        'timed_out': timed_out,
+        'output': output,
+        'diagnostics': parse_diagnostics(output, job['location']),
+        'wall_ms': round((time.perf_counter() - started) * 1000, 1),
+        'cpu_ms': round(cpu * 1000, 1) if cpu is not None else None,
+    }
+
+
+def run_checks(jobs: list, max_workers: int = DEFAULT_JOBS, timeout: int = DEFAULT_TIMEOUT) -> list:
+    """在有界池中并行执行检查（每个线程等待一个子进程，最多 max_workers 个并发）"""
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = pool.map(lambda job: run_check(job, timeout), jobs)
+        return [r for r in results if r is not None]
+
+
+def check_projects(project_root: Path, changed_files: list = None,
+                   max_workers: int = DEFAULT_JOBS, timeout: int = DEFAULT_TIMEOUT) -> list:
+    """发现项目、筛选受影响项目并执行检查；changed_files 为 None 时检查全部项目"""
+    projects = discover_projects(project_root)
+    if changed_files is not None:
+        projects = select_affected(projects, changed_files)
+    return run_checks(build_jobs(projects), max_workers, timeout)
@@ -2,62 +2,54 @@
 """
 检查点脚本 - 每轮并行结束后执行
 
-用法：python checkpoint.py <任务文档路径> <项目根目录>
+用法：python checkpoint.py <任务文档路径> <项目根目录> [选项]
+
+选项：
+  --skip-lint             跳过代码检查
+  --skip-acceptance       跳过验收命令
+  --acceptance-timeout <秒>  单条验收命令超时（默认 120）
+  --no-cache              忽略验收结果缓存，重新执行全部验收命令
+  --skip-audit            跳过提交归属审计
+  --changed <文件,...>    本轮变更的文件（默认取最近完成任务的相关文件）
+  --all-projects          检查工作区内全部项目
+  --lint-jobs <N>         并行检查数，代码检查与验收命令共用（默认 min(4, CPU 数)）
+  --lint-timeout <秒>     单个检查超时（默认 60）
+  --format <text|json>    输出格式；json 为每行一条记录（progress/artifact/lint/acceptance/audit/suggestion/timing）
+  --timing                文本报告附带各阶段耗时
+  --watch                 持续监听项目目录和任务文档，变更后只重跑受影响的检查
+  --poll                  监听时强制使用轮询（默认优先 inotify）
+  --debounce <秒>         合并连续变更的等待时间（默认 0.3）
+  --report <路径>         将最新报告以 JSON 原子写入该文件
 
 功能：
 1. 验证刚完成任务的产出物是否存在
-2. 检查代码 lint 错误
-3. 检测文件冲突
-4. 建议后续任务调整
+2. 检查代码 lint 错误（自动发现工作区内的项目，见 check_runner.py）
+3. 执行已完成任务声明的验收命令，相关文件未变化的任务使用缓存结果（见 acceptance.py）
+4. 审计自上次检查点以来的提交：按会话尾注归属到任务，报告未声明的文件和没有提交的已完成任务
+   （见 git_audit.py）
+5. 检测文件冲突
+6. 建议后续任务调整
 """
 
 import sys
-import re
 import os
-import subprocess
+import json
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from collections import defaultdict
 
-
-def parse_tasks(content: str) -> dict:
-    """解析任务文档"""
-    tasks = {}
-    task_pattern = r'### (TASK-\d+):\s*(.+?)(?=\n###|\n## |\Z)'
-    task_matches = re.findall(task_pattern, content, re.DOTALL)
-    
-    for task_id, task_content in task_matches:
-        # 提取名称
-        name_match = re.match(r'([^\n]+)', task_content.strip())
-        name = name_match.group(1).strip() if name_match else task_id
-        
-        # 提取状态
-        status_match = re.search(r'\*\*状态\*\*:\s*(\w+)', task_content)
-        status = status_match.group(1) if status_match else 'pending'
-        
-        # 提取相关文件
-        files_match = re.search(r'\*\*相关文件\*\*:\s*(.+)', task_content)
-        related_files = []
-        if files_match:
-            files_str = files_match.group(1).strip()
-            if files_str != '-':
-                related_files = [f.strip() for f in files_str.split(',')]
-        
-        # 提取依赖
-        dep_match = re.search(r'\*\*依赖\*\*:\s*(.+)', task_content)
-        dependencies = []
-        if dep_match:
-            dep_str = dep_match.group(1).strip()
-            if dep_str != '无' and dep_str != '-':
-                dependencies = re.findall(r'TASK-\d+', dep_str)
-        
-        tasks[task_id] = {
-            'name': name,
-            'status': status,
-            'related_files': related_files,
-            'dependencies': dependencies
-        }
-    
-    return tasks
+from check_runner import (
+    ADAPTERS, DEFAULT_JOBS, DEFAULT_TIMEOUT,
+    build_jobs, discover_projects, run_checks, select_affected,
+)
+from watcher import DEFAULT_DEBOUNCE, create_watcher, wait_for_changes
+from acceptance import (
+    ACCEPTANCE_FIELD, DEFAULT_TIMEOUT as ACCEPTANCE_TIMEOUT,
+    cache_path, parse_commands, run_acceptance,
+)
+from git_audit import audit, print_audit, state_path
+from taskgraph import TaskGraph
+from graph_core import FAILED
 
 
 def check_file_exists(project_root: Path, file_patterns: list) -> list:
@@ -73,58 +65,46 @@ def check_file_exists(project_root: Path, file_patterns: list) -> list:
     return missing
 
 
-def check_lint_errors(project_root: Path) -> dict:
-    """检查 lint 错误（简化版：检查 TypeScript 编译）"""
-    errors = {}
-    
-    # 检查后端
-    backend_path = project_root / 'backend'
-    if backend_path.exists():
-        try:
-            result = subprocess.run(
-                ['npx', 'tsc', '--noEmit'],
-                cwd=backend_path,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            if result.returncode != 0:
-                errors['backend'] = result.stdout + result.stderr
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-    
-    # 检查前端
-    frontend_path = project_root / 'frontend'
-    if frontend_path.exists():
+class PhaseTimer:
+    """记录各阶段的墙钟时间和 CPU 时间"""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
         try:
-            result = subprocess.run(
-                ['npx', 'tsc', '--noEmit'],
-                cwd=frontend_path,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            if result.returncode != 0:
-                errors['frontend'] = result.stdout + result.stderr
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-    
-    return errors
+            yield
+        finally:
+            self.phases.append({
+                'phase': name,
+                'wall_ms': round((time.perf_counter() - wall) * 1000, 1),
+                'cpu_ms': round((time.process_time() - cpu) * 1000, 1),
+            })
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
 
 
-def analyze_task_adjustments(tasks: dict) -> list:
+def analyze_task_adjustments(graph: TaskGraph) -> list:
     """分析是否需要调整后续任务"""
     suggestions = []
     
-    completed = {tid for tid, info in tasks.items() if info['status'] == 'completed'}
-    failed = {tid for tid, info in tasks.items() if info['status'] == 'failed'}
-    pending = {tid for tid, info in tasks.items() if info['status'] == 'pending'}
+    core = graph.core
+    failed = [i for i in range(len(core)) if core.status[i] == FAILED]
     
     # 检查失败任务的影响
-    for failed_id in failed:
+    for i in failed:
+        failed_id = core.ids[i]
         # 找出依赖失败任务的后续任务
-        affected = [tid for tid, info in tasks.items() 
-                   if failed_id in info['dependencies'] and info['status'] == 'pending']
+        affected = [core.ids[j] for j in core.blocked_by(i)]
         if affected:
             suggestions.append({
                 'type': 'blocked',
@@ -138,87 +118,353 @@ def analyze_task_adjustments(tasks: dict) -> list:
     return suggestions
 
 
-def main():
-    if len(sys.argv) < 3:
-        print("用法: python checkpoint.py <任务文档路径> <项目根目录>")
-        sys.exit(1)
-    
-    task_file = Path(sys.argv[1])
-    project_root = Path(sys.argv[2])
-    
-    if not task_file.exists():
-        print(f"✗ 任务文档不存在: {task_file}")
-        sys.exit(1)
-    
-    content = task_file.read_text(encoding='utf-8')
-    tasks = parse_tasks(content)
-    
+def _overlaps(path: str, pattern: str) -> bool:
+    """变更路径与相关文件模式是否重叠（任一方为另一方的目录前缀）"""
+    pattern = pattern.strip().rstrip('/')
+    path = path.rstrip('/')
+    return (path == pattern or path.startswith(pattern + '/')
+            or pattern.startswith(path + '/'))
+
+
+class Checkpoint:
+    """
+    检查点执行状态
+
+    full() 执行全部检查；update() 根据变更路径只重跑受影响的产出物和代码检查，
+    供 --watch 模式复用上一次的结果。
+    """
+
+    def __init__(self, task_file: Path, project_root: Path, skip_lint: bool = False,
+                 changed_files: list = None, all_projects: bool = False,
+                 jobs: int = DEFAULT_JOBS, timeout: int = DEFAULT_TIMEOUT,
+                 skip_acceptance: bool = False, acceptance_timeout: int = ACCEPTANCE_TIMEOUT,
+                 use_cache: bool = True, skip_audit: bool = False):
+        self.task_file = task_file
+        self.project_root = project_root
+        self.skip_lint = skip_lint
+        self.changed_files = changed_files
+        self.all_projects = all_projects
+        self.jobs = jobs
+        self.timeout = timeout
+        self.skip_acceptance = skip_acceptance
+        self.acceptance_timeout = acceptance_timeout
+        self.use_cache = use_cache
+        self.skip_audit = skip_audit
+        self.graph = None
+        self.progress = None   # 最近一次解析任务文档得到的进度统计
+        self.suggestions = []  # 最近一次分析得到的调整建议
+        self.window = []       # 参与产出物检查的任务（最近完成的 5 个）
+        self.artifacts = {}    # task_id -> 产出物检查结果
+        self.projects = None   # 工作区项目缓存
+        self.lint = {}         # (location, adapter) -> 检查结果
+        self.accepting = []    # 声明了验收命令的已完成任务
+        self.acceptance = {}   # task_id -> 验收结果
+        self.acceptance_inputs = {}    # task_id -> 上次执行时的 (验收命令, 相关文件)
+        self.audit = None      # 提交归属审计结果
+
+    def _parse(self, report: dict):
+        self.graph = TaskGraph.load(self.task_file)
+        status_count = self.graph.status_counts()
+        report['progress'] = {
+            'total': self.graph.total,
+            'completed': status_count['completed'],
+            'in_progress': status_count['in_progress'],
+            'failed': status_count['failed'],
+            'pending': status_count['pending'],
+        }
+        recently_completed = [task for task in self.graph if task.status == 'completed']
+        self.window = [task.id for task in recently_completed[-5:]  # 检查最近5个
+                       if task.related_files]
+        self.accepting = [task.id for task in recently_completed
+                          if parse_commands(task.get(ACCEPTANCE_FIELD))]
+
+    def _check_artifacts(self, task_ids: list):
+        for task_id in task_ids:
+            files = self.graph.get(task_id).related_files
+            self.artifacts[task_id] = {
+                'task': task_id,
+                'files': files,
+                'missing': check_file_exists(self.project_root, files),
+            }
+
+    def _run_lint(self, changed_files: list):
+        """检查受 changed_files 影响的项目（None 表示全部项目），结果合并到缓存"""
+        if self.projects is None:
+            self.projects = discover_projects(self.project_root)
+        projects = self.projects
+        if changed_files is not None:
+            projects = select_affected(projects, changed_files)
+        checked = {p['rel'] or '.' for p in projects}
+        self.lint = {key: r for key, r in self.lint.items() if key[0] not in checked}
+        for result in run_checks(build_jobs(projects), self.jobs, self.timeout):
+            self.lint[(result['location'], result['adapter'])] = result
+
+    def _acceptance_input(self, task_id: str) -> tuple:
+        task = self.graph.get(task_id)
+        return tuple(parse_commands(task.get(ACCEPTANCE_FIELD))), tuple(task.related_files)
+
+    def _run_acceptance(self, task_ids: list):
+        tasks = [self.graph.get(tid) for tid in task_ids]
+        for tid in task_ids:
+            self.acceptance_inputs[tid] = self._acceptance_input(tid)
+        for result in run_acceptance(self.task_file, self.project_root, tasks, self.jobs,
+                                     self.acceptance_timeout, self.use_cache, self.accepting):
+            self.acceptance[result['task']] = result
+
+    def _report(self, report: dict, timer: 'PhaseTimer') -> dict:
+        report['artifacts'] = [self.artifacts[tid] for tid in self.window]
+        report['lint'] = None if self.skip_lint else [self.lint[k] for k in sorted(self.lint)]
+        report['acceptance'] = None if self.skip_acceptance else [
+            self.acceptance[tid] for tid in self.accepting]
+        report['audit'] = None if self.skip_audit else self.audit
+        report['timings'] = timer.phases
+        return report
+
+    def full(self) -> dict:
+        """执行全部检查，返回结构化报告"""
+        timer = PhaseTimer()
+        report = {}
+
+        with timer.phase('parse'):
+            self._parse(report)
+
+        with timer.phase('artifacts'):
+            self.artifacts = {}
+            self._check_artifacts(self.window)
+
+        # Lint 检查（可选，耗时较长）
+        if not self.skip_lint:
+            if self.all_projects:
+                changed_files = None
+            elif self.changed_files is not None:
+                changed_files = self.changed_files
+            else:
+                round_files = [f for tid in self.window for f in self.graph.get(tid).related_files]
+                changed_files = round_files or None
+            with timer.phase('lint'):
+                self.lint = {}
+                self._run_lint(changed_files)
+
+        if not self.skip_acceptance:
+            with timer.phase('acceptance'):
+                self.acceptance = {}
+                self._run_acceptance(self.accepting)
+
+        if not self.skip_audit:
+            with timer.phase('audit'):
+                self.audit = audit(self.task_file, self.project_root, self.graph)
+
+        with timer.phase('analysis'):
+            report['suggestions'] = analyze_task_adjustments(self.graph)
+        self.suggestions = report['suggestions']
+        self.progress = report['progress']
+
+        return self._report(report, timer)
+
+    def update(self, changed_paths: set) -> dict:
+        """根据变更路径（绝对路径）增量刷新报告"""
+        if self.graph is None:
+            return self.full()     # 尚未执行过完整检查，没有可增量刷新的状态
+        timer = PhaseTimer()
+        report = {'progress': self.progress, 'suggestions': self.suggestions}
+        root = self.project_root.resolve()
+        task_file = self.task_file.resolve()
+
+        changed = []
+        for path in changed_paths:
+            path = Path(path)
+            if path == task_file:
+                continue
+            try:
+                changed.append(path.relative_to(root).as_posix())
+            except ValueError:
+                pass
+
+        entered = []
+        if str(task_file) in changed_paths:
+            with timer.phase('parse'):
+                previous = set(self.window)
+                self._parse(report)
+                entered = [tid for tid in self.window if tid not in previous]
+
+        with timer.phase('artifacts'):
+            stale = [tid for tid in self.window
+                     if tid in entered or tid not in self.artifacts
+                     or any(_overlaps(c, f) for c in changed
+                            for f in self.graph.get(tid).related_files)]
+            self._check_artifacts(stale)
+            self.artifacts = {tid: self.artifacts[tid] for tid in self.window}
+
+        if not self.skip_lint:
+            # 新增或删除了项目标记文件时重新发现项目
+            markers = {m for adapter in ADAPTERS for m in adapter['markers']}
+            if any(Path(c).name in markers for c in changed):
+                self.projects = None
+            lint_files = changed + [f for tid in entered for f in self.graph.get(tid).related_files]
+            if lint_files:
+                with timer.phase('lint'):
+                    self._run_lint(lint_files)
+
+        if not self.skip_acceptance:
+            # 任务文档中修改了验收命令或相关文件的任务同样需要重新执行（缓存键随之变化）
+            stale = [tid for tid in self.accepting
+                     if tid not in self.acceptance
+                     or self.acceptance_inputs.get(tid) != self._acceptance_input(tid)
+                     or any(_overlaps(c, f) for c in changed
+                            for f in self.graph.get(tid).related_files)]
+            if stale:
+                with timer.phase('acceptance'):
+                    self._run_acceptance(stale)
+            self.acceptance = {tid: self.acceptance[tid] for tid in self.accepting}
+            self.acceptance_inputs = {tid: self.acceptance_inputs[tid] for tid in self.accepting}
+
+        # 提交不改动工作区文件（.git 不在监听范围内）；agent 提交后会更新任务文档，届时扫描新提交
+        if not self.skip_audit and str(task_file) in changed_paths:
+            with timer.phase('audit'):
+                self.audit = audit(self.task_file, self.project_root, self.graph)
+
+        if entered or str(task_file) in changed_paths:
+            with timer.phase('analysis'):
+                report['suggestions'] = analyze_task_adjustments(self.graph)
+            self.suggestions = report['suggestions']
+            self.progress = report['progress']
+
+        return self._report(report, timer)
+
+
+def run_checkpoint(task_file: Path, project_root: Path, **options) -> dict:
+    """执行一次完整检查点，返回结构化报告"""
+    return Checkpoint(task_file, project_root, **options).full()
+
+
+def write_report_file(report: dict, path: Path):
+    """原子写入最新报告（JSON），供编排脚本在一轮结束时直接读取"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def watch_checkpoint(checkpoint: Checkpoint, output_format: str, report_path: Path = None,
+                     debounce: float = DEFAULT_DEBOUNCE, polling: bool = False):
+    """监听项目目录和任务文档，变更后只重跑受影响的检查"""
+    render = print_json_report if output_format == 'json' else print_text_report
+
+    report = checkpoint.full()
+    render(report)
+    if report_path:
+        write_report_file(report, report_path)
+
+    ignored = {str(report_path.resolve()), str(report_path.resolve()) + '.tmp'} if report_path else set()
+    # 验收结果缓存、审计状态（及其原子写入的临时文件）由本进程写入，不触发重新检查
+    own_writes = [(str(path), str(path.with_name(f".{path.name}.")))
+                  for path in (cache_path(checkpoint.task_file).resolve(),
+                               state_path(checkpoint.task_file).resolve())]
+    watcher = create_watcher(
+        [(checkpoint.project_root.resolve(), True), (checkpoint.task_file.resolve(), False)],
+        polling=polling
+    )
+    try:
+        while True:
+            changed = {p for p in wait_for_changes(watcher, debounce) - ignored
+                       if not any(p == path or p.startswith(tmp) for path, tmp in own_writes)}
+            if not changed:
+                continue
+            report = checkpoint.update(changed)
+            if output_format == 'json':
+                print(json.dumps({'type': 'update', 'changed': sorted(changed)}, ensure_ascii=False))
+            else:
+                print(f"\n🔄 检测到 {len(changed)} 处变更，已重新检查")
+            render(report)
+            sys.stdout.flush()
+            if report_path:
+                write_report_file(report, report_path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def print_text_report(report: dict):
+    """输出人类可读的检查点报告"""
     print("=" * 60)
     print("检查点报告")
     print("=" * 60)
-    
-    # 统计
-    status_count = defaultdict(int)
-    for info in tasks.values():
-        status_count[info['status']] += 1
-    
-    total = len(tasks)
-    completed = status_count['completed']
-    in_progress = status_count['in_progress']
-    failed = status_count['failed']
-    pending = status_count['pending']
-    
+
+    progress = report['progress']
+    total = progress['total']
+    completed = progress['completed']
+    in_progress = progress['in_progress']
+    failed = progress['failed']
+    pending = progress['pending']
+
     print(f"\n📊 进度统计")
     print(f"  总任务数: {total}")
-    print(f"  已完成: {completed} ({completed/total*100:.1f}%)")
+    print(f"  已完成: {completed} ({completed/max(total, 1)*100:.1f}%)")
     print(f"  进行中: {in_progress}")
     print(f"  失败: {failed}")
     print(f"  待执行: {pending}")
-    
-    # 检查最近完成的任务的产出
+
     print(f"\n📁 产出物检查")
-    recently_completed = [tid for tid, info in tasks.items() if info['status'] == 'completed']
-    all_missing = []
-    for task_id in recently_completed[-5:]:  # 检查最近5个
-        info = tasks[task_id]
-        if info['related_files']:
-            missing = check_file_exists(project_root, info['related_files'])
-            if missing:
-                all_missing.extend([(task_id, f) for f in missing])
-    
+    all_missing = [(a['task'], f) for a in report['artifacts'] for f in a['missing']]
     if all_missing:
         print("  ⚠️ 以下文件未找到:")
         for task_id, file in all_missing:
             print(f"    - {task_id}: {file}")
     else:
         print("  ✓ 产出物检查通过")
-    
-    # Lint 检查（可选，耗时较长）
+
     print(f"\n🔍 代码检查")
-    if '--skip-lint' in sys.argv:
+    if report['lint'] is None:
         print("  (跳过)")
     else:
-        lint_errors = check_lint_errors(project_root)
+        lint_errors = [r for r in report['lint'] if not r['ok']]
         if lint_errors:
             print("  ⚠️ 发现 lint 错误:")
-            for location, error in lint_errors.items():
-                print(f"    [{location}]")
+            for result in lint_errors:
+                print(f"    [{result['location']}]")
                 # 只显示前5行
-                for line in error.split('\n')[:5]:
+                for line in result['output'].split('\n')[:5]:
                     print(f"      {line}")
         else:
             print("  ✓ 无 lint 错误")
-    
-    # 任务调整建议
+
+    print(f"\n✅ 验收命令")
+    if report['acceptance'] is None:
+        print("  (跳过)")
+    elif not report['acceptance']:
+        print("  (没有声明验收命令的已完成任务)")
+    else:
+        failures = [r for r in report['acceptance'] if not r['ok']]
+        cached = sum(1 for r in report['acceptance'] if r['cached'])
+        if failures:
+            print("  ⚠️ 验收未通过:")
+            for result in failures:
+                for command in result['commands']:
+                    if command['ok']:
+                        continue
+                    reason = '超时' if command['timed_out'] else '失败'
+                    print(f"    - {result['task']}: {command['command']}（{reason}）")
+                    for line in command['output'].strip().split('\n')[-3:]:
+                        print(f"        {line}")
+        else:
+            print(f"  ✓ {len(report['acceptance'])} 个任务验收通过")
+        if cached:
+            print(f"  （{cached} 个任务相关文件未变化，使用缓存结果）")
+
+    print(f"\n🔗 提交归属")
+    if report['audit'] is None:
+        print("  (跳过)")
+    else:
+        print_audit(report['audit'])
+
     print(f"\n💡 调整建议")
-    suggestions = analyze_task_adjustments(tasks)
-    if suggestions:
-        for s in suggestions:
+    if report['suggestions']:
+        for s in report['suggestions']:
             print(f"  [{s['type']}] {s['message']}")
             print(f"    → {s['action']}")
     else:
         print("  ✓ 无需调整")
-    
+
     # 下一步行动
     print(f"\n🚀 下一步")
     if failed > 0:
@@ -229,9 +475,90 @@ def main():
         print(f"  3. 运行 next_task.py 查看可执行任务")
     else:
         print("  🎉 所有任务已完成!")
-    
+
+    if '--timing' in sys.argv:
+        print(f"\n⏱ 阶段耗时")
+        for t in report['timings']:
+            print(f"  {t['phase']:<10} wall {t['wall_ms']:>9.1f} ms  cpu {t['cpu_ms']:>9.1f} ms")
+        for r in report['lint'] or []:
+            cpu = f"{r['cpu_ms']:>9.1f} ms" if r['cpu_ms'] is not None else '        -'
+            print(f"  lint:{r['location']:<5} wall {r['wall_ms']:>9.1f} ms  cpu {cpu}")
+
     print("\n" + "=" * 60)
 
 
+def print_json_report(report: dict):
+    """以 JSON Lines 输出检查点报告，每行一条记录（type 字段区分记录类型）"""
+    def emit(record: dict):
+        print(json.dumps(record, ensure_ascii=False))
+
+    emit({'type': 'progress', **report['progress']})
+    for artifact in report['artifacts']:
+        emit({'type': 'artifact', **artifact})
+    for result in report['lint'] or []:
+        emit({'type': 'lint', **result})
+    for result in report['acceptance'] or []:
+        emit({'type': 'acceptance', **result})
+    if report['audit'] is not None:
+        emit({'type': 'audit', **report['audit']})
+    for suggestion in report['suggestions']:
+        emit({'type': 'suggestion', **suggestion})
+    for timing in report['timings']:
+        emit({'type': 'timing', **timing})
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("用法: python checkpoint.py <任务文档路径> <项目根目录> [选项]")
+        sys.exit(1)
+    
+    task_file = Path(sys.argv[1])
+    project_root = Path(sys.argv[2])
+    output_format = get_option('--format', 'text')
+    
+    if output_format not in ('text', 'json'):
+        print(f"✗ 不支持的输出格式: {output_format}")
+        sys.exit(1)
+    
+    if not task_file.exists():
+        print(f"✗ 任务文档不存在: {task_file}")
+        sys.exit(1)
+    
+    changed = get_option('--changed')
+    checkpoint = Checkpoint(
+        task_file,
+        project_root,
+        skip_lint='--skip-lint' in sys.argv,
+        changed_files=[f.strip() for f in changed.split(',')] if changed else None,
+        all_projects='--all-projects' in sys.argv,
+        jobs=int(get_option('--lint-jobs', DEFAULT_JOBS)),
+        timeout=int(get_option('--lint-timeout', DEFAULT_TIMEOUT)),
+        skip_acceptance='--skip-acceptance' in sys.argv,
+        acceptance_timeout=int(get_option('--acceptance-timeout', ACCEPTANCE_TIMEOUT)),
+        use_cache='--no-cache' not in sys.argv,
+        skip_audit='--skip-audit' in sys.argv
+    )
+    report_path = Path(get_option('--report')) if get_option('--report') else None
+    
+    if '--watch' in sys.argv:
+        watch_checkpoint(
+            checkpoint,
+            output_format,
+            report_path,
+            debounce=float(get_option('--debounce', DEFAULT_DEBOUNCE)),
+            polling='--poll' in sys.argv
+        )
+        return
+    
+    report = checkpoint.full()
+    if report_path:
+        write_report_file(report, report_path)
+    
+    if output_format == 'json':
+        print_json_report(report)
+    else:
+        print_text_report(report)
+
+
 if __name__ == '__main__':
     main()
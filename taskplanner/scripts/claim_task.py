@@ -2,115 +2,184 @@
 """
 认领任务脚本
 
-用法：python claim_task.py <任务文档路径> <任务ID>
+用法：python claim_task.py <任务文档路径> <任务ID> [--session <会话ID>] [--avoid-conflicts]
+      python claim_task.py <任务文档路径> [任务ID] --wait [--timeout <秒>] [筛选选项]
 
 功能：
-1. 检查任务是否可认领（状态为 pending，依赖已完成）
+1. 检查任务是否可认领（状态为 pending，依赖已完成，资源令牌未用尽）
 2. 生成会话 ID
 3. 更新任务状态为 in_progress
+4. 把任务的相关文件和模块记入会话历史（供 next_task.py --session 按亲和度排序）
+
+选项：
+  --session <会话ID>   沿用已有会话 ID（同一 agent 连续认领时传入上次返回的 ID）
+  --avoid-conflicts    相关文件与进行中任务重叠（同一文件或目录包含关系）时拒绝认领
+
+等待认领（--wait）：
+  阻塞直到有符合条件的任务可认领，随即在文档锁内原子认领；不指定任务 ID 时认领
+  下一个符合筛选条件的可执行任务（排序同 next_task.py，有 --session 时按亲和度）。
+  空闲 agent 不必循环调用 next_task.py：等待期间通过 inotify 监听任务文档的变更
+  （其他平台退回轮询文件状态），只有文档确实变化时才重新解析。
+  --timeout <秒>           最长等待时间，超时未认领到任务时以状态 1 退出（默认一直等待）
+  --module <模块>          只认领指定模块的任务
+  --priority <P0,P1,...>   只认领指定优先级的任务
+  --touches <通配模式>     只认领相关文件与模式有交集的任务
+  --poll                   不使用 inotify，轮询文件状态
+  计划中已没有 pending 和 in_progress 任务时立即返回，不再等待。
 """
 
 import sys
-import re
-import random
-import string
-from datetime import datetime
+import time
 from pathlib import Path
 
+from taskgraph import TaskGraph, TaskError
+from affinity import SessionHistory, rank_for_session
 
-def generate_session_id():
-    """生成会话 ID"""
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=3))
-    return f"session-{timestamp}-{suffix}"
 
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
 
-def parse_tasks(content: str) -> dict:
-    """解析任务文档"""
-    tasks = {}
-    task_pattern = r'### (TASK-\d+):\s*(.+?)(?=\n###|\n## |\Z)'
-    task_matches = re.findall(task_pattern, content, re.DOTALL)
-    
-    for task_id, task_content in task_matches:
-        # 提取状态
-        status_match = re.search(r'\*\*状态\*\*:\s*(\w+)', task_content)
-        status = status_match.group(1) if status_match else 'pending'
-        
-        # 提取依赖
-        dep_match = re.search(r'\*\*依赖\*\*:\s*(.+)', task_content)
-        dependencies = []
-        if dep_match:
-            dep_str = dep_match.group(1).strip()
-            if dep_str != '无' and dep_str != '-':
-                dependencies = re.findall(r'TASK-\d+', dep_str)
-        
-        tasks[task_id] = {
-            'status': status,
-            'dependencies': dependencies
-        }
-    
-    return tasks
 
+def claim_task(file_path: Path, task_id: str, avoid_conflicts: bool = False,
+               session_id: str = None) -> tuple:
+    """认领任务（持有文档锁，保证同一任务只能被一个会话认领）"""
+    try:
+        with TaskGraph.transaction(file_path) as graph:
+            session_id = graph.claim(task_id, session_id, avoid_conflicts=avoid_conflicts)
+            history = SessionHistory.load(file_path)
+            history.record(session_id, graph.get(task_id))
+            history.save(file_path)
+            return True, session_id
+    except TaskError as e:
+        return False, str(e)
 
-def can_claim_task(tasks: dict, task_id: str) -> tuple:
-    """检查任务是否可认领"""
-    if task_id not in tasks:
-        return False, f"任务 {task_id} 不存在"
-    
-    task = tasks[task_id]
-    
-    if task['status'] != 'pending':
-        return False, f"任务状态为 {task['status']}，不可认领"
-    
-    # 检查依赖
-    completed = {tid for tid, info in tasks.items() if info['status'] == 'completed'}
-    unmet_deps = [dep for dep in task['dependencies'] if dep not in completed]
-    
-    if unmet_deps:
-        return False, f"依赖未完成: {', '.join(unmet_deps)}"
-    
-    return True, "可以认领"
 
+def claim_ready(graph: TaskGraph, session_id: str = None, avoid_conflicts: bool = False,
+                **filters) -> tuple:
+    """在已加载（调用方持有文档锁）的计划中认领下一个符合筛选条件的可执行任务，
+    跳过资源已满的任务，有会话 ID 时按亲和度排序；返回 (任务, 会话 ID)，没有可认领任务时返回 (None, None)"""
+    tasks = [task for task in graph.query(avoid_conflicts=avoid_conflicts, **filters)
+             if not graph.exhausted(task)]
+    if not tasks:
+        return None, None
+    history = SessionHistory.load(graph.path)
+    if session_id:
+        tasks = [task for task, _ in rank_for_session(graph, tasks, history.entries(session_id))]
+    task = tasks[0]
+    session_id = graph.claim(task.id, session_id, avoid_conflicts=avoid_conflicts)
+    history.record(session_id, task)
+    history.save(graph.path)
+    return task, session_id
 
-def claim_task(file_path: Path, task_id: str) -> tuple:
-    """认领任务"""
-    content = file_path.read_text(encoding='utf-8')
-    tasks = parse_tasks(content)
-    
-    can_claim, reason = can_claim_task(tasks, task_id)
-    if not can_claim:
-        return False, reason
-    
-    session_id = generate_session_id()
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 更新任务状态
-    old_pattern = rf'(### {task_id}:.*?\n- \*\*状态\*\*:) pending\n- \*\*执行者\*\*: -\n- \*\*认领时间\*\*: -'
-    new_text = rf'\1 in_progress\n- **执行者**: {session_id}\n- **认领时间**: {now}'
-    
-    new_content, count = re.subn(old_pattern, new_text, content, flags=re.DOTALL)
-    
-    if count == 0:
-        return False, "无法更新任务状态，请检查文档格式"
-    
-    file_path.write_text(new_content, encoding='utf-8')
-    return True, session_id
+
+def _try_claim(file_path: Path, task_id: str, session_id: str, avoid_conflicts: bool,
+               filters: dict) -> tuple:
+    """尝试认领一次，返回 (任务 ID, 会话 ID, 不再等待的原因)"""
+    with TaskGraph.transaction(file_path) as graph:
+        if task_id:
+            task = graph.tasks.get(task_id)
+            if task is None and task_id not in graph.archived:
+                return None, None, f"任务 {task_id} 不存在"
+            if task is None or task.status == 'completed':
+                return None, None, f"任务 {task_id} 已完成"
+            try:
+                session_id = graph.claim(task_id, session_id, avoid_conflicts=avoid_conflicts)
+            except TaskError:
+                return None, None, None      # 依赖未完成、冲突、资源已满或已被认领：继续等待
+            history = SessionHistory.load(file_path)
+            history.record(session_id, task)
+            history.save(file_path)
+            return task_id, session_id, None
+        task, session_id = claim_ready(graph, session_id, avoid_conflicts, **filters)
+        if task is not None:
+            return task.id, session_id, None
+        counts = graph.status_counts()
+        if not counts['pending'] and not counts['in_progress']:
+            return None, None, "计划中已没有待执行或进行中的任务"
+        return None, None, None
+
+
+def wait_and_claim(file_path: Path, task_id: str = None, session_id: str = None,
+                   avoid_conflicts: bool = False, timeout: float = None, polling: bool = False,
+                   **filters) -> tuple:
+    """
+    阻塞直到有符合条件的任务可认领并原子认领
+
+    先建立监听再检查，检查与等待之间发生的变更不会丢失；
+    被唤醒后先比较文件状态，文档未变化时不重新解析。
+
+    Returns:
+        tuple: (是否成功, 任务 ID 或失败原因, 会话 ID)
+    """
+    from watcher import create_watcher
+    deadline = None if timeout is None else time.monotonic() + timeout
+    watcher = create_watcher([(file_path.resolve(), False)], polling=polling)
+    stamp = None
+    try:
+        while True:
+            st = file_path.stat()
+            if (st.st_mtime_ns, st.st_size) != stamp:
+                stamp = (st.st_mtime_ns, st.st_size)
+                claimed, session, reason = _try_claim(file_path, task_id, session_id,
+                                                      avoid_conflicts, filters)
+                if claimed:
+                    return True, claimed, session
+                if reason:
+                    return False, reason, None
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False, f"等待 {timeout:g}s 内没有可认领的任务", None
+            watcher.read(remaining)
+    finally:
+        watcher.close()
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("用法: python claim_task.py <任务文档路径> <任务ID>")
+    wait = '--wait' in sys.argv
+    task_id = sys.argv[2].upper() if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
+    if len(sys.argv) < 2 or (task_id is None and not wait):
+        print("用法: python claim_task.py <任务文档路径> <任务ID> [--session 会话ID] [--avoid-conflicts]")
+        print("      python claim_task.py <任务文档路径> [任务ID] --wait [--timeout 秒] [--module 模块] "
+              "[--priority P0,P1] [--touches 通配模式] [--session 会话ID] [--avoid-conflicts] [--poll]")
         sys.exit(1)
     
     file_path = Path(sys.argv[1])
-    task_id = sys.argv[2].upper()
     
     if not file_path.exists():
         print(f"✗ 文件不存在: {file_path}")
         sys.exit(1)
     
-    success, result = claim_task(file_path, task_id)
-    
+    if wait:
+        priority = get_option('--priority')
+        timeout = get_option('--timeout')
+        started = time.monotonic()
+        try:
+            success, result, session_id = wait_and_claim(
+                file_path, task_id, get_option('--session'), '--avoid-conflicts' in sys.argv,
+                timeout=float(timeout) if timeout else None, polling='--poll' in sys.argv,
+                module=get_option('--module'),
+                priorities=[p.strip().upper() for p in priority.split(',')] if priority else None,
+                touches=get_option('--touches'))
+        except KeyboardInterrupt:
+            print("✗ 已取消等待")
+            sys.exit(1)
+        if success:
+            print(f"✓ 任务 {result} 已认领")
+            print(f"  会话 ID: {session_id}")
+            print(f"  等待: {time.monotonic() - started:.1f}s")
+        else:
+            print(f"✗ 认领失败: {result}")
+            sys.exit(1)
+        return
+
+    success, result = claim_task(file_path, task_id, '--avoid-conflicts' in sys.argv,
+                                 get_option('--session'))
+
     if success:
         print(f"✓ 任务 {task_id} 已认领")
         print(f"  会话 ID: {result}")
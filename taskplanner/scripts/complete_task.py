@@ -10,36 +10,18 @@
 """
 
 import sys
-import re
-from datetime import datetime
 from pathlib import Path
 
+from taskgraph import TaskGraph, TaskError
+
 
 def complete_task(file_path: Path, task_id: str, failed: bool = False) -> tuple:
-    """完成/失败任务"""
-    content = file_path.read_text(encoding='utf-8')
-    
-    # 检查任务是否存在且状态为 in_progress
-    task_pattern = rf'### {task_id}:.*?\n- \*\*状态\*\*: (\w+)'
-    match = re.search(task_pattern, content, re.DOTALL)
-    
-    if not match:
-        return False, f"任务 {task_id} 不存在"
-    
-    current_status = match.group(1)
-    if current_status != 'in_progress':
-        return False, f"任务状态为 {current_status}，只能完成 in_progress 状态的任务"
-    
-    new_status = 'failed' if failed else 'completed'
-    
-    # 更新状态
-    old_pattern = rf'(### {task_id}:.*?\n- \*\*状态\*\*:) in_progress'
-    new_text = rf'\1 {new_status}'
-    
-    new_content = re.sub(old_pattern, new_text, content, flags=re.DOTALL)
-    
-    file_path.write_text(new_content, encoding='utf-8')
-    return True, new_status
+    """完成/失败任务（持有文档锁）"""
+    try:
+        with TaskGraph.transaction(file_path) as graph:
+            return True, graph.complete(task_id, failed)
+    except TaskError as e:
+        return False, str(e)
 
 
 def main():
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+任务进度看板 - 把 TASKS.md 生成为单文件静态 HTML，大型计划（数千任务）也能浏览
+
+用法：python dashboard.py <任务文档路径> [输出路径] [选项]
+
+选项：
+  --full        强制全量重新生成（默认在只有状态变化时增量更新）
+  --watch       监听任务文档，变更后自动更新看板
+  --poll        监听时使用轮询（无 inotify 的环境）
+
+输出路径默认为任务文档同目录下的 dashboard.html。看板内容：
+1. 分层 DAG：按依赖深度分层布局，Canvas 只绘制可视区域内的节点和边（虚拟化），
+   点击任务查看详情并高亮其依赖与后续任务，可按 ID 搜索定位
+2. 各模块进度
+3. 剩余工作的关键路径
+4. 阻塞集合：失败 / 进行中任务及被它们（传递）阻塞的未完成任务数
+5. 认领时长：进行中任务已认领多久
+
+生成方式：
+- 流式写出：逐个任务写入文件，不在内存中拼接整个 HTML
+- 增量更新：任务数据分为结构块（ID、名称、依赖、分层布局）和状态块（状态、执行者、
+  统计），状态块位于文件末尾。再次生成时若结构哈希未变，只从记录的偏移处重写状态块，
+  跳过分层布局和结构序列化
+"""
+
+import sys
+import json
+import hashlib
+from datetime import datetime
+from pathlib import Path
+
+from taskgraph import TaskGraph, TIME_FORMAT
+
+
+STATUS_CODES = {'pending': 'p', 'in_progress': 'i', 'completed': 'c', 'failed': 'f'}
+BLOCKED_LIMIT = 30       # 阻塞集合最多展示的任务数
+CACHE_VERSION = 1
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def cache_path(output: Path) -> Path:
+    """看板对应的增量缓存文件（记录结构哈希和状态块偏移）"""
+    return output.with_name(f".{output.name}.cache.json")
+
+
+def structure_key(task) -> tuple:
+    return (task.id, task.name, task.priority, task.module, tuple(task.dependencies),
+            tuple(task.related_files))
+
+
+def structure_hash(graph: TaskGraph) -> str:
+    digest = hashlib.sha1()
+    for task in graph:
+        digest.update(repr(structure_key(task)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def levelize(graph: TaskGraph) -> tuple:
+    """分层布局：层号为到根的最长依赖链长度；层内按依赖的平均行号排序以减少交叉。
+    返回 ({task_id: 层}, {task_id: 行})"""
+    ids = list(graph.tasks)
+    dependents = graph.dependents
+    indegree = {tid: sum(1 for d in graph.tasks[tid].dependencies if d in graph.tasks) for tid in ids}
+    order = [tid for tid in ids if indegree[tid] == 0]
+    level = dict.fromkeys(order, 0)
+    for tid in order:
+        for child in dependents.get(tid, ()):
+            if child in indegree:
+                level[child] = max(level.get(child, 0), level[tid] + 1)
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    order.append(child)
+    # 环上的任务无法分层，放在最后一层之后
+    tail = max(level.values(), default=-1) + 1
+    for tid in ids:
+        level.setdefault(tid, tail)
+
+    by_level = {}
+    for tid in ids:
+        by_level.setdefault(level[tid], []).append(tid)
+    row = {}
+    for lv in sorted(by_level):
+        members = by_level[lv]
+        if lv > 0:
+            def barycenter(tid):
+                rows = [row[d] for d in graph.tasks[tid].dependencies if d in row]
+                return sum(rows) / len(rows) if rows else 0
+            members.sort(key=barycenter)
+        for i, tid in enumerate(members):
+            row[tid] = i
+    return level, row
+
+
+def critical_path(graph: TaskGraph) -> list:
+    """剩余工作的关键路径：从深度最大的未完成任务出发，沿深度最大的后续任务前进；
+    遇到循环依赖时在环处截断（已在路径上的任务不再进入）"""
+    depths = graph.remaining_depths(weighted=True)
+    if not depths:
+        return []
+    open_set = set(depths)
+    starts = [tid for tid in depths
+              if not any(d in open_set for d in graph.tasks[tid].dependencies)]
+    current = max(starts or depths, key=lambda tid: depths[tid])
+    path = [current]
+    visited = {current}
+    while True:
+        children = [c for c in graph.dependents.get(current, ()) if c in open_set and c not in visited]
+        if not children:
+            return path
+        current = max(children, key=lambda tid: depths[tid])
+        path.append(current)
+        visited.add(current)
+
+
+def blocked_sets(graph: TaskGraph) -> list:
+    """失败与进行中任务各自（传递）阻塞的未完成任务，返回 [(task_id, 阻塞的任务 ID 列表)]"""
+    result = []
+    for task in graph:
+        if task.status not in ('failed', 'in_progress'):
+            continue
+        seen = set()
+        stack = list(graph.dependents.get(task.id, ()))
+        while stack:
+            tid = stack.pop()
+            if tid in seen or graph.tasks[tid].status == 'completed':
+                continue
+            seen.add(tid)
+            stack.extend(graph.dependents.get(tid, ()))
+        result.append((task.id, sorted(seen, key=lambda t: graph.index['order'][t])))
+    result.sort(key=lambda item: (graph.tasks[item[0]].status != 'failed', -len(item[1])))
+    return result
+
+
+def claim_ages(graph: TaskGraph, now: datetime) -> list:
+    """进行中任务的认领时长（分钟），从长到短"""
+    ages = []
+    for task in graph:
+        if task.status != 'in_progress':
+            continue
+        try:
+            claimed = datetime.strptime(task.get('认领时间', '-'), TIME_FORMAT)
+        except ValueError:
+            continue
+        ages.append((task.id, round((now - claimed).total_seconds() / 60, 1)))
+    ages.sort(key=lambda item: -item[1])
+    return ages
+
+
+def _json(value) -> str:
+    """嵌入 <script> 的 JSON：转义 </ 防止提前闭合标签"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def write_structure(f, graph: TaskGraph, title: str):
+    """流式写出结构块：每个任务一行 [id, 名称, 层, 行, 优先级, 模块序号, [依赖序号], [相关文件]]"""
+    level, row = levelize(graph)
+    index = {tid: i for i, tid in enumerate(graph.tasks)}
+    modules = sorted({task.module for task in graph})
+    module_index = {m: i for i, m in enumerate(modules)}
+    meta = {
+        'title': title,
+        'modules': modules,
+        'levels': max(level.values(), default=-1) + 1,
+        'rows': max(row.values(), default=-1) + 1,
+    }
+    f.write('<script id="structure" type="application/json">{"meta":')
+    f.write(_json(meta))
+    f.write(',"tasks":[\n')
+    for i, task in enumerate(graph):
+        record = [task.id, task.name, level[task.id], row[task.id], task.priority,
+                  module_index[task.module],
+                  [index[d] for d in task.dependencies if d in index],
+                  task.related_files]
+        f.write((',\n' if i else '') + _json(record))
+    f.write(']}</script>\n')
+
+
+def write_status(f, graph: TaskGraph, now: datetime):
+    """写出状态块（位于文件末尾，增量更新时只重写这一部分）"""
+    index = {tid: i for i, tid in enumerate(graph.tasks)}
+    modules = {}
+    claims = {}
+    for i, task in enumerate(graph):
+        stats = modules.setdefault(task.module, {'total': 0, 'completed': 0, 'in_progress': 0,
+                                                 'failed': 0})
+        stats['total'] += 1
+        if task.status in stats:
+            stats[task.status] += 1
+        if task.status != 'pending':
+            claims[i] = [task.get('执行者', '-'), task.get('认领时间', '-'), task.get('完成时间', '-')]
+
+    counts = graph.status_counts()
+    status = {
+        'generated': now.strftime(TIME_FORMAT),
+        'status': ''.join(STATUS_CODES.get(task.status, 'p') for task in graph),
+        'claims': claims,
+        'summary': {'total': graph.total, **{k: counts[k] for k in STATUS_CODES}},
+        'modules': [[name, s['completed'], s['total'], s['in_progress'], s['failed']]
+                    for name, s in sorted(modules.items())],
+        'critical': [index[tid] for tid in critical_path(graph)],
+        'blocked': [[index[tid], len(ids), [index[t] for t in ids[:BLOCKED_LIMIT]]]
+                    for tid, ids in blocked_sets(graph)],
+        'ages': [[index[tid], minutes] for tid, minutes in claim_ages(graph, now)],
+    }
+    f.write('<script id="status" type="application/json">')
+    f.write(_json(status))
+    f.write('</script>\n')
+
+
+def render_dashboard(file_path: Path, output: Path, full: bool = False, now: datetime = None) -> dict:
+    """生成看板，结构未变时只增量重写状态块。
+    返回 {'mode': 'full'|'status', 'tasks', 'bytes', 'cycle': 循环依赖路径（没有时为空列表）}"""
+    graph = TaskGraph.load(file_path)
+    now = now or datetime.now()
+    digest = structure_hash(graph)
+    cache_file = cache_path(output)
+
+    cache = None
+    if not full and output.exists():
+        try:
+            cache = json.loads(cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            cache = None
+    if (cache and cache.get('version') == CACHE_VERSION and cache.get('hash') == digest
+            and output.stat().st_size >= cache['offset']):
+        with open(output, 'r+', encoding='utf-8', newline='') as f:
+            f.seek(cache['offset'])
+            write_status(f, graph, now)
+            f.write(PAGE_TAIL)
+            f.truncate()
+        return {'mode': 'status', 'tasks': len(graph), 'bytes': output.stat().st_size,
+                'cycle': graph.detect_cycle()}
+
+    title = graph.segments[0].lstrip().split('\n', 1)[0].lstrip('# ').strip() or file_path.name
+    tmp = output.with_name(f".{output.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        f.write(PAGE_HEAD.replace('{{TITLE}}', title.replace('<', '&lt;')))
+        write_structure(f, graph, title)
+        f.flush()
+        offset = f.tell()
+        write_status(f, graph, now)
+        f.write(PAGE_TAIL)
+    tmp.replace(output)
+    cache_file.write_text(json.dumps({'version': CACHE_VERSION, 'hash': digest, 'offset': offset}),
+                          encoding='utf-8')
+    return {'mode': 'full', 'tasks': len(graph), 'bytes': output.stat().st_size,
+            'cycle': graph.detect_cycle()}
+
+
+PAGE_HEAD = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{{TITLE}} - 任务看板</title>
+<style>
+:root {
+    --primary: #6366f1;
+    --bg: #faf8f5;
+    --bg-card: #ffffff;
+    --text: #1a1a1a;
+    --text-muted: #666666;
+    --border: #e5e2dd;
+    --pending: #cbd5e1;
+    --in-progress: #f59e0b;
+    --completed: #059669;
+    --failed: #dc2626;
+}
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; background: var(--bg);
+       color: var(--text); line-height: 1.5; font-size: 14px; }
+header { padding: 16px 24px; border-bottom: 1px solid var(--border); display: flex;
+         align-items: center; gap: 24px; flex-wrap: wrap; }
+header h1 { font-size: 18px; }
+header .muted, .muted { color: var(--text-muted); font-size: 12px; }
+.bar { height: 8px; border-radius: 4px; background: var(--pending); overflow: hidden; display: flex; }
+.bar span { display: block; height: 100%; }
+.summary { flex: 1; min-width: 240px; }
+.layout { display: grid; grid-template-columns: 1fr 360px; height: calc(100vh - 70px); }
+#graph { position: relative; overflow: auto; border-right: 1px solid var(--border); }
+#graph canvas { position: sticky; top: 0; left: 0; display: block; }
+#spacer { position: absolute; top: 0; left: 0; pointer-events: none; }
+aside { overflow: auto; padding: 16px; display: flex; flex-direction: column; gap: 16px; }
+.card { background: var(--bg-card); border: 1px solid var(--border); border-radius: 8px; padding: 12px; }
+.card h2 { font-size: 14px; margin-bottom: 8px; }
+.row { display: flex; justify-content: space-between; gap: 8px; font-size: 12px; margin: 4px 0; }
+.link { color: var(--primary); cursor: pointer; }
+input { width: 100%; padding: 6px 8px; border: 1px solid var(--border); border-radius: 6px; }
+.legend { display: flex; gap: 12px; font-size: 12px; }
+.legend i { display: inline-block; width: 10px; height: 10px; border-radius: 2px; margin-right: 4px; }
+#detail dl { display: grid; grid-template-columns: 72px 1fr; gap: 2px 8px; font-size: 12px; }
+#detail dt { color: var(--text-muted); }
+#detail dd { word-break: break-all; }
+</style>
+</head>
+<body>
+<header>
+  <h1>{{TITLE}}</h1>
+  <div class="summary"><div class="bar" id="progress"></div><div class="muted" id="summary-text"></div></div>
+  <div class="legend">
+    <span><i style="background:var(--pending)"></i>pending</span>
+    <span><i style="background:var(--in-progress)"></i>in_progress</span>
+    <span><i style="background:var(--completed)"></i>completed</span>
+    <span><i style="background:var(--failed)"></i>failed</span>
+  </div>
+</header>
+<div class="layout">
+  <div id="graph"><div id="spacer"></div><canvas id="canvas"></canvas></div>
+  <aside>
+    <input id="search" placeholder="搜索任务 ID，如 TASK-042">
+    <div class="card" id="detail"><h2>任务详情</h2><div class="muted">点击图中的任务查看详情</div></div>
+    <div class="card"><h2>模块进度</h2><div id="modules"></div></div>
+    <div class="card"><h2>关键路径</h2><div id="critical"></div></div>
+    <div class="card"><h2>阻塞集合</h2><div id="blocked"></div></div>
+    <div class="card"><h2>认领时长</h2><div id="ages"></div></div>
+  </aside>
+</div>
+'''
+
+
+PAGE_TAIL = '''<script>
+(function () {
+  var S = JSON.parse(document.getElementById('structure').textContent);
+  var T = JSON.parse(document.getElementById('status').textContent);
+  var tasks = S.tasks, n = tasks.length;
+  var COLW = 200, ROWH = 30, NODEW = 170, NODEH = 22, PAD = 20;
+  var css = getComputedStyle(document.documentElement);
+  var COLORS = { p: css.getPropertyValue('--pending'), i: css.getPropertyValue('--in-progress'),
+                 c: css.getPropertyValue('--completed'), f: css.getPropertyValue('--failed') };
+  var NAMES = { p: 'pending', i: 'in_progress', c: 'completed', f: 'failed' };
+
+  var byId = {}, byLevel = [], dependents = [];
+  for (var i = 0; i < n; i++) {
+    var t = tasks[i];
+    byId[t[0]] = i;
+    (byLevel[t[2]] = byLevel[t[2]] || [])[t[3]] = i;
+    dependents.push([]);
+  }
+  for (i = 0; i < n; i++) tasks[i][6].forEach(function (d) { dependents[d].push(i); });
+  var critical = {};
+  T.critical.forEach(function (i) { critical[i] = true; });
+
+  function esc(s) { return String(s).replace(/[&<>"]/g, function (c) {
+    return { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' }[c]; }); }
+  function link(i) { return '<span class="link" data-task="' + i + '">' + esc(tasks[i][0]) + '</span>'; }
+  function x(i) { return PAD + tasks[i][2] * COLW; }
+  function y(i) { return PAD + tasks[i][3] * ROWH; }
+
+  // 汇总
+  var s = T.summary, bar = document.getElementById('progress');
+  [['c', s.completed], ['i', s.in_progress], ['f', s.failed]].forEach(function (p) {
+    var span = document.createElement('span');
+    span.style.width = (s.total ? 100 * p[1] / s.total : 0) + '%';
+    span.style.background = COLORS[p[0]];
+    bar.appendChild(span);
+  });
+  document.getElementById('summary-text').textContent = s.completed + '/' + s.total + ' 完成，' +
+    s.in_progress + ' 进行中，' + s.failed + ' 失败，' + s.pending + ' 待执行 · 生成于 ' + T.generated;
+
+  document.getElementById('modules').innerHTML = T.modules.map(function (m) {
+    var pct = m[2] ? Math.round(100 * m[1] / m[2]) : 0;
+    return '<div class="row"><span>' + esc(m[0] || '-') + '</span><span>' + m[1] + '/' + m[2] +
+      (m[3] ? ' · ' + m[3] + ' 进行中' : '') + (m[4] ? ' · ' + m[4] + ' 失败' : '') + '</span></div>' +
+      '<div class="bar"><span style="width:' + pct + '%;background:' + COLORS.c + '"></span></div>';
+  }).join('');
+  document.getElementById('critical').innerHTML = T.critical.length
+    ? '<div class="muted">' + T.critical.length + ' 个任务</div>' + T.critical.map(link).join(' → ')
+    : '<div class="muted">所有任务已完成</div>';
+  document.getElementById('blocked').innerHTML = T.blocked.length ? T.blocked.map(function (b) {
+    return '<div class="row"><span>' + link(b[0]) + ' (' + NAMES[T.status[b[0]]] + ')</span><span>阻塞 ' +
+      b[1] + ' 个</span></div><div class="muted">' + b[2].map(link).join(', ') +
+      (b[1] > b[2].length ? ' …' : '') + '</div>';
+  }).join('') : '<div class="muted">没有失败或进行中的任务</div>';
+  document.getElementById('ages').innerHTML = T.ages.length ? T.ages.map(function (a) {
+    var m = a[1], text = m >= 60 ? (m / 60).toFixed(1) + ' 小时' : Math.round(m) + ' 分钟';
+    return '<div class="row"><span>' + link(a[0]) + ' ' + esc((T.claims[a[0]] || [])[0] || '') +
+      '</span><span>' + text + '</span></div>';
+  }).join('') : '<div class="muted">没有进行中的任务</div>';
+
+  // 虚拟化 DAG：只绘制可视区域
+  var graph = document.getElementById('graph'), canvas = document.getElementById('canvas');
+  var ctx = canvas.getContext('2d'), selected = -1, related = {};
+  var spacer = document.getElementById('spacer');
+  spacer.style.width = (PAD * 2 + S.meta.levels * COLW) + 'px';
+  spacer.style.height = (PAD * 2 + S.meta.rows * ROWH) + 'px';
+
+  function resize() {
+    var ratio = window.devicePixelRatio || 1;
+    canvas.width = graph.clientWidth * ratio;
+    canvas.height = graph.clientHeight * ratio;
+    canvas.style.width = graph.clientWidth + 'px';
+    canvas.style.height = graph.clientHeight + 'px';
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    draw();
+  }
+
+  function visible() {
+    var sx = graph.scrollLeft, sy = graph.scrollTop, w = graph.clientWidth, h = graph.clientHeight;
+    var c0 = Math.max(0, Math.floor((sx - PAD) / COLW)), c1 = Math.floor((sx + w - PAD) / COLW);
+    var r0 = Math.max(0, Math.floor((sy - PAD) / ROWH)), r1 = Math.floor((sy + h - PAD) / ROWH);
+    var out = [];
+    for (var c = c0; c <= c1 && c < byLevel.length; c++) {
+      var level = byLevel[c] || [];
+      for (var r = r0; r <= r1 && r < level.length; r++) if (level[r] !== undefined) out.push(level[r]);
+    }
+    return out;
+  }
+
+  function draw() {
+    var sx = graph.scrollLeft, sy = graph.scrollTop;
+    ctx.clearRect(0, 0, graph.clientWidth, graph.clientHeight);
+    ctx.save();
+    ctx.translate(-sx, -sy);
+    var nodes = visible();
+    ctx.lineWidth = 1;
+    nodes.forEach(function (i) {
+      tasks[i][6].forEach(function (d) {
+        var hot = selected >= 0 && (related[i] && related[d]);
+        ctx.strokeStyle = hot ? '#6366f1' : (critical[i] && critical[d] ? '#a5b4fc' : '#e5e2dd');
+        ctx.beginPath();
+        ctx.moveTo(x(d) + NODEW, y(d) + NODEH / 2);
+        ctx.lineTo(x(i), y(i) + NODEH / 2);
+        ctx.stroke();
+      });
+    });
+    ctx.font = '12px -apple-system, sans-serif';
+    ctx.textBaseline = 'middle';
+    nodes.forEach(function (i) {
+      var t = tasks[i], dim = selected >= 0 && !related[i];
+      ctx.globalAlpha = dim ? 0.35 : 1;
+      ctx.fillStyle = COLORS[T.status[i]];
+      ctx.fillRect(x(i), y(i), NODEW, NODEH);
+      if (critical[i] || i === selected) {
+        ctx.strokeStyle = i === selected ? '#1a1a1a' : '#6366f1';
+        ctx.lineWidth = 2;
+        ctx.strokeRect(x(i), y(i), NODEW, NODEH);
+        ctx.lineWidth = 1;
+      }
+      ctx.fillStyle = T.status[i] === 'p' ? '#1a1a1a' : '#ffffff';
+      var label = t[0] + ' ' + t[1];
+      if (label.length > 22) label = label.slice(0, 21) + '…';
+      ctx.fillText(label, x(i) + 6, y(i) + NODEH / 2);
+    });
+    ctx.restore();
+  }
+
+  function select(i, scroll) {
+    selected = i;
+    related = {};
+    related[i] = true;
+    tasks[i][6].forEach(function (d) { related[d] = true; });
+    dependents[i].forEach(function (d) { related[d] = true; });
+    var t = tasks[i], claim = T.claims[i] || ['-', '-', '-'];
+    document.getElementById('detail').innerHTML = '<h2>' + esc(t[0] + ': ' + t[1]) + '</h2><dl>' +
+      '<dt>状态</dt><dd>' + NAMES[T.status[i]] + (critical[i] ? '（关键路径）' : '') + '</dd>' +
+      '<dt>优先级</dt><dd>' + esc(t[4]) + '</dd>' +
+      '<dt>模块</dt><dd>' + esc(S.meta.modules[t[5]] || '-') + '</dd>' +
+      '<dt>执行者</dt><dd>' + esc(claim[0]) + '</dd>' +
+      '<dt>认领时间</dt><dd>' + esc(claim[1]) + '</dd>' +
+      '<dt>完成时间</dt><dd>' + esc(claim[2] || '-') + '</dd>' +
+      '<dt>依赖</dt><dd>' + (t[6].map(link).join(', ') || '无') + '</dd>' +
+      '<dt>后续任务</dt><dd>' + (dependents[i].map(link).join(', ') || '无') + '</dd>' +
+      '<dt>相关文件</dt><dd>' + esc(t[7].join(', ') || '-') + '</dd></dl>';
+    if (scroll) {
+      graph.scrollLeft = x(i) - graph.clientWidth / 2 + NODEW / 2;
+      graph.scrollTop = y(i) - graph.clientHeight / 2;
+    }
+    draw();
+  }
+
+  graph.addEventListener('scroll', function () { window.requestAnimationFrame(draw); });
+  window.addEventListener('resize', resize);
+  graph.addEventListener('click', function (e) {
+    var rect = graph.getBoundingClientRect();
+    var px = e.clientX - rect.left + graph.scrollLeft - PAD, py = e.clientY - rect.top + graph.scrollTop - PAD;
+    var c = Math.floor(px / COLW), r = Math.floor(py / ROWH);
+    var i = (byLevel[c] || [])[r];
+    if (i !== undefined && px - c * COLW <= NODEW && py - r * ROWH <= NODEH) select(i, false);
+  });
+  document.addEventListener('click', function (e) {
+    var target = e.target.getAttribute && e.target.getAttribute('data-task');
+    if (target !== null && target !== undefined) select(+target, true);
+  });
+  document.getElementById('search').addEventListener('keydown', function (e) {
+    if (e.key !== 'Enter') return;
+    var q = this.value.trim().toUpperCase();
+    if (/^\\d+$/.test(q)) q = 'TASK-' + ('00' + q).slice(-Math.max(3, q.length));
+    if (byId[q] !== undefined) select(byId[q], true);
+  });
+  resize();
+})();
+</script>
+</body>
+</html>
+'''
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python dashboard.py <任务文档路径> [输出路径] [--full] [--watch] [--poll]")
+        sys.exit(1)
+
+    file_path = Path(sys.argv[1])
+    if not file_path.exists():
+        print(f"✗ 文件不存在: {file_path}")
+        sys.exit(1)
+    positional = [a for a in sys.argv[2:] if not a.startswith('--')]
+    output = Path(positional[0]) if positional else file_path.with_name('dashboard.html')
+
+    def run(full: bool):
+        result = render_dashboard(file_path, output, full=full)
+        mode = '全量生成' if result['mode'] == 'full' else '增量更新状态'
+        print(f"✓ 看板已{mode}: {output}（{result['tasks']} 个任务，{result['bytes'] / 1024:.0f} KB）",
+              flush=True)
+        if result['cycle']:
+            print(f"⚠️ 循环依赖: {' -> '.join(result['cycle'])}（关键路径在环处截断，"
+                  f"请用 validate_dag.py 检查）", flush=True)
+
+    run('--full' in sys.argv)
+    if '--watch' not in sys.argv:
+        return
+
+    from watcher import create_watcher, wait_for_changes
+    watcher = create_watcher([(file_path.resolve(), False)], polling='--poll' in sys.argv)
+    print("监听任务文档变更中（Ctrl+C 退出）...", flush=True)
+    try:
+        while True:
+            if wait_for_changes(watcher):
+                run(False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()
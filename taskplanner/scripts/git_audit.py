@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+提交归属审计 - 把各会话的 git 提交对应到认领的任务，供 checkpoint.py 使用
+
+用法：python git_audit.py <任务文档路径> <项目根目录> [--rescan] [--json]
+      python git_audit.py --install-hook [项目目录]
+
+选项：
+  --rescan        忽略上次审计位置，从头扫描提交历史
+  --json          输出 JSON
+  --install-hook  安装 prepare-commit-msg 钩子：环境变量 TASKPLANNER_SESSION / TASKPLANNER_TASK
+                  存在时自动为提交追加 Task-Session / Task-Id 尾注（run_plan.py 会为 agent 设置）
+
+提交通过尾注标明会话（也可手动添加）：
+
+    git commit -m "实现登录 API" --trailer "Task-Session: session-20260129-153000-a1b"
+
+- 每次审计只用一次 git log 流式读取上次审计提交（保存在任务文档旁的 .<文件名>.audit.json）
+  之后的新提交，开销与新提交数成正比；历史被改写（上次的提交不再是 HEAD 的祖先）时从头扫描
+- 提交按 Task-Id 尾注，或按 Task-Session 对应到该会话执行的任务（会话先后执行多个任务时
+  按提交时间落在认领 ~ 完成时间内、再按相关文件重叠程度选择）
+- 报告：各任务的提交数与改动文件、不在任务相关文件中的改动（未声明文件）、
+  已完成但没有任何提交的任务、无法对应到任务的会话
+"""
+
+import os
+import sys
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from taskgraph import TaskGraph, archive_path, parse_time
+from path_index import glob_match
+
+
+SESSION_TRAILER = 'Task-Session'
+TASK_TRAILER = 'Task-Id'
+SESSION_ENV = 'TASKPLANNER_SESSION'
+TASK_ENV = 'TASKPLANNER_TASK'
+HOOK_MARKER = '# taskplanner: task trailers'
+LOG_FORMAT = (f'%x1e%H%x1f%ct%x1f%(trailers:key={SESSION_TRAILER},valueonly,separator=%x2C)'
+              f'%x1f%(trailers:key={TASK_TRAILER},valueonly,separator=%x2C)%x1f')
+READ_CHUNK = 1 << 16
+
+HOOK_SCRIPT = f"""#!/bin/sh
+{HOOK_MARKER}
+# 由 git_audit.py --install-hook 安装：为 agent 的提交追加会话与任务尾注
+if [ -n "${SESSION_ENV}" ]; then
+  git interpret-trailers --in-place --if-exists addIfDifferent \\
+    --trailer "{SESSION_TRAILER}: ${SESSION_ENV}" "$1"
+fi
+if [ -n "${TASK_ENV}" ]; then
+  git interpret-trailers --in-place --if-exists addIfDifferent \\
+    --trailer "{TASK_TRAILER}: ${TASK_ENV}" "$1"
+fi
+"""
+
+
+def state_path(task_file: Path) -> Path:
+    """任务文档对应的审计状态文件路径"""
+    task_file = Path(task_file)
+    return task_file.with_name(f".{task_file.name}.audit.json")
+
+
+def load_state(task_file: Path) -> dict:
+    try:
+        return json.loads(state_path(task_file).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(task_file: Path, state: dict):
+    from plan_lock import atomic_write
+    atomic_write(state_path(task_file), json.dumps(state, ensure_ascii=False, indent=1))
+
+
+def _git(project_root: Path, *args) -> str:
+    """执行 git 命令，失败（不是仓库、没有提交、未安装 git）时返回 None"""
+    try:
+        result = subprocess.run(['git', *args], cwd=project_root, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _split(value: str) -> list:
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _parse_record(record: bytes) -> dict:
+    sha, timestamp, sessions, tasks, files = record.decode('utf-8', 'replace').split('\x1f', 4)
+    return {'sha': sha, 'time': int(timestamp), 'sessions': _split(sessions),
+            'tasks': _split(tasks), 'files': [f for f in files.lstrip('\0\n').split('\0') if f]}
+
+
+def iter_commits(project_root: Path, since: str = None):
+    """
+    流式读取 since（不含）之后到 HEAD 的提交，按时间从旧到新
+
+    只启动一个 git log 进程，逐块读取输出并按记录分隔符切分，不把整个历史读入内存。
+    路径相对于项目根目录（--relative），项目目录之外的改动不计入。
+
+    Yields:
+        dict: {'sha', 'time', 'sessions', 'tasks', 'files'}
+    """
+    revision = f"{since}..HEAD" if since else 'HEAD'
+    proc = subprocess.Popen(['git', 'log', '--reverse', '--relative', '--name-only', '-z',
+                             f'--format={LOG_FORMAT}', revision],
+                            cwd=project_root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    buffer = b''
+    try:
+        while True:
+            chunk = proc.stdout.read(READ_CHUNK)
+            if not chunk:
+                break
+            *records, buffer = (buffer + chunk).split(b'\x1e')   # 最后一段可能不完整，留到下一块
+            for record in records:
+                if record:
+                    yield _parse_record(record)
+        if buffer:
+            yield _parse_record(buffer)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def _is_ancestor(project_root: Path, sha: str) -> bool:
+    try:
+        return subprocess.run(['git', 'merge-base', '--is-ancestor', sha, 'HEAD'], cwd=project_root,
+                              capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def attribute(graph: TaskGraph, commit: dict, by_session: dict) -> str:
+    """提交 -> 任务 ID：Task-Id 尾注优先，其次按会话执行过的任务、提交时间和相关文件选择"""
+    for tid in commit['tasks']:
+        tid = tid.upper()
+        if tid in graph or tid in graph.archived:
+            return tid
+    candidates = [task for session in commit['sessions'] for task in by_session.get(session, ())]
+    if len(candidates) <= 1:
+        return candidates[0].id if candidates else None
+
+    def window(task):
+        claimed = parse_time(task.get('认领时间'))
+        finished = parse_time(task.get('完成时间'))
+        return claimed, finished
+
+    moment = datetime.fromtimestamp(commit['time'])
+    within = [task for task in candidates
+              if (window(task)[0] or moment) <= moment <= (window(task)[1] or moment)]
+    pool = within or candidates
+
+    def overlap(task):
+        return sum(1 for f in commit['files']
+                   if any(glob_match(pattern, f) for pattern in task.related_files))
+
+    best = max(pool, key=lambda task: (overlap(task), window(task)[0] or datetime.min))
+    return best.id
+
+
+def _plan_files(task_file: Path, project_root: Path) -> tuple:
+    """任务文档本身、归档文件和旁路文件（.<文件名>.*）不计入任务的改动"""
+    try:
+        base = os.path.relpath(Path(task_file).resolve(), Path(project_root).resolve())
+    except ValueError:
+        return set(), None
+    directory = os.path.dirname(base)
+    archive = os.path.join(directory, archive_path(task_file).name)
+    return {base.replace(os.sep, '/'), archive.replace(os.sep, '/')}, f".{Path(task_file).name}."
+
+
+def audit(task_file: Path, project_root: Path, graph: TaskGraph = None, rescan: bool = False) -> dict:
+    """
+    增量扫描新提交并更新审计状态
+
+    Returns:
+        dict: {'repository': 是否为 git 仓库, 'head', 'scanned': 本次扫描的提交数,
+               'rescanned': 是否从头扫描, 'tagged' / 'untagged': 累计带 / 不带会话尾注的提交数,
+               'tasks': {任务ID: {'commits', 'files', 'undeclared'}},
+               'no_commits': [已完成但没有提交的任务], 'unmatched': {会话: 提交数}}
+    """
+    project_root = Path(project_root)
+    head = _git(project_root, 'rev-parse', 'HEAD')
+    if head is None:
+        return {'repository': False}
+    graph = graph or TaskGraph.load(task_file)
+    state = {} if rescan else load_state(task_file)
+    rescanned = not state.get('head') or not _is_ancestor(project_root, state['head'])
+    if rescanned:
+        state = {}
+    tasks = state.setdefault('tasks', {})
+    unmatched = state.setdefault('unmatched', {})
+    state.setdefault('tagged', 0)
+    state.setdefault('untagged', 0)
+
+    scanned = 0
+    if state.get('head') != head:
+        by_session = {}
+        for task in graph:
+            executor = task.get('执行者', '-')
+            if executor != '-':
+                by_session.setdefault(executor, []).append(task)
+        plan_files, sidecar = _plan_files(task_file, project_root)
+        for commit in iter_commits(project_root, state.get('head')):
+            scanned += 1
+            if not commit['sessions'] and not commit['tasks']:
+                state['untagged'] += 1
+                continue
+            state['tagged'] += 1
+            tid = attribute(graph, commit, by_session)
+            if tid is None:
+                for session in commit['sessions']:
+                    unmatched[session] = unmatched.get(session, 0) + 1
+                continue
+            entry = tasks.setdefault(tid, {'commits': [], 'files': []})
+            entry['commits'].append(commit['sha'][:12])
+            known = set(entry['files'])
+            for path in commit['files']:
+                if path in plan_files or (sidecar and os.path.basename(path).startswith(sidecar)):
+                    continue
+                if path not in known:
+                    known.add(path)
+                    entry['files'].append(path)
+        state['head'] = head
+        save_state(task_file, state)
+
+    report = {}
+    for tid, entry in tasks.items():
+        task = graph.tasks.get(tid)
+        undeclared = [] if task is None else [
+            path for path in entry['files']
+            if not any(glob_match(pattern, path) for pattern in task.related_files)]
+        report[tid] = {'commits': len(entry['commits']), 'files': entry['files'],
+                       'undeclared': undeclared}
+    # 还没有任何带会话尾注的提交时，不把全部已完成任务都报告为“没有提交”
+    no_commits = [task.id for task in graph
+                  if task.status == 'completed' and task.id not in tasks] if state['tagged'] else []
+    return {'repository': True, 'head': head, 'scanned': scanned, 'rescanned': rescanned,
+            'tagged': state['tagged'], 'untagged': state['untagged'],
+            'tasks': report, 'no_commits': no_commits, 'unmatched': dict(unmatched)}
+
+
+def install_hook(project_root: Path):
+    hooks = _git(project_root, 'rev-parse', '--git-path', 'hooks')
+    if hooks is None:
+        print(f"✗ 不是 git 仓库: {project_root}")
+        sys.exit(1)
+    hook = Path(project_root) / hooks / 'prepare-commit-msg'
+    if hook.exists() and HOOK_MARKER not in hook.read_text(encoding='utf-8', errors='replace'):
+        print(f"✗ 已存在其他 prepare-commit-msg 钩子: {hook}")
+        print(f"  请手动把 git_audit.py 中 HOOK_SCRIPT 的内容并入该钩子")
+        sys.exit(1)
+    hook.parent.mkdir(parents=True, exist_ok=True)
+    hook.write_text(HOOK_SCRIPT, encoding='utf-8')
+    hook.chmod(0o755)
+    print(f"✓ 已安装提交钩子: {hook}")
+    print(f"  设置环境变量 {SESSION_ENV}（及可选的 {TASK_ENV}）后提交会自动带上尾注")
+
+
+def print_audit(result: dict):
+    if not result['repository']:
+        print("  (不是 git 仓库或还没有提交，跳过)")
+        return
+    scope = '从头扫描' if result['rescanned'] else '新增'
+    print(f"  {scope} {result['scanned']} 个提交；累计带会话尾注 {result['tagged']} 个，"
+          f"未带 {result['untagged']} 个")
+    if not result['tagged']:
+        print(f"  ⚠️ 还没有带 {SESSION_TRAILER} 尾注的提交（python git_audit.py --install-hook 安装钩子）")
+        return
+    undeclared = {tid: r['undeclared'] for tid, r in result['tasks'].items() if r['undeclared']}
+    if undeclared:
+        print("  ⚠️ 改动了未在相关文件中声明的文件:")
+        for tid, files in undeclared.items():
+            shown = ', '.join(files[:5]) + (f" 等 {len(files)} 个" if len(files) > 5 else '')
+            print(f"    - {tid}: {shown}")
+    if result['no_commits']:
+        print(f"  ⚠️ 已完成但没有提交: {', '.join(result['no_commits'])}")
+    if result['unmatched']:
+        detail = ', '.join(f"{s} ({n} 个提交)" for s, n in result['unmatched'].items())
+        print(f"  ⚠️ 无法对应到任务的会话: {detail}")
+    if not undeclared and not result['no_commits'] and not result['unmatched']:
+        print(f"  ✓ {len(result['tasks'])} 个任务的提交均在声明范围内")
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--install-hook':
+        install_hook(Path(sys.argv[2]) if len(sys.argv) > 2 else Path('.'))
+        return
+
+    if len(sys.argv) < 3:
+        print("用法: python git_audit.py <任务文档路径> <项目根目录> [--rescan] [--json]")
+        print("      python git_audit.py --install-hook [项目目录]")
+        sys.exit(1)
+
+    task_file = Path(sys.argv[1])
+    project_root = Path(sys.argv[2])
+    if not task_file.exists():
+        print(f"✗ 文件不存在: {task_file}")
+        sys.exit(1)
+
+    result = audit(task_file, project_root, rescan='--rescan' in sys.argv)
+    if '--json' in sys.argv:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    print("🔗 提交归属")
+    print_audit(result)
+    for tid, entry in result.get('tasks', {}).items():
+        print(f"  {tid}: {entry['commits']} 个提交，{len(entry['files'])} 个文件")
+
+
+if __name__ == '__main__':
+    main()
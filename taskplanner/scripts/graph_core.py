@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+数组化的任务图核心 - 任务 ID 映射为连续整数，邻接表与状态存放在紧凑数组中
+
+TaskGraph 按需构建（graph.core），状态 / 优先级变更时原地更新，结构修改时丢弃重建；
+也可以直接从机器格式（.tpk，见 plan_pack.py）构建，不解析 Markdown，用于百万级任务的计划。
+环检测、缺失依赖、孤立任务、可执行任务、按被依赖次数重新评估优先级、失败影响分析都在这里完成。
+
+数据布局（n 个任务、e 条依赖边）：
+  ids          list[str]     任务 ID，下标即整数编号
+  dep_offsets  array('I')    n+1，任务 i 的依赖为 deps[dep_offsets[i]:dep_offsets[i+1]]
+  deps         array('I')    e
+  rev_offsets  array('I')    n+1，反向邻接（依赖任务 i 的任务）
+  rev          array('I')    e
+  status       bytearray     n，STATUS_NAMES 下标
+  priority     bytearray     n，优先级数字（P0 -> 0）
+
+内存预算（64 位 CPython）：
+  每个任务   状态 1 + 优先级 1 + 正反向偏移 8 = 10 字节
+             ID 字符串约 60 字节 + 列表槽位 8 字节
+             按 ID 查找时才建立的 ID -> 编号字典，再加约 100 字节
+  每条边     正向 4 + 反向 4 = 8 字节
+  例：100 万任务、300 万条边约 10 MB + 24 MB + 68 MB ≈ 100 MB（不含按需建立的字典），
+  而完整的 TaskGraph 需要保存每个任务的原文块和解析出的字段，约每任务 3 KB。
+"""
+
+from array import array
+from collections import Counter
+
+from taskgraph import STATUSES, PRIORITY_PATTERN
+
+
+STATUS_NAMES = STATUSES + ('other',)     # other: 非标准状态，既不可执行也不算完成
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+PENDING = STATUS_CODES['pending']
+IN_PROGRESS = STATUS_CODES['in_progress']
+COMPLETED = STATUS_CODES['completed']
+FAILED = STATUS_CODES['failed']
+
+
+def priority_code(priority: str) -> int:
+    match = PRIORITY_PATTERN.match(priority)
+    return min(int(match.group(0)[1:]), 255) if match else 2
+
+
+def _reverse(n: int, offsets: array, targets: array) -> tuple:
+    """由正向 CSR 计数排序得到反向 CSR，同一任务的后续任务保持文档顺序"""
+    counts = array('I', bytes(4 * (n + 1)))
+    for t in targets:
+        counts[t + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    rev_offsets = array('I', counts)
+    rev = array('I', bytes(4 * len(targets)))
+    for i in range(n):
+        for k in range(offsets[i], offsets[i + 1]):
+            t = targets[k]
+            rev[counts[t]] = i
+            counts[t] += 1
+    return rev_offsets, rev
+
+
+class GraphCore:
+    """整数编号的任务图：只保存依赖结构、状态和优先级"""
+
+    def __init__(self, ids: list, dep_offsets: array, deps: array, status: bytearray,
+                 priority: bytearray, missing: list = None, archived_deps: set = None):
+        self.ids = ids
+        self.dep_offsets = dep_offsets
+        self.deps = deps
+        self.status = status
+        self.priority = priority
+        self.missing = missing or []     # [(编号, 依赖 ID)]：引用了不存在的任务，不进入邻接表
+        self.archived_deps = archived_deps or set()   # 依赖了已归档任务的编号（已满足，不进入邻接表）
+        self.rev_offsets, self.rev = _reverse(len(ids), dep_offsets, deps)
+        self._index = None
+
+    @classmethod
+    def from_graph(cls, graph) -> 'GraphCore':
+        ids = list(graph.tasks)
+        index = {tid: i for i, tid in enumerate(ids)}
+        offsets, deps, missing, archived_deps = array('I', [0]), array('I'), [], set()
+        status, priority = bytearray(len(ids)), bytearray(len(ids))
+        for i, task in enumerate(graph.tasks.values()):
+            for dep in task.dependencies:
+                j = index.get(dep)
+                if j is not None:
+                    deps.append(j)
+                elif dep in graph.archived:
+                    archived_deps.add(i)
+                else:
+                    missing.append((i, dep))
+            offsets.append(len(deps))
+            status[i] = STATUS_CODES.get(task.status, STATUS_CODES['other'])
+            priority[i] = priority_code(task.priority)
+        core = cls(ids, offsets, deps, status, priority, missing, archived_deps)
+        core._index = index
+        return core
+
+    @classmethod
+    def from_packed(cls, plan) -> 'GraphCore':
+        """从机器格式构建，不解析 Markdown；不存在的依赖只知道位置，ID 记为 None"""
+        from plan_pack import MISSING
+        src_offsets, src_targets = plan.csr
+        if MISSING in src_targets:
+            offsets, deps, missing = array('I', [0]), array('I'), []
+            for i in range(plan.count):
+                for k in range(src_offsets[i], src_offsets[i + 1]):
+                    if src_targets[k] == MISSING:
+                        missing.append((i, None))
+                    else:
+                        deps.append(src_targets[k])
+                offsets.append(len(deps))
+        else:
+            offsets, deps, missing = src_offsets, src_targets, []
+        return cls(plan.ids, offsets, deps, bytearray(plan.statuses()),
+                   bytearray(plan._read('priorities')), missing)
+
+    # ---------- 基本访问 ----------
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, task_id: str) -> int:
+        if self._index is None:
+            self._index = {tid: i for i, tid in enumerate(self.ids)}
+        return self._index[task_id]
+
+    def dependencies(self, i: int) -> array:
+        return self.deps[self.dep_offsets[i]:self.dep_offsets[i + 1]]
+
+    def dependents(self, i: int) -> array:
+        return self.rev[self.rev_offsets[i]:self.rev_offsets[i + 1]]
+
+    def dependent_count(self, i: int) -> int:
+        return self.rev_offsets[i + 1] - self.rev_offsets[i]
+
+    def update(self, i: int, status: str, priority: str):
+        """任务状态 / 优先级变更后原地更新"""
+        self.status[i] = STATUS_CODES.get(status, STATUS_CODES['other'])
+        self.priority[i] = priority_code(priority)
+
+    def status_counts(self) -> Counter:
+        return Counter({STATUS_NAMES[code]: self.status.count(code)
+                        for code in range(len(STATUS_NAMES)) if code in self.status})
+
+    # ---------- 调度 ----------
+
+    def _has_missing(self) -> set:
+        return {i for i, _ in self.missing}
+
+    def is_ready(self, i: int, broken: set = None) -> bool:
+        """pending 且依赖全部完成（引用了不存在任务的依赖视为未完成）"""
+        if self.status[i] != PENDING:
+            return False
+        if broken is None:
+            broken = self._has_missing()
+        status, deps = self.status, self.deps
+        return i not in broken and all(status[deps[k]] == COMPLETED
+                                       for k in range(self.dep_offsets[i], self.dep_offsets[i + 1]))
+
+    def ready(self) -> list:
+        """可执行任务编号，按 (优先级, 文档顺序) 排序"""
+        broken = self._has_missing()
+        ready = [i for i in range(len(self.ids)) if self.status[i] == PENDING and self.is_ready(i, broken)]
+        ready.sort(key=lambda i: self.priority[i])
+        return ready
+
+    def blocked_by(self, i: int) -> list:
+        """直接依赖任务 i 且仍为 pending 的任务"""
+        return [j for j in self.dependents(i) if self.status[j] == PENDING]
+
+    def suggested_priorities(self) -> list:
+        """按被依赖次数重新评估 pending 任务的优先级：>=3 为 P0，2 为 P1，1 为 P2，0 为 P3。
+        返回 [(编号, 旧优先级数字, 新优先级数字)]，只包含有变化的任务"""
+        changes = []
+        for i in range(len(self.ids)):
+            if self.status[i] != PENDING:
+                continue
+            count = self.dependent_count(i)
+            new = 0 if count >= 3 else 1 if count == 2 else 2 if count == 1 else 3
+            if new != self.priority[i]:
+                changes.append((i, self.priority[i], new))
+        return changes
+
+    # ---------- 验证 ----------
+
+    def detect_cycle(self) -> list:
+        """检测循环依赖，返回循环路径上的编号（迭代 DFS）"""
+        WHITE, GRAY, BLACK = 0, 1, 2
+        color = bytearray(len(self.ids))
+        offsets, deps = self.dep_offsets, self.deps
+        for root in range(len(self.ids)):
+            if color[root] != WHITE:
+                continue
+            color[root] = GRAY
+            path = [root]
+            cursor = [offsets[root]]     # 每层下一个待访问的依赖位置
+            while path:
+                node = path[-1]
+                k = cursor[-1]
+                if k == offsets[node + 1]:
+                    color[node] = BLACK
+                    path.pop()
+                    cursor.pop()
+                    continue
+                cursor[-1] = k + 1
+                dep = deps[k]
+                if color[dep] == GRAY:
+                    cycle = path[path.index(dep):] + [dep]
+                    return cycle[::-1]
+                if color[dep] == WHITE:
+                    color[dep] = GRAY
+                    path.append(dep)
+                    cursor.append(offsets[dep])
+        return []
+
+    def orphans(self) -> list:
+        """孤立任务：既没有依赖（含不存在和已归档的依赖），也没有被依赖"""
+        if len(self.ids) <= 1:
+            return []
+        broken = self._has_missing() | self.archived_deps
+        dep_offsets, rev_offsets = self.dep_offsets, self.rev_offsets
+        return [i for i in range(len(self.ids))
+                if dep_offsets[i] == dep_offsets[i + 1] and rev_offsets[i] == rev_offsets[i + 1]
+                and i not in broken]
+
+    def validate(self) -> tuple:
+        """验证 DAG，返回 (错误列表, 警告列表)"""
+        errors = []
+        warnings = []
+        cycle = self.detect_cycle()
+        if cycle:
+            errors.append(f"循环依赖: {' -> '.join(self.ids[i] for i in cycle)}")
+        for i, dep in self.missing:
+            errors.append(f"{self.ids[i]} 依赖了不存在的任务 {dep or ''}".rstrip())
+        orphans = self.orphans()
+        if orphans:
+            warnings.append(f"孤立任务（无依赖也不被依赖）: {', '.join(self.ids[i] for i in orphans)}")
+        return errors, warnings
+
+
+def load_core(path):
+    """按扩展名加载：.tpk 直接构建核心，其他按 Markdown 解析"""
+    from pathlib import Path
+    path = Path(path)
+    if path.suffix == '.tpk':
+        from plan_pack import PackedPlan
+        return GraphCore.from_packed(PackedPlan(path))
+    from taskgraph import TaskGraph
+    return TaskGraph.load(path).core
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+TASKS.md 三方合并驱动 - 多台机器通过 git 同步任务文档时自动合并状态变更
+
+用法：
+  python merge_tasks.py <base> <ours> <theirs> [路径]     作为 git 合并驱动调用，结果写回 <ours>
+  python merge_tasks.py --install [仓库目录] [文件模式]    注册驱动（默认文件模式 TASKS.md）
+
+注册后等价于：
+  git config merge.taskplanner.name "taskplanner TASKS.md merge"
+  git config merge.taskplanner.driver "python <本脚本> %O %A %B %P"
+  echo "TASKS.md merge=taskplanner" >> .gitattributes
+
+合并规则（按任务 ID 逐字段三方合并）：
+1. 只有一方修改的字段取修改方；双方改成相同值时直接采用
+2. 状态字段组（状态 / 执行者 / 认领时间 / 完成时间）整体合并：双方都改动时按状态优先级
+   completed > failed > in_progress > pending 取胜，状态相同则认领时间较新的一方胜
+3. 依赖：双方都改动时按集合三方合并（保留双方新增，去掉任一方删除的）
+4. 优先级：双方都改动时取较高优先级
+5. 新增任务取并集；双方新增了同一 ID 的不同任务时，对方的任务重新编号为下一个可用 ID，
+   并同步改写对方文档中引用该 ID 的依赖
+6. 一方删除、另一方未修改的任务删除；另一方修改过的任务保留
+7. 任务块之外的文本（元信息、依赖图）按整段三方合并，双方都改动时保留我方
+8. 已归档任务索引取双方并集
+9. 新增任务没有 就绪时间 字段时写入合并时间（供优先级老化计算等待时间）
+
+其他字段双方改成不同值时无法自动合并：写入 git 风格的冲突标记并以退出码 1 退出。
+"""
+
+import sys
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from taskgraph import TaskGraph, Task, parse_id_list, task_number, READY_FIELD, TIME_FORMAT
+
+
+STATUS_FIELDS = ('状态', '执行者', '认领时间', '完成时间')
+STATUS_PRECEDENCE = {'pending': 0, 'in_progress': 1, 'failed': 2, 'completed': 3}
+
+
+def task_values(task: Task) -> dict:
+    """任务字段原始值（按文档顺序）"""
+    return {field: task.get(field) for field in task.fields}
+
+
+def status_group(values: dict) -> tuple:
+    return tuple(values.get(f) for f in STATUS_FIELDS)
+
+
+def pick_status(ours: dict, theirs: dict) -> dict:
+    """状态字段组双方都改动时的胜出方"""
+    def rank(values):
+        claimed = values.get('认领时间') or '-'
+        return (STATUS_PRECEDENCE.get((values.get('状态') or 'pending').split()[0], 0),
+                '' if claimed == '-' else claimed)
+    return theirs if rank(theirs) > rank(ours) else ours
+
+
+def merge_list(base: list, ours: list, theirs: list) -> list:
+    """集合三方合并：保留双方新增，去掉任一方删除的，顺序以我方为准"""
+    removed = (set(base) - set(ours)) | (set(base) - set(theirs))
+    merged = [x for x in ours if x not in removed]
+    merged += [x for x in theirs if x not in removed and x not in merged]
+    return merged
+
+
+def merge_task(base: dict, ours: dict, theirs: dict) -> tuple:
+    """三方合并单个任务的字段，返回 ({字段: 值}, [冲突字段])"""
+    base = base or {}
+    merged = {}
+    conflicts = []
+
+    # 状态字段组整体合并
+    b, o, t = status_group(base), status_group(ours), status_group(theirs)
+    if o == t or t == b:
+        source = ours
+    elif o == b:
+        source = theirs
+    else:
+        source = pick_status(ours, theirs)
+    # 胜出方没有而我方有的字段（如被重置前的完成时间）清空为 -
+    status_values = {f: source.get(f) or '-' for f in STATUS_FIELDS
+                     if source.get(f) is not None or ours.get(f) is not None}
+
+    for field in list(ours) + [f for f in theirs if f not in ours]:
+        if field in STATUS_FIELDS:
+            if field in status_values:
+                merged[field] = status_values[field]
+            continue
+        b, o, t = base.get(field), ours.get(field), theirs.get(field)
+        if o == t or t == b:
+            value = o
+        elif o == b:
+            value = t
+        elif field == '依赖':
+            deps = merge_list(parse_id_list(b or ''), parse_id_list(o or ''), parse_id_list(t or ''))
+            value = f"[{', '.join(deps)}]" if deps else '无'
+        elif field == '优先级' and o and t:
+            value = min(o, t, key=lambda p: int(p[1:]) if p[1:].isdigit() else 99)
+        else:
+            conflicts.append(field)
+            value = o
+        if value is not None:
+            merged[field] = value
+    # 胜出方有而我方没有的状态字段（如对方新写入的完成时间）
+    for field in STATUS_FIELDS:
+        if field in status_values and field not in merged:
+            merged[field] = status_values[field]
+    return merged, conflicts
+
+
+def apply_values(task: Task, values: dict, theirs: dict, conflicts: list):
+    """把合并结果写入我方任务块；冲突字段写入冲突标记。
+    我方没有的字段插入到对方文档中它前面的字段之后"""
+    their_order = list(theirs)
+    for field, value in values.items():
+        if task.get(field) == value:
+            continue
+        anchor = None
+        if field not in task.fields and field in their_order:
+            before = their_order[:their_order.index(field)]
+            anchor = next((f for f in reversed(before) if f in task.fields), None)
+        task.set(field, value, after=anchor)
+    for field in conflicts:
+        idx = task.fields[field]
+        task.lines[idx] = '\n'.join([
+            '<<<<<<< ours',
+            task.lines[idx],
+            '=======',
+            f"- **{field}**: {theirs[field]}",
+            '>>>>>>> theirs',
+        ])
+        task._block = None
+
+
+def renumber_new_tasks(base: TaskGraph, ours: TaskGraph, theirs: TaskGraph) -> dict:
+    """对方新增任务与我方新增任务 ID 冲突且内容不同时，为对方任务重新编号"""
+    taken = set(ours.tasks) | set(theirs.tasks) | set(base.tasks)
+    next_number = max((task_number(tid) for tid in taken), default=0) + 1
+    mapping = {}
+    for tid, task in theirs.tasks.items():
+        if tid in base.tasks or tid not in ours.tasks:
+            continue
+        if task.render().strip() == ours.tasks[tid].render().strip():
+            continue
+        mapping[tid] = f"TASK-{next_number:03d}"
+        next_number += 1
+    if mapping:
+        theirs.renumber(mapping)
+    return mapping
+
+
+def merge_text(base: str, ours: str, theirs: str) -> str:
+    if ours == theirs or theirs == base:
+        return ours
+    if ours == base:
+        return theirs
+    return ours
+
+
+def merge_documents(base_text: str, ours_text: str, theirs_text: str) -> tuple:
+    """三方合并任务文档，返回 (合并后文本, 冲突列表, 重新编号映射)"""
+    base, ours, theirs = TaskGraph(base_text), TaskGraph(ours_text), TaskGraph(theirs_text)
+    mapping = renumber_new_tasks(base, ours, theirs)
+    conflicts = []
+
+    # 任务块之前的文本（标题、元信息、依赖图）
+    ours.segments[0] = merge_text(base.segments[0], ours.segments[0], theirs.segments[0])
+
+    for tid in list(ours.tasks):
+        task = ours.tasks[tid]
+        base_task = base.tasks.get(tid)
+        their_task = theirs.tasks.get(tid)
+        if their_task is None:
+            if base_task is not None and task_values(task) == task_values(base_task):
+                ours.remove_task(tid)   # 对方删除，我方未修改
+            continue
+        values, fields = merge_task(task_values(base_task) if base_task else None,
+                                    task_values(task), task_values(their_task))
+        apply_values(task, values, task_values(their_task), fields)
+        conflicts += [f"{tid} 的 {field}" for field in fields]
+
+    # 对方新增（或我方删除而对方修改过）的任务
+    for tid, task in theirs.tasks.items():
+        if tid in ours.tasks:
+            continue
+        base_task = base.tasks.get(tid)
+        if base_task is not None and task_values(task) == task_values(base_task):
+            continue    # 我方删除，对方未修改
+        ours.add_task(Task(task.id, task.name, task.render().rstrip('\n')))
+
+    # 双方新增的任务没有就绪时间时记为合并时间（对方的任务由 add_task 写入），优先级老化不从计划生成时算起
+    stamp = datetime.now().strftime(TIME_FORMAT)
+    for tid, task in ours.tasks.items():
+        if tid not in base.tasks and READY_FIELD not in task.fields:
+            task.set(READY_FIELD, stamp)
+
+    # 归档索引取并集（仍留在文档中的任务除外）
+    archived = (ours.archived | theirs.archived) - set(ours.tasks)
+    if archived != ours.archived:
+        ours.set_archived(archived)
+
+    return ours.to_text(), conflicts, mapping
+
+
+def install(repo: Path, pattern: str):
+    script = Path(__file__).resolve()
+    try:
+        script = script.relative_to(repo.resolve())
+    except ValueError:
+        pass
+    subprocess.run(['git', 'config', 'merge.taskplanner.name', 'taskplanner TASKS.md merge'],
+                   cwd=repo, check=True)
+    subprocess.run(['git', 'config', 'merge.taskplanner.driver',
+                    f"python {script.as_posix()} %O %A %B %P"], cwd=repo, check=True)
+    attributes = repo / '.gitattributes'
+    line = f"{pattern} merge=taskplanner"
+    content = attributes.read_text(encoding='utf-8') if attributes.exists() else ''
+    if line not in content.splitlines():
+        with open(attributes, 'a', encoding='utf-8') as f:
+            if content and not content.endswith('\n'):
+                f.write('\n')
+            f.write(line + '\n')
+    print(f"✓ 已注册合并驱动: {line}")
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--install':
+        repo = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('.')
+        pattern = sys.argv[3] if len(sys.argv) > 3 else 'TASKS.md'
+        install(repo, pattern)
+        return
+
+    if len(sys.argv) < 4:
+        print("用法: python merge_tasks.py <base> <ours> <theirs> [路径]")
+        print("      python merge_tasks.py --install [仓库目录] [文件模式]")
+        sys.exit(2)
+
+    base_path, ours_path, theirs_path = (Path(p) for p in sys.argv[1:4])
+    name = sys.argv[4] if len(sys.argv) > 4 else ours_path.name
+    read = lambda p: p.read_text(encoding='utf-8') if p.exists() else ''
+
+    merged, conflicts, mapping = merge_documents(read(base_path), read(ours_path), read(theirs_path))
+    with open(ours_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(merged)
+
+    for old, new in mapping.items():
+        print(f"{name}: 对方新增的 {old} 重新编号为 {new}", file=sys.stderr)
+    if conflicts:
+        print(f"{name}: 无法自动合并 {', '.join(conflicts)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,134 +2,229 @@
 """
 下一任务推荐脚本：获取当前可执行的任务列表
 
-用法：python next_task.py <任务文档路径>
+用法：python next_task.py <任务文档路径> [选项]
+
+选项：
+  --module <模块>          只列出指定模块的任务
+  --priority <P0,P1,...>   只列出指定优先级的任务
+  --touches <通配模式>     只列出相关文件与模式有交集的任务（如 'backend/src/**'）
+  --limit <N>              最多列出 N 个任务
+  --avoid-conflicts        暂缓相关文件与进行中任务重叠的任务（同一文件或目录包含关系）
+  --session <会话ID>       按与该会话近期工作的亲和度排序（同优先级、同关键路径地位的任务之间）
+  --aging <分钟>           覆盖元信息中的优先级老化间隔（0 表示按静态优先级排序）
+  --json                   输出 JSON（进度统计与任务列表）
 
 可执行任务条件：
 1. 状态为 pending
 2. 所有依赖任务已完成（状态为 completed）
+3. 所需资源令牌未用尽：按列出顺序占用，超出 ## 资源限制 上限的任务暂缓（agent 默认上限 4）
+
+过滤基于模块、优先级和相关文件路径前缀的二级索引，只检查命中索引的任务。
+冲突检测基于进行中任务相关文件的路径前缀树，不冲突的任务可以安全地并行分配。
+资源占用按类别计数（TaskGraph.resource_usage），不逐个扫描进行中任务。
+亲和度排序见 affinity.py：优先级 > 关键路径 > 亲和度 > 文档顺序。
+
+优先级老化：元信息中声明 **优先级老化**: 60 分钟 后，可执行任务每等待 60 分钟提升一级，
+避免低优先级任务被不断插入的 P0 修复任务长期压后。有效优先级在查询时按就绪时间计算
+（依赖中最晚的完成时间；无依赖的任务取计划生成时间，修复任务取插入时记录的就绪时间），
+不写回文档。老化效果可用 bench/aging_sim.py 模拟。
+
+任务文档也可以是机器格式（.tpk，见 plan_pack.py）：直接在数组化的图核心上计算，
+支持 --priority / --limit / --json；机器格式不含相关文件和模块，其他筛选需使用 Markdown，
+优先级老化也只在 Markdown 上计算。
 """
 
 import sys
-import re
+import json
+from datetime import datetime
 from pathlib import Path
 
+from taskgraph import TaskGraph, TIME_FORMAT, parse_aging
+from affinity import SessionHistory, rank_for_session
+from graph_core import load_core
+
 
-def parse_tasks(content: str) -> dict:
-    """解析任务文档，提取任务及其依赖"""
-    tasks = {}
-    
-    # 匹配任务块：### TASK-XXX: 任务名称
-    task_pattern = r'### (TASK-\d+):\s*(.+?)(?=\n###|\n## |\Z)'
-    task_matches = re.findall(task_pattern, content, re.DOTALL)
-    
-    for task_id, task_content in task_matches:
-        # 提取任务名称（第一行）
-        name_match = re.match(r'([^\n]+)', task_content.strip())
-        name = name_match.group(1).strip() if name_match else task_id
-        
-        # 提取依赖
-        dep_match = re.search(r'\*\*依赖\*\*:\s*(.+)', task_content)
-        dependencies = []
-        
-        if dep_match:
-            dep_str = dep_match.group(1).strip()
-            if dep_str != '无' and dep_str != '-':
-                dep_ids = re.findall(r'TASK-\d+', dep_str)
-                dependencies = dep_ids
-        
-        # 提取状态
-        status_match = re.search(r'\*\*状态\*\*:\s*(\w+)', task_content)
-        status = status_match.group(1) if status_match else 'pending'
-        
-        # 提取优先级
-        priority_match = re.search(r'\*\*优先级\*\*:\s*(P\d+)', task_content)
-        priority = priority_match.group(1) if priority_match else 'P2'
-        
-        # 提取描述
-        desc_match = re.search(r'\*\*描述\*\*:\s*(.+)', task_content)
-        description = desc_match.group(1).strip() if desc_match else ''
-        
-        tasks[task_id] = {
-            'name': name,
-            'dependencies': dependencies,
-            'status': status,
-            'priority': priority,
-            'description': description
-        }
-    
-    return tasks
-
-
-def get_executable_tasks(tasks: dict) -> list:
-    """获取可执行的任务列表"""
-    completed = {tid for tid, info in tasks.items() if info['status'] == 'completed'}
-    
-    executable = []
-    for task_id, info in tasks.items():
-        if info['status'] != 'pending':
-            continue
-        
-        # 检查所有依赖是否已完成
-        deps_satisfied = all(dep in completed for dep in info['dependencies'])
-        
-        if deps_satisfied:
-            executable.append({
-                'id': task_id,
-                'name': info['name'],
-                'priority': info['priority'],
-                'description': info['description'],
-                'dependencies': info['dependencies']
-            })
-    
-    # 按优先级排序（P0 > P1 > P2）
-    executable.sort(key=lambda x: x['priority'])
-    
-    return executable
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def print_packed(file_path: Path):
+    """机器格式：只依赖状态列、优先级列和依赖邻接表"""
+    unsupported = [opt for opt in ('--module', '--touches', '--avoid-conflicts', '--session', '--aging')
+                   if opt in sys.argv]
+    if unsupported:
+        print(f"✗ 机器格式不支持 {', '.join(unsupported)}，请使用 Markdown 任务文档")
+        sys.exit(1)
+    core = load_core(file_path)
+    priority = get_option('--priority')
+    limit = get_option('--limit')
+    executable = core.ready()
+    if priority:
+        wanted = {int(p.strip().upper().lstrip('P')) for p in priority.split(',')}
+        executable = [i for i in executable if core.priority[i] in wanted]
+    if limit:
+        executable = executable[:int(limit)]
+    counts = core.status_counts()
+    progress = {'total': len(core), 'completed': counts['completed'],
+                'in_progress': counts['in_progress'], 'pending': counts['pending']}
+
+    if '--json' in sys.argv:
+        print(json.dumps({
+            'progress': progress,
+            'tasks': [{'id': core.ids[i], 'priority': f"P{core.priority[i]}",
+                       'dependencies': [core.ids[d] for d in core.dependencies(i)]}
+                      for i in executable],
+            'withheld': [],
+        }, ensure_ascii=False, indent=2))
+        return
+
+    print(f"任务进度: {progress['completed']}/{progress['total']} 完成, "
+          f"{progress['in_progress']} 进行中, {progress['pending']} 待执行")
+    print()
+    if not executable:
+        print("当前无可执行任务" if progress['pending'] else "所有任务已完成或正在执行中！")
+        return
+    print(f"可执行任务 ({len(executable)} 个):")
+    print("-" * 60)
+    for i in executable:
+        deps = [core.ids[d] for d in core.dependencies(i)]
+        print(f"[P{core.priority[i]}] {core.ids[i]}")
+        print(f"    依赖: {', '.join(deps) if deps else '无'}")
+        print()
 
 
 def main():
     if len(sys.argv) < 2:
-        print("用法: python next_task.py <任务文档路径>")
+        print("用法: python next_task.py <任务文档路径> [--module 模块] [--priority P0,P1] "
+              "[--touches 通配模式] [--limit N] [--avoid-conflicts] [--session 会话ID] [--aging 分钟] [--json]")
         sys.exit(1)
-    
+
     file_path = Path(sys.argv[1])
-    
+
     if not file_path.exists():
         print(f"✗ 文件不存在: {file_path}")
         sys.exit(1)
-    
-    content = file_path.read_text(encoding='utf-8')
-    tasks = parse_tasks(content)
-    
-    if not tasks:
+
+    if file_path.suffix == '.tpk':
+        print_packed(file_path)
+        return
+
+    graph = TaskGraph.load(file_path)
+
+    if not len(graph):
         print("✗ 未找到任何任务")
         sys.exit(1)
-    
-    executable = get_executable_tasks(tasks)
-    
+
+    aging = get_option('--aging')
+    if aging is not None:
+        try:
+            graph.aging = parse_aging(aging)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+    priority = get_option('--priority')
+    limit = get_option('--limit')
+    filters = {
+        'module': get_option('--module'),
+        'priorities': [p.strip().upper() for p in priority.split(',')] if priority else None,
+        'touches': get_option('--touches'),
+    }
+    filtered = any(filters.values())
+    executable = graph.query(**filters)
+    withheld = {}
+    if '--avoid-conflicts' in sys.argv:
+        executable, withheld = graph.split_conflicts(executable)
+    session_id = get_option('--session')
+    affinity = {}
+    if session_id:
+        entries = SessionHistory.load(file_path).entries(session_id)
+        ranked = rank_for_session(graph, executable, entries)
+        executable = [task for task, _ in ranked]
+        affinity = {task.id: score for task, score in ranked}
+    executable, exhausted = graph.split_admissible(executable)
+    if limit:
+        executable = executable[:int(limit)]
+
     # 统计信息
-    total = len(tasks)
-    completed = sum(1 for info in tasks.values() if info['status'] == 'completed')
-    in_progress = sum(1 for info in tasks.values() if info['status'] == 'in_progress')
-    pending = sum(1 for info in tasks.values() if info['status'] == 'pending')
-    
+    counts = graph.status_counts()
+    total = graph.total
+    completed = counts['completed']
+    in_progress = counts['in_progress']
+    pending = counts['pending']
+
+    now = datetime.now()
+    aged = {}
+    if graph.aging:
+        for task in executable:
+            since = graph.ready_since(task)
+            aged[task.id] = {'ready_since': since.strftime(TIME_FORMAT) if since else None,
+                             'effective_priority': round(graph.effective_priority(task, now), 2)}
+
+    if '--json' in sys.argv:
+        print(json.dumps({
+            'progress': {'total': total, 'completed': completed,
+                         'in_progress': in_progress, 'pending': pending},
+            'tasks': [dict(task.to_dict(), **({'affinity': affinity[task.id]} if session_id else {}),
+                           **aged.get(task.id, {}))
+                      for task in executable],
+            'withheld': [{'id': tid, 'conflicts_with': ids} for tid, ids in withheld.items()],
+            'resource_withheld': [{'id': tid, 'resources': full} for tid, full in exhausted.items()],
+            'resources': {r: {'used': graph.resource_usage[r], 'limit': n}
+                          for r, n in graph.resource_limits.items()},
+        }, ensure_ascii=False, indent=2))
+        return
+
     print(f"任务进度: {completed}/{total} 完成, {in_progress} 进行中, {pending} 待执行")
     print()
-    
+
+    if withheld:
+        print(f"暂缓 {len(withheld)} 个任务（相关文件与进行中任务冲突）:")
+        for tid, ids in withheld.items():
+            print(f"  {tid} ← {', '.join(ids)}")
+        print()
+
+    if exhausted:
+        by_resource = {}
+        for tid, full in exhausted.items():
+            by_resource.setdefault(tuple(full), []).append(tid)
+        limits = graph.resource_limits
+        print(f"暂缓 {len(exhausted)} 个任务（资源已满，已计入进行中任务和下面列出的任务）:")
+        for resources, ids in by_resource.items():
+            detail = ', '.join(f"{r} (上限 {limits[r]})" for r in resources)
+            print(f"  {detail} ← {', '.join(ids)}")
+        print()
+
     if not executable:
-        if pending > 0:
+        if exhausted:
+            print("当前无可认领的任务（所需资源均已占满）")
+        elif withheld:
+            print("当前无可安全并行的任务（可执行任务均与进行中任务冲突）")
+        elif filtered:
+            print("没有符合筛选条件的可执行任务")
+        elif pending > 0:
             print("当前无可执行任务（存在未完成的依赖）")
         else:
             print("所有任务已完成或正在执行中！")
         return
-    
-    print(f"可执行任务 ({len(executable)} 个):")
+
+    print(f"{'符合条件的' if filtered else ''}可执行任务 ({len(executable)} 个):")
     print("-" * 60)
-    
+
     for task in executable:
-        deps_str = ', '.join(task['dependencies']) if task['dependencies'] else '无'
-        print(f"[{task['priority']}] {task['id']}")
-        print(f"    描述: {task['description']}")
+        deps_str = ', '.join(task.dependencies) if task.dependencies else '无'
+        print(f"[{task.priority}] {task.id}")
+        if affinity.get(task.id):
+            print(f"    亲和度: {affinity[task.id]}")
+        if aged.get(task.id, {}).get('ready_since'):
+            waited = (now - graph.ready_since(task)).total_seconds() / 3600
+            boost = int(task.priority[1:]) - aged[task.id]['effective_priority']
+            print(f"    已就绪: {waited:.1f} 小时（老化提升 {boost:.1f} 级）")
+        print(f"    描述: {task.description}")
         print(f"    依赖: {deps_str}")
         print()
 
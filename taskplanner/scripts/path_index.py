@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+路径前缀树 - 按 相关文件 路径分段索引任务
+
+- PathTrie.insert(): 登记任务声明的文件或目录（目录以 / 结尾）
+- PathTrie.under(): 查询某路径及其下所有文件/目录所属的任务
+- PathTrie.ancestors(): 查询声明了某路径的上级目录（包含该路径本身）的任务
+- PathTrie.glob(): 沿前缀树按分段匹配通配模式，只访问可能匹配的分支
+- glob_match(): 支持 * 与 ** 的路径通配匹配
+"""
+
+import re
+
+
+def split_path(path: str) -> list:
+    """规范化并按 / 分段：去掉开头的 ./ 与首尾的 /"""
+    path = path.strip().replace('\\', '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return [p for p in path.strip('/').split('/') if p and p != '.']
+
+
+_GLOB_CACHE = {}
+
+
+def _glob_regex(pattern: str):
+    regex = _GLOB_CACHE.get(pattern)
+    if regex is None:
+        parts = split_path(pattern)
+        pieces = []
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            if part == '**':
+                pieces.append('.*' if last else '(?:[^/]+/)*')
+                continue
+            part = re.escape(part).replace(r'\*', '[^/]*').replace(r'\?', '[^/]')
+            pieces.append(part if last else part + '/')
+        regex = re.compile(''.join(pieces))
+        _GLOB_CACHE[pattern] = regex
+    return regex
+
+
+def _segment_matcher(part: str):
+    if not any(c in part for c in '*?['):
+        return None
+    return re.compile(re.escape(part).replace(r'\*', '.*').replace(r'\?', '.')).fullmatch
+
+
+def glob_match(pattern: str, path: str) -> bool:
+    """路径是否匹配通配模式：* 匹配单个分段内的任意字符，** 匹配任意层目录"""
+    path = '/'.join(split_path(path))
+    if not any(c in pattern for c in '*?['):
+        # 不含通配符时按前缀匹配：模式为目录时匹配其下所有文件
+        prefix = '/'.join(split_path(pattern))
+        return path == prefix or path.startswith(prefix + '/')
+    return _glob_regex(pattern).fullmatch(path) is not None
+
+
+class PathTrie:
+    """路径前缀树：每个节点为 {分段: 子节点}，节点上的 None 键保存登记在该路径的值集合"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, path: str, value):
+        node = self.root
+        for part in split_path(path):
+            node = node.setdefault(part, {})
+        node.setdefault(None, set()).add(value)
+
+    def _node(self, parts: list):
+        node = self.root
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                return None
+        return node
+
+    def under(self, path) -> set:
+        """登记在 path 及其下级路径上的所有值"""
+        parts = split_path(path) if isinstance(path, str) else path
+        node = self._node(parts)
+        values = set()
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    values |= child
+                else:
+                    stack.append(child)
+        return values
+
+    def ancestors(self, path) -> set:
+        """登记在 path 的上级目录（含 path 本身）上的所有值"""
+        parts = split_path(path) if isinstance(path, str) else path
+        node = self.root
+        values = set(node.get(None, ()))
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                break
+            values |= node.get(None, set())
+        return values
+
+    def overlapping(self, path) -> set:
+        """与 path 有包含关系（上级、自身或下级）的所有值"""
+        return self.ancestors(path) | self.under(path)
+
+    def glob(self, pattern: str) -> set:
+        """与通配模式有交集的值：路径匹配模式、位于匹配目录之下（模式不含通配符时），
+        或是模式途经的上级目录（目录包含模式可能匹配的文件）"""
+        parts = split_path(pattern)
+        if not any(c in pattern for c in '*?['):
+            return self.overlapping(parts)
+        matchers = [_segment_matcher(part) for part in parts]
+        values = set()
+        stack = [(self.root, 0)]
+        seen = set()
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+            # 途经的节点：登记在此的目录覆盖了模式的后续部分
+            values |= node.get(None, set())
+            if i == len(parts):
+                continue
+            part = parts[i]
+            if part == '**':
+                stack.append((node, i + 1))
+                stack.extend((child, i) for key, child in node.items() if key is not None)
+            elif matchers[i] is None:
+                child = node.get(part)
+                if child is not None:
+                    stack.append((child, i + 1))
+            else:
+                match = matchers[i]
+                stack.extend((child, i + 1) for key, child in node.items()
+                             if key is not None and match(key))
+        return values
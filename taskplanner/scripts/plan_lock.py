@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+任务文档锁 - 保证多个 agent 并发修改 TASKS.md 时状态一致
+
+- locked(): 对任务文档加排他锁（旁路锁文件 .<文件名>.lock），覆盖整个 读-改-写 过程
+- atomic_write(): 先写临时文件再原子替换，读取方永远不会看到写了一半的文档
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_path(file_path: Path) -> Path:
+    """任务文档对应的锁文件路径"""
+    return file_path.with_name(f".{file_path.name}.lock")
+
+
+@contextmanager
+def locked(file_path: Path):
+    """对任务文档加排他锁，阻塞直到获得锁"""
+    with open(lock_path(file_path), 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(file_path: Path, content):
+    """原子写入文件（同目录临时文件 + os.replace），content 为 str 时按 UTF-8 文本写入"""
+    import tempfile  # 只读命令不需要，延迟导入
+    fd, tmp = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix='.tmp')
+    try:
+        # mkstemp 创建的文件权限为 0600：沿用原文件权限，新文件按 umask 取默认权限
+        try:
+            mode = os.stat(file_path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, mode)
+        binary = isinstance(content, bytes)
+        with os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        os.replace(tmp, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+紧凑机器格式 - 任务计划的二进制列式存储，与 TASKS.md 无损互转
+
+用法：
+  python plan_pack.py pack <TASKS.md> [输出.tpk]          Markdown -> 机器格式
+  python plan_pack.py unpack <计划.tpk> [输出.md]         机器格式 -> Markdown
+  python plan_pack.py verify <TASKS.md>                   往返转换校验（逐字节一致）
+  python plan_pack.py status <计划.tpk>                   状态统计与可执行任务
+  python plan_pack.py claim <计划.tpk> <任务ID> [--session 会话ID]
+  python plan_pack.py complete <计划.tpk> <任务ID> [--failed]
+  python plan_pack.py reset <计划.tpk> <任务ID>
+
+文件布局（小端序）：
+  头部      魔数 TPK1、版本、行宽、任务数，以及各段的 (偏移, 长度)
+  rows      每个任务一行定长状态记录（状态、已修改标记、字段标志、执行者、认领时间、完成时间），
+            紧跟在头部之后，认领 / 完成 / 重置只需一次定位写入一行
+  ids       任务 ID，按文档顺序以换行分隔；任务在各列中的位置即其整数编号
+  priorities  优先级数字（P0 -> 0），每任务 1 字节
+  modules / module_names  模块编号列（uint32）与模块名表
+  dep_offsets / dep_targets  依赖的 CSR 邻接表（uint32），依赖的任务不存在时记为 MISSING
+  document  原文档片段（任务块之外的文本与任务块原文），长度前缀后 zlib 压缩
+
+无损约定：
+- 导出 Markdown 时未修改的任务块原样输出，修改过的任务按 TaskGraph 相同的方式改写状态字段
+- 状态字段值无法放进定长列时（非标准状态、超长执行者、非标准时间格式）在字段标志中记为
+  原文保留，导出时不覆盖；该任务的状态再次变更后即以列中的值为准
+- 机器格式只支持状态变更；增删任务、改依赖等结构修改请在 Markdown 上进行后重新 pack
+"""
+
+import os
+import sys
+import zlib
+import struct
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from taskgraph import TaskGraph, Task, TaskError, TIME_FORMAT, generate_session_id
+from plan_lock import locked, atomic_write
+from graph_core import STATUS_NAMES, STATUS_CODES, priority_code
+
+
+MAGIC = b'TPK1'
+VERSION = 1
+SECTIONS = ('rows', 'ids', 'priorities', 'modules', 'module_names', 'dep_offsets', 'dep_targets',
+            'document')
+HEADER = struct.Struct('<4sHHI' + 'QQ' * len(SECTIONS))
+ROW = struct.Struct('<BBH32sII')    # 状态, 已修改, 字段标志, 执行者, 认领时间, 完成时间
+PIECE = struct.Struct('<BI')        # 片段类型（0 文本 / 1 任务块）, 字节长度
+
+STATUS_FIELDS = ('状态', '执行者', '认领时间', '完成时间')
+RAW = 1         # 字段标志第 i 位：第 i 个状态字段原文保留
+ABSENT = 16     # 字段标志第 4+i 位：第 i 个状态字段不存在
+MISSING = 0xFFFFFFFF
+EPOCH = datetime(1970, 1, 1)
+
+
+# ---------- 字段编码 ----------
+
+def encode_time(value: str):
+    """时间字段 -> 秒数（'-' 为 0）；无法表示时返回 None"""
+    if value == '-':
+        return 0
+    try:
+        seconds = int((datetime.strptime(value, TIME_FORMAT) - EPOCH).total_seconds())
+    except ValueError:
+        return None
+    if not 0 < seconds < MISSING or decode_time(seconds) != value:
+        return None
+    return seconds
+
+
+def decode_time(seconds: int) -> str:
+    if not seconds:
+        return '-'
+    return (EPOCH + timedelta(seconds=seconds)).strftime(TIME_FORMAT)
+
+
+def encode_executor(value: str):
+    """执行者 -> 定长字节（'-' 为空）；无法表示时返回 None"""
+    if value == '-':
+        return b''
+    data = value.encode('utf-8')
+    if not data or len(data) > 32 or b'\0' in data:
+        return None
+    return data
+
+
+def encode_row(task: Task) -> bytes:
+    values = [task.get(field) for field in STATUS_FIELDS]
+    flags = 0
+    for i, value in enumerate(values):
+        if value is None:
+            flags |= ABSENT << i
+    status = STATUS_CODES.get(task.status, STATUS_CODES['other'])
+    if values[0] is not None and values[0] != STATUS_NAMES[status]:
+        flags |= RAW
+    executor = encode_executor(values[1]) if values[1] is not None else b''
+    if executor is None:
+        flags |= RAW << 1
+        executor = b''
+    times = []
+    for i in (2, 3):
+        seconds = encode_time(values[i]) if values[i] is not None else 0
+        if seconds is None:
+            flags |= RAW << i
+            seconds = 0
+        times.append(seconds)
+    return ROW.pack(status, 0, flags, executor, *times)
+
+
+def decode_row(data: bytes) -> dict:
+    status, modified, flags, executor, claimed, completed = ROW.unpack(data)
+    return {
+        'status': STATUS_NAMES[status],
+        'modified': bool(modified),
+        'flags': flags,
+        '执行者': executor.rstrip(b'\0').decode('utf-8') or '-',
+        '认领时间': decode_time(claimed),
+        '完成时间': decode_time(completed),
+    }
+
+
+# ---------- 转换 ----------
+
+def pack_graph(graph: TaskGraph) -> bytes:
+    """TaskGraph -> 机器格式字节"""
+    tasks = list(graph)
+    index = {task.id: i for i, task in enumerate(tasks)}
+    module_names = sorted({task.module for task in tasks})
+    module_index = {m: i for i, m in enumerate(module_names)}
+
+    offsets = array('I', [0])
+    targets = array('I')
+    for task in tasks:
+        # 已归档的依赖已完成，不进入邻接表
+        targets.extend(index.get(dep, MISSING) for dep in task.dependencies
+                       if dep not in graph.archived)
+        offsets.append(len(targets))
+
+    pieces = []
+    for segment in graph.segments:
+        if isinstance(segment, Task) and graph.tasks[segment.id] is segment:
+            kind, text = 1, segment.render()
+        else:
+            kind, text = 0, segment if isinstance(segment, str) else segment.render()
+        data = text.encode('utf-8')
+        pieces.append(PIECE.pack(kind, len(data)) + data)
+
+    sections = {
+        'rows': b''.join(encode_row(task) for task in tasks),
+        'ids': '\n'.join(index).encode('utf-8'),
+        'priorities': bytes(priority_code(t.priority) for t in tasks),
+        'modules': array('I', (module_index[t.module] for t in tasks)).tobytes(),
+        'module_names': '\n'.join(module_names).encode('utf-8'),
+        'dep_offsets': offsets.tobytes(),
+        'dep_targets': targets.tobytes(),
+        'document': zlib.compress(b''.join(pieces)),
+    }
+    table = []
+    offset = HEADER.size
+    body = []
+    for name in SECTIONS:
+        data = sections[name]
+        table += [offset, len(data)]
+        body.append(data)
+        offset += len(data)
+    return HEADER.pack(MAGIC, VERSION, ROW.size, len(tasks), *table) + b''.join(body)
+
+
+def pack_file(md_path: Path, out_path: Path) -> int:
+    """TASKS.md -> .tpk，返回任务数"""
+    graph = TaskGraph.load(md_path)
+    atomic_write(out_path, pack_graph(graph))
+    return len(graph)
+
+
+class PackedPlan:
+    """机器格式的任务计划：按需读取各段，状态变更直接定位写入状态行"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise TaskError(f"{self.path} 不是任务计划机器格式文件")
+        magic, version, row_size, count, *table = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or row_size != ROW.size:
+            raise TaskError(f"{self.path} 不是受支持的任务计划机器格式（版本 {version}）")
+        self.count = count
+        self.sections = {name: (table[2 * i], table[2 * i + 1]) for i, name in enumerate(SECTIONS)}
+        self.rows_offset = self.sections['rows'][0]
+        self._ids = None
+        self._index = None
+        self._csr = None
+
+    def _read(self, name: str) -> bytes:
+        offset, length = self.sections[name]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    # ---------- 查询 ----------
+
+    @property
+    def ids(self) -> list:
+        if self._ids is None:
+            data = self._read('ids').decode('utf-8')
+            self._ids = data.split('\n') if data else []
+        return self._ids
+
+    def index(self, task_id: str) -> int:
+        if self._index is None:
+            self._index = {tid: i for i, tid in enumerate(self.ids)}
+        if task_id not in self._index:
+            raise TaskError(f"任务 {task_id} 不存在")
+        return self._index[task_id]
+
+    @property
+    def csr(self) -> tuple:
+        """依赖邻接表 (offsets, targets)：任务 i 的依赖为 targets[offsets[i]:offsets[i+1]]"""
+        if self._csr is None:
+            offsets, targets = array('I'), array('I')
+            offsets.frombytes(self._read('dep_offsets'))
+            targets.frombytes(self._read('dep_targets'))
+            self._csr = (offsets, targets)
+        return self._csr
+
+    def dependencies(self, i: int) -> array:
+        offsets, targets = self.csr
+        return targets[offsets[i]:offsets[i + 1]]
+
+    def statuses(self) -> bytes:
+        """状态列：第 i 个字节为任务 i 的状态编码（STATUS_NAMES 下标）"""
+        return self._read('rows')[::ROW.size]
+
+    def row(self, i: int) -> dict:
+        with open(self.path, 'rb') as f:
+            return decode_row(os.pread(f.fileno(), ROW.size, self.rows_offset + i * ROW.size))
+
+    def ready(self) -> list:
+        """可执行任务编号：pending 且依赖全部完成，按优先级排序"""
+        statuses = self.statuses()
+        offsets, targets = self.csr
+        pending, completed = STATUS_CODES['pending'], STATUS_CODES['completed']
+        ready = [i for i in range(self.count)
+                 if statuses[i] == pending
+                 and all(d != MISSING and statuses[d] == completed
+                         for d in targets[offsets[i]:offsets[i + 1]])]
+        priorities = self._read('priorities')
+        ready.sort(key=lambda i: priorities[i])
+        return ready
+
+    # ---------- 状态变更（文档锁内，一次定位写入） ----------
+
+    def _update(self, task_id: str, change):
+        i = self.index(task_id)
+        position = self.rows_offset + i * ROW.size
+        with locked(self.path):
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                row = list(ROW.unpack(os.pread(fd, ROW.size, position)))
+                result = change(fd, i, row)
+                row[1] = 1
+                os.pwrite(fd, ROW.pack(*row), position)
+            finally:
+                os.close(fd)
+        return result
+
+    @staticmethod
+    def _set(row: list, field: int, value):
+        """写入状态字段：清除原文保留与不存在标志"""
+        row[2] &= ~((RAW | ABSENT) << field)
+        row[(0, 3, 4, 5)[field]] = value
+
+    def claim(self, task_id: str, session_id: str = None) -> str:
+        """认领任务，返回会话 ID"""
+        session_id = session_id or generate_session_id()
+        executor = encode_executor(session_id)
+        if executor is None:
+            raise TaskError(f"会话 ID 超过 32 字节: {session_id}")
+
+        def change(fd, i, row):
+            if row[0] != STATUS_CODES['pending']:
+                raise TaskError(f"任务状态为 {STATUS_NAMES[row[0]]}，不可认领")
+            unmet = []
+            for d in self.dependencies(i):
+                status = None if d == MISSING else os.pread(fd, 1, self.rows_offset + d * ROW.size)[0]
+                if status != STATUS_CODES['completed']:
+                    unmet.append(self.ids[d] if d != MISSING else '(不存在的任务)')
+            if unmet:
+                raise TaskError(f"依赖未完成: {', '.join(unmet)}")
+            self._set(row, 0, STATUS_CODES['in_progress'])
+            self._set(row, 1, executor)
+            self._set(row, 2, encode_time(datetime.now().strftime(TIME_FORMAT)))
+            return session_id
+        return self._update(task_id, change)
+
+    def complete(self, task_id: str, failed: bool = False) -> str:
+        """将 in_progress 任务标记为 completed 或 failed，返回新状态"""
+        def change(fd, i, row):
+            if row[0] != STATUS_CODES['in_progress']:
+                raise TaskError(f"任务状态为 {STATUS_NAMES[row[0]]}，只能完成 in_progress 状态的任务")
+            new_status = 'failed' if failed else 'completed'
+            self._set(row, 0, STATUS_CODES[new_status])
+            self._set(row, 3, encode_time(datetime.now().strftime(TIME_FORMAT)))
+            return new_status
+        return self._update(task_id, change)
+
+    def reset(self, task_id: str):
+        """将 in_progress 或 failed 任务重置为 pending"""
+        def change(fd, i, row):
+            if STATUS_NAMES[row[0]] not in ('in_progress', 'failed'):
+                raise TaskError(f"任务状态为 {STATUS_NAMES[row[0]]}，只能重置 in_progress 或 failed 状态")
+            self._set(row, 0, STATUS_CODES['pending'])
+            self._set(row, 1, b'')
+            self._set(row, 2, 0)
+            if not row[2] & (ABSENT << 3):
+                self._set(row, 3, 0)
+        return self._update(task_id, change)
+
+    # ---------- 导出 ----------
+
+    def to_markdown(self) -> str:
+        """还原为 TASKS.md 文本：未修改的任务块原样输出"""
+        data = zlib.decompress(self._read('document'))
+        rows = self._read('rows')
+        parts = []
+        pos = 0
+        i = 0
+        while pos < len(data):
+            kind, length = PIECE.unpack_from(data, pos)
+            pos += PIECE.size
+            text = data[pos:pos + length].decode('utf-8')
+            pos += length
+            if kind == 1:
+                row = rows[i * ROW.size:(i + 1) * ROW.size]
+                if row[1]:
+                    text = apply_row(text, row)
+                i += 1
+            parts.append(text)
+        return ''.join(parts)
+
+
+def apply_row(block: str, data: bytes) -> str:
+    """把状态行写回任务块，字段插入位置与 TaskGraph 的认领 / 完成 / 重置一致"""
+    task = Task.from_block(block)
+    row = decode_row(data)
+    values = (row['status'], row['执行者'], row['认领时间'], row['完成时间'])
+    for i, field in enumerate(STATUS_FIELDS):
+        if row['flags'] & ((RAW | ABSENT) << i):
+            continue
+        if task.get(field) != values[i]:
+            task.set(field, values[i], after=STATUS_FIELDS[i - 1] if i else None)
+    return task.render()
+
+
+def unpack_file(pack_path: Path, out_path: Path) -> int:
+    """.tpk -> TASKS.md，返回任务数"""
+    plan = PackedPlan(pack_path)
+    atomic_write(out_path, plan.to_markdown())
+    return plan.count
+
+
+def verify(md_path: Path) -> tuple:
+    """往返转换校验，返回 (是否一致, Markdown 字节数, 机器格式字节数)"""
+    import tempfile
+    text = md_path.read_text(encoding='utf-8')
+    data = pack_graph(TaskGraph(text))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'plan.tpk'
+        path.write_bytes(data)
+        restored = PackedPlan(path).to_markdown()
+    return restored == text, len(text.encode('utf-8')), len(data)
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def main():
+    commands = ('pack', 'unpack', 'verify', 'status', 'claim', 'complete', 'reset')
+    if len(sys.argv) < 3 or sys.argv[1] not in commands:
+        print(__doc__.split('文件布局')[0].strip())
+        sys.exit(1)
+
+    command, path = sys.argv[1], Path(sys.argv[2])
+    if not path.exists():
+        print(f"✗ 文件不存在: {path}")
+        sys.exit(1)
+    positional = [a for a in sys.argv[3:] if not a.startswith('--')]
+
+    try:
+        if command == 'pack':
+            out = Path(positional[0]) if positional else path.with_suffix('.tpk')
+            count = pack_file(path, out)
+            print(f"✓ 已转换 {count} 个任务: {out}（{out.stat().st_size / 1024:.0f} KB，"
+                  f"原文 {path.stat().st_size / 1024:.0f} KB）")
+        elif command == 'unpack':
+            out = Path(positional[0]) if positional else path.with_suffix('.md')
+            count = unpack_file(path, out)
+            print(f"✓ 已还原 {count} 个任务: {out}")
+        elif command == 'verify':
+            ok, md_size, pack_size = verify(path)
+            if not ok:
+                print("✗ 往返转换结果与原文不一致")
+                sys.exit(1)
+            print(f"✓ 往返转换逐字节一致（Markdown {md_size} 字节，机器格式 {pack_size} 字节）")
+        elif command == 'status':
+            plan = PackedPlan(path)
+            statuses = plan.statuses()
+            counts = {name: statuses.count(code) for name, code in STATUS_CODES.items()}
+            print(f"任务进度: {counts['completed']}/{plan.count} 完成, {counts['in_progress']} 进行中, "
+                  f"{counts['pending']} 待执行, {counts['failed']} 失败")
+            ready = plan.ready()
+            print(f"可执行任务 ({len(ready)} 个): {', '.join(plan.ids[i] for i in ready[:20])}"
+                  + (' ...' if len(ready) > 20 else ''))
+        else:
+            if not positional:
+                print("✗ 请指定任务 ID")
+                sys.exit(1)
+            plan = PackedPlan(path)
+            task_id = positional[0]
+            if command == 'claim':
+                session_id = plan.claim(task_id, get_option('--session'))
+                print(f"✓ 已认领 {task_id}，会话 ID: {session_id}")
+            elif command == 'complete':
+                status = plan.complete(task_id, failed='--failed' in sys.argv)
+                print(f"✓ {task_id} 已标记为 {status}")
+            else:
+                plan.reset(task_id)
+                print(f"✓ {task_id} 已重置为 pending")
+    except TaskError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
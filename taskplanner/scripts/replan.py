@@ -9,180 +9,134 @@
   --split <任务ID>        拆分任务（交互式）
   --merge <任务ID1,任务ID2>  合并任务
   --reprioritize          重新评估优先级
+  --archive [--keep N]    把已完成任务移入归档文件（默认保留最后 5 个已完成任务）
+  --spec-changed [--reset]  比较 PRD / Spec 章节哈希与基线，标记受影响的任务及其后续任务；
+                          --reset 同时把其中已完成 / 失败的任务重新打开为 pending
 
 功能：
 1. 插入修复任务
 2. 拆分过大的任务
 3. 合并过小的任务
 4. 重新评估优先级
+5. 归档已完成任务：正文移入 TASKS.archive.md，任务文档末尾只保留已归档 ID 的区间索引，
+   依赖检查把已归档 ID 视为已完成，任务文档的大小只随进行中的工作增长
+6. 需求变更：按 trace_index.py 的章节哈希找出变化的章节，只处理通过 **需求来源** 引用了
+   这些章节的任务及其传递的后续任务，而不是整体重新规划；受影响的任务写入 **需求变更** 字段，
+   进行中的任务只标记不重置（由执行中的 agent 自行对照新需求）
 """
 
 import sys
-import re
-import json
 from pathlib import Path
-from collections import defaultdict
 
+from datetime import datetime
 
-def parse_tasks(content: str) -> dict:
-    """解析任务文档"""
-    tasks = {}
-    task_pattern = r'### (TASK-\d+):\s*(.+?)(?=\n###|\n## |\Z)'
-    task_matches = re.findall(task_pattern, content, re.DOTALL)
-    
-    for task_id, task_content in task_matches:
-        name_match = re.match(r'([^\n]+)', task_content.strip())
-        name = name_match.group(1).strip() if name_match else task_id
-        
-        status_match = re.search(r'\*\*状态\*\*:\s*(\w+)', task_content)
-        status = status_match.group(1) if status_match else 'pending'
-        
-        priority_match = re.search(r'\*\*优先级\*\*:\s*(P\d+)', task_content)
-        priority = priority_match.group(1) if priority_match else 'P2'
-        
-        dep_match = re.search(r'\*\*依赖\*\*:\s*(.+)', task_content)
-        dependencies = []
-        if dep_match:
-            dep_str = dep_match.group(1).strip()
-            if dep_str != '无' and dep_str != '-':
-                dependencies = re.findall(r'TASK-\d+', dep_str)
-        
-        tasks[task_id] = {
-            'name': name,
-            'status': status,
-            'priority': priority,
-            'dependencies': dependencies,
-            'full_content': task_content
-        }
-    
-    return tasks
+from taskgraph import TaskGraph, TaskError, TIME_FORMAT, archive_path
+from plan_lock import locked, atomic_write
 
 
-def get_next_task_id(tasks: dict) -> str:
-    """获取下一个可用的任务 ID"""
-    max_num = 0
-    for task_id in tasks:
-        match = re.match(r'TASK-(\d+)', task_id)
-        if match:
-            num = int(match.group(1))
-            max_num = max(max_num, num)
-    return f"TASK-{max_num + 1:03d}"
+ARCHIVE_KEEP = 5    # 默认保留的已完成任务数，与检查点产出物检查的窗口一致
 
 
 def insert_fix_task(file_path: Path, failed_task_id: str, fix_description: str) -> str:
-    """为失败任务插入修复任务"""
-    content = file_path.read_text(encoding='utf-8')
-    tasks = parse_tasks(content)
-    
-    if failed_task_id not in tasks:
-        return f"任务 {failed_task_id} 不存在"
-    
-    new_task_id = get_next_task_id(tasks)
-    failed_task = tasks[failed_task_id]
-    
-    # 创建修复任务
-    new_task = f"""
-### {new_task_id}: 修复 {failed_task_id}
-- **状态**: pending
-- **执行者**: -
-- **认领时间**: -
-- **优先级**: P0
-- **依赖**: 无
-- **模块**: 修复
-- **描述**: {fix_description}
-- **验收标准**: {failed_task_id} 可以重新执行
-- **相关文件**: -
-"""
-    
-    # 在任务列表末尾插入
-    insert_pos = content.rfind('\n### TASK-')
-    if insert_pos == -1:
-        return "无法找到插入位置"
-    
-    # 找到该任务块的末尾
-    next_section = content.find('\n## ', insert_pos + 1)
-    if next_section == -1:
-        next_section = len(content)
-    
-    new_content = content[:next_section] + new_task + content[next_section:]
-    
-    # 更新依赖：让失败任务依赖修复任务
-    old_deps = failed_task['dependencies']
-    if old_deps:
-        new_deps = f"[{', '.join(old_deps)}, {new_task_id}]"
-    else:
-        new_deps = f"[{new_task_id}]"
-    
-    # 重置失败任务为 pending
-    new_content = re.sub(
-        rf'(### {failed_task_id}:.*?\n- \*\*状态\*\*:) failed',
-        rf'\1 pending',
-        new_content,
-        flags=re.DOTALL
-    )
-    
-    new_content = re.sub(
-        rf'(### {failed_task_id}:.*?\n- \*\*依赖\*\*:) [^\n]+',
-        rf'\1 {new_deps}',
-        new_content,
-        flags=re.DOTALL
-    )
-    
-    file_path.write_text(new_content, encoding='utf-8')
+    """为失败任务插入修复任务（持有文档锁）"""
+    try:
+        with TaskGraph.transaction(file_path) as graph:
+            new_task_id = graph.insert_fix(failed_task_id, fix_description)
+    except TaskError as e:
+        return str(e)
     return f"已插入修复任务 {new_task_id}，{failed_task_id} 已重置并依赖该任务"
 
 
 def reprioritize_tasks(file_path: Path) -> str:
-    """根据当前状态重新评估优先级"""
-    content = file_path.read_text(encoding='utf-8')
-    tasks = parse_tasks(content)
-    
-    # 统计每个任务被依赖的次数
-    dep_count = defaultdict(int)
-    for info in tasks.values():
-        for dep in info['dependencies']:
-            dep_count[dep] += 1
-    
-    changes = []
-    for task_id, info in tasks.items():
-        if info['status'] != 'pending':
-            continue
-        
-        # 计算新优先级
-        # 被依赖越多，优先级越高
-        dependents = dep_count[task_id]
-        
-        if dependents >= 3:
-            new_priority = 'P0'
-        elif dependents >= 2:
-            new_priority = 'P1'
-        elif dependents >= 1:
-            new_priority = 'P2'
-        else:
-            new_priority = 'P3'
-        
-        if new_priority != info['priority']:
-            changes.append(f"{task_id}: {info['priority']} → {new_priority}")
-            content = re.sub(
-                rf'(### {task_id}:.*?\n.*?\n.*?\n.*?\n- \*\*优先级\*\*:) P\d+',
-                rf'\1 {new_priority}',
-                content,
-                flags=re.DOTALL
-            )
+    """根据当前状态重新评估优先级（持有文档锁）"""
+    with TaskGraph.transaction(file_path) as graph:
+        changes = graph.reprioritize()
     
     if changes:
-        file_path.write_text(content, encoding='utf-8')
-        return "优先级调整:\n" + "\n".join(changes)
+        return "优先级调整:\n" + "\n".join(f"{tid}: {old} → {new}" for tid, old, new in changes)
     else:
         return "无需调整优先级"
 
 
-def suggest_task_adjustments(tasks: dict) -> list:
+def archive_tasks(file_path: Path, keep: int = ARCHIVE_KEEP) -> str:
+    """把已完成任务移入归档文件（持有文档锁）。先写归档文件再写任务文档，
+    中途失败时任务只会同时出现在两处，重新执行会跳过归档文件中已有的任务"""
+    archive = archive_path(file_path)
+    with locked(file_path):
+        graph = TaskGraph.load(file_path)
+        removed = graph.archive_completed(keep)
+        if not removed:
+            return "没有需要归档的已完成任务"
+        if archive.exists():
+            content = archive.read_text(encoding='utf-8')
+        else:
+            title = graph.segments[0].lstrip().split('\n', 1)[0].lstrip('# ').strip() or file_path.stem
+            content = f"# {title} - 已归档任务\n"
+        existing = TaskGraph(content).tasks
+        blocks = [task.render().rstrip('\n') for task in removed if task.id not in existing]
+        if blocks:
+            content = content.rstrip('\n') + '\n\n' + '\n\n'.join(blocks) + '\n'
+            atomic_write(archive, content)
+        graph.save()
+    return f"已归档 {len(removed)} 个已完成任务到 {archive.name}，任务文档剩余 {len(graph)} 个任务"
+
+
+def spec_changed(file_path: Path, reset: bool = False) -> str:
+    """按需求文档章节哈希的变化标记（或重新打开）受影响的任务，任务文档写回后把当前哈希保存为新基线"""
+    from trace_index import (build_index, load_baseline, save_baseline, diff_sections, innermost,
+                             affected_tasks)
+    affected, reopened, flagged_running = {}, [], []
+    with TaskGraph.transaction(file_path) as graph:
+        index = build_index(graph)
+        if not index['documents']:
+            return "✗ 找不到任务文档元信息中的 PRD / Spec 文档"
+        baseline = load_baseline(file_path)
+        diff = diff_sections(baseline, index) if baseline is not None else None
+        sections = diff['changed'] + diff['removed'] if diff else []
+        if sections:
+            affected = affected_tasks(graph, index, sections, baseline)
+            stamp = datetime.now().strftime(TIME_FORMAT)
+            for tid, reason in affected.items():
+                task = graph.get(tid)
+                task.set('需求变更', f"{reason}（{stamp}）")
+                if reset and task.status in ('completed', 'failed'):
+                    graph.reopen(tid)
+                    reopened.append(tid)
+                elif task.status == 'in_progress':
+                    flagged_running.append(tid)
+        graph.dirty = bool(affected)
+
+    # 任务文档写回成功后才更新基线：中途失败时基线不变，下次运行仍能发现这次变化
+    save_baseline(file_path, index)
+    if baseline is None:
+        count = sum(len(doc['sections']) for doc in index['documents'].values())
+        return f"已建立章节哈希基线（{count} 个章节），修改 PRD / Spec 后再次运行以找出受影响的任务"
+    if not sections:
+        return "需求文档没有变化" + (f"（新增章节: {', '.join(diff['added'])}）" if diff['added'] else '')
+
+    lines = [f"变化的章节: {', '.join(innermost(index, diff['changed'])) or '无'}"]
+    if diff['removed']:
+        lines.append(f"删除的章节: {', '.join(diff['removed'])}")
+    if diff['added']:
+        lines.append(f"新增的章节: {', '.join(diff['added'])}（尚无任务引用，可能需要补充任务）")
+    if not affected:
+        lines.append("没有任务引用这些章节")
+        return '\n'.join(lines)
+    lines.append(f"受影响的任务（{len(affected)} 个，已写入 需求变更 字段）:")
+    lines += [f"  {tid}: {reason}" for tid, reason in affected.items()]
+    if reopened:
+        lines.append(f"已重新打开为 pending: {', '.join(reopened)}")
+    if flagged_running:
+        lines.append(f"进行中（只标记，未重置）: {', '.join(flagged_running)}")
+    return '\n'.join(lines)
+
+
+def suggest_task_adjustments(graph: TaskGraph) -> list:
     """分析并建议任务调整"""
     suggestions = []
     
-    pending = [tid for tid, info in tasks.items() if info['status'] == 'pending']
-    failed = [tid for tid, info in tasks.items() if info['status'] == 'failed']
+    pending = [task.id for task in graph if task.status == 'pending']
+    failed = [task.id for task in graph if task.status == 'failed']
     
     # 建议：处理失败任务
     for tid in failed:
@@ -193,12 +147,8 @@ def suggest_task_adjustments(tasks: dict) -> list:
         })
     
     # 建议：检查是否有孤立任务（无依赖也不被依赖的 pending 任务）
-    all_deps = set()
-    for info in tasks.values():
-        all_deps.update(info['dependencies'])
-    
-    orphans = [tid for tid in pending if 
-               not tasks[tid]['dependencies'] and tid not in all_deps]
+    orphans = [tid for tid in pending if
+               not graph.get(tid).dependencies and not graph.dependents.get(tid)]
     
     if len(orphans) > 3:
         suggestions.append({
@@ -216,6 +166,8 @@ def main():
         print("选项:")
         print("  --insert-fix <失败任务ID> <修复描述>  为失败任务插入修复任务")
         print("  --reprioritize                        重新评估优先级")
+        print("  --archive [--keep N]                  归档已完成任务（默认保留最后 5 个）")
+        print("  --spec-changed [--reset]              标记（或重新打开）受需求文档变更影响的任务")
         print("  --suggest                             分析并建议调整")
         sys.exit(1)
     
@@ -239,10 +191,21 @@ def main():
         result = reprioritize_tasks(file_path)
         print(result)
     
+    elif '--archive' in sys.argv:
+        keep = ARCHIVE_KEEP
+        if '--keep' in sys.argv:
+            idx = sys.argv.index('--keep')
+            if idx + 1 >= len(sys.argv) or not sys.argv[idx + 1].isdigit():
+                print("✗ --keep 需要指定保留的任务数")
+                sys.exit(1)
+            keep = int(sys.argv[idx + 1])
+        print(archive_tasks(file_path, keep))
+    
+    elif '--spec-changed' in sys.argv:
+        print(spec_changed(file_path, '--reset' in sys.argv))
+    
     elif '--suggest' in sys.argv:
-        content = file_path.read_text(encoding='utf-8')
-        tasks = parse_tasks(content)
-        suggestions = suggest_task_adjustments(tasks)
+        suggestions = suggest_task_adjustments(TaskGraph.load(file_path))
         
         if suggestions:
             print("调整建议:")
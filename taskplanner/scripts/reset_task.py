@@ -10,33 +10,19 @@
 """
 
 import sys
-import re
 from pathlib import Path
 
+from taskgraph import TaskGraph, TaskError
+
 
 def reset_task(file_path: Path, task_id: str) -> tuple:
-    """重置任务"""
-    content = file_path.read_text(encoding='utf-8')
-    
-    # 检查任务状态
-    task_pattern = rf'### {task_id}:.*?\n- \*\*状态\*\*: (\w+)'
-    match = re.search(task_pattern, content, re.DOTALL)
-    
-    if not match:
-        return False, f"任务 {task_id} 不存在"
-    
-    current_status = match.group(1)
-    if current_status not in ['in_progress', 'failed']:
-        return False, f"任务状态为 {current_status}，只能重置 in_progress 或 failed 状态"
-    
-    # 重置任务
-    old_pattern = rf'(### {task_id}:.*?\n- \*\*状态\*\*:) \w+\n- \*\*执行者\*\*: [^\n]+\n- \*\*认领时间\*\*: [^\n]+'
-    new_text = rf'\1 pending\n- **执行者**: -\n- **认领时间**: -'
-    
-    new_content = re.sub(old_pattern, new_text, content, flags=re.DOTALL)
-    
-    file_path.write_text(new_content, encoding='utf-8')
-    return True, "已重置"
+    """重置任务（持有文档锁）"""
+    try:
+        with TaskGraph.transaction(file_path) as graph:
+            graph.reset(task_id)
+            return True, "已重置"
+    except TaskError as e:
+        return False, str(e)
 
 
 def main():
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+流水线执行器 - 让 K 个 agent 槽位持续处于忙碌状态，去掉每轮之间的屏障
+
+用法：python run_plan.py <任务文档路径> --agent "<命令模板>" [选项]
+
+选项：
+  --agent <命令模板>       执行单个任务的命令，可用占位符 {task} {session} {file} {slot}
+                           （按 shell 命令执行，占位符的值会自动加引号，字面量花括号写成 {{ }}），
+                           退出码 0 视为完成
+  --slots <K>              并行槽位数（默认取资源限制表中 agent 的上限，未声明时为 4）
+  --timeout <秒>           单个任务超时，超时视为失败（默认不限）
+  --max-fixes <N>          同一任务失败后自动插入修复任务的次数上限（默认 1），超过后保持 failed；
+                           修复任务本身失败时计入原任务的次数，不会无限插入修复的修复
+  --avoid-conflicts        不认领相关文件与进行中任务重叠的任务
+  --project-root <目录>    任务完成后在后台检查其产出物和受影响项目（不阻塞槽位）
+  --skip-lint              后台检查只验证产出物，不运行代码检查
+  --log-dir <目录>         保存每次执行的输出（<任务ID>-<第几次>.log）
+  --report <路径>          把执行记录与利用率报告写入 JSON 文件
+
+与 SKILL.md 的轮次循环（next → 认领 4 个 → 执行 → 完成 → 检查点 → 下一轮）相比：
+1. 任一槽位空闲时立即从可执行集合认领新任务，一个慢任务不再拖住其他槽位
+2. 认领遵守 ## 资源限制（见 next_task.py），槽位多于可用令牌时多出的槽位保持空闲
+3. 每个槽位使用固定的会话 ID，按亲和度（affinity.py）挑选与其近期工作相近的任务；
+   命令的环境变量 TASKPLANNER_SESSION / TASKPLANNER_TASK 为会话 ID 和任务 ID，
+   安装 git_audit.py 的提交钩子后 agent 的提交会自动带上对应尾注
+4. 任务完成后的检查点检查在后台线程中执行，结果汇总在最终报告中
+5. 任务失败时自动 insert-fix：插入修复任务，失败任务重置并依赖修复任务，随后照常调度；
+   agent 已自行执行 complete_task.py 时采用其标记的结果，任务已被重置时不修改其状态
+6. 结束时按实际耗时回放轮次模型，对比总耗时与槽位利用率
+
+按 Ctrl+C 中止时终止正在执行的命令，并把它们的任务重置为 pending。
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import shlex
+import threading
+import traceback
+from collections import Counter
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from taskgraph import TaskGraph, TaskError, AGENT_RESOURCE, generate_session_id
+from claim_task import claim_ready
+from git_audit import SESSION_ENV, TASK_ENV
+
+
+OUTPUT_TAIL = 800      # 修复任务描述中保留的失败输出长度
+PLACEHOLDERS = ('task', 'session', 'file', 'slot')
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def render_command(template: str, values: dict) -> str:
+    """填充命令模板，占位符的值加引号；模板无效（未知占位符、不成对的花括号）时抛出 ValueError"""
+    try:
+        return template.format(**{k: shlex.quote(v) for k, v in values.items()})
+    except KeyError as e:
+        raise ValueError(f"未知占位符 {{{e.args[0]}}}（可用: {', '.join('{%s}' % k for k in PLACEHOLDERS)}）")
+    except (IndexError, AttributeError, ValueError) as e:
+        raise ValueError(str(e) or '占位符格式错误')
+
+
+def kill_process(proc: subprocess.Popen):
+    """结束命令及其子进程（shell 启动的命令在独立进程组中）"""
+    try:
+        if os.name == 'posix':
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass
+
+
+def claim_next(file_path: Path, session_id: str, avoid_conflicts: bool = False):
+    """在文档锁内按亲和度认领下一个任务，返回 (任务ID, 依赖列表, 资源令牌)；没有可认领任务时返回 None"""
+    with TaskGraph.transaction(file_path) as graph:
+        task, _ = claim_ready(graph, session_id, avoid_conflicts)
+        return None if task is None else (task.id, list(task.dependencies), sorted(task.tokens))
+
+
+def finish_task(file_path: Path, task_id: str, session_id: str, ok: bool, output: str, allow_fix: bool):
+    """
+    完成或标记失败；失败且允许时插入修复任务
+
+    agent 可能已自行执行 complete_task.py：任务已是 completed / failed 时采用其结果；
+    任务已被重置、重新打开或由其他会话重新认领时不做修改。
+
+    Returns:
+        tuple: (最终状态，未修改时为 None, 修复任务 ID)
+    """
+    with TaskGraph.transaction(file_path) as graph:
+        if task_id in graph.archived:
+            return 'completed', None
+        if task_id not in graph:
+            return None, None
+        task = graph.get(task_id)
+        if task.status == 'in_progress' and task.get('执行者') == session_id:
+            status = graph.complete(task_id, failed=not ok)
+        elif task.status in ('completed', 'failed') and task.get('执行者') == session_id:
+            status = task.status
+        else:
+            return None, None
+        if status == 'completed' or not allow_fix:
+            return status, None
+        tail = ' '.join(output.strip()[-OUTPUT_TAIL:].split())
+        description = f"修复 {task_id} 执行失败的问题" + (f"：{tail}" if tail else '')
+        return status, graph.insert_fix(task_id, description)
+
+
+def reset_tasks(file_path: Path, task_ids: list):
+    with TaskGraph.transaction(file_path) as graph:
+        for task_id in task_ids:
+            try:
+                graph.reset(task_id)
+            except TaskError:
+                pass
+
+
+class BackgroundChecker:
+    """任务完成后的检查点检查：单线程后台执行，不占用 agent 槽位"""
+
+    def __init__(self, file_path: Path, project_root: Path, skip_lint: bool):
+        self.file_path = file_path
+        self.project_root = project_root
+        self.skip_lint = skip_lint
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.results = []
+        self.projects = None
+
+    def submit(self, task_id: str):
+        self.pool.submit(self._check, task_id)
+
+    def _check(self, task_id: str):
+        from checkpoint import check_file_exists
+        from check_runner import discover_projects, select_affected, build_jobs, run_checks
+        try:
+            files = TaskGraph.load(self.file_path).get(task_id).related_files
+        except TaskError:
+            files = []      # 已被并发的归档移出
+        result = {'task': task_id, 'missing': check_file_exists(self.project_root, files), 'lint': []}
+        if not self.skip_lint and files:
+            if self.projects is None:
+                self.projects = discover_projects(self.project_root)
+            projects = select_affected(self.projects, files)
+            result['lint'] = [{'location': r['location'], 'adapter': r['adapter'], 'ok': r['ok'],
+                               'diagnostics': len(r['diagnostics'])}
+                              for r in run_checks(build_jobs(projects))]
+        result['ok'] = not result['missing'] and all(r['ok'] for r in result['lint'])
+        self.results.append(result)
+        if not result['ok']:
+            problems = ([f"缺少产出物 {', '.join(result['missing'])}"] if result['missing'] else []) + \
+                       [f"{r['location'] or '.'} {r['adapter']} 检查未通过" for r in result['lint'] if not r['ok']]
+            print(f"  ⚠️ 检查点 {task_id}: {'；'.join(problems)}", flush=True)
+
+    def close(self) -> list:
+        self.pool.shutdown(wait=True)
+        return self.results
+
+
+def simulate_barrier(runs: list, slots: int, limits: dict = None) -> float:
+    """用实际耗时回放轮次模型：每轮最多认领 slots 个可执行且资源令牌足够的任务，全部结束后才进入下一轮。
+    依赖关系取自实际执行：依赖任务的成功执行、同一任务的上一次尝试"""
+    deps = []
+    completed_run = {}
+    last_attempt = {}
+    for i, run in enumerate(runs):
+        deps.append({completed_run[d] for d in run['dependencies'] if d in completed_run}
+                    | ({last_attempt[run['task']]} if run['task'] in last_attempt else set()))
+        last_attempt[run['task']] = i
+        if run['ok']:
+            completed_run[run['task']] = i
+    done = set()
+    remaining = list(range(len(runs)))
+    elapsed = 0.0
+    while remaining:
+        batch, usage = [], Counter()
+        for i in remaining:
+            if len(batch) == slots:
+                break
+            tokens = runs[i]['resources']
+            if deps[i] <= done and all(usage[r] < (limits or {}).get(r, slots) for r in tokens):
+                usage.update(tokens)
+                batch.append(i)
+        if not batch:       # 依赖来自执行器之外（理论上不会发生），剩余任务放在最后一轮
+            batch = remaining[:slots]
+        elapsed += max(runs[i]['duration'] for i in batch)
+        done.update(batch)
+        remaining = [i for i in remaining if i not in done]
+    return elapsed
+
+
+def utilization_report(runs: list, slots: int, wall: float, limits: dict = None) -> dict:
+    busy = sum(run['duration'] for run in runs)
+    barrier = simulate_barrier(runs, slots, limits)
+    return {
+        'slots': slots,
+        'runs': len(runs),
+        'failed_runs': sum(1 for run in runs if run.get('status') == 'failed'),
+        'skipped_runs': sum(1 for run in runs if run.get('status') == 'skipped'),
+        'busy_seconds': round(busy, 2),
+        'pipelined': {'makespan': round(wall, 2),
+                      'utilization': round(busy / (slots * wall), 3) if wall else 0.0},
+        'barrier': {'makespan': round(barrier, 2),
+                    'utilization': round(busy / (slots * barrier), 3) if barrier else 0.0},
+        'speedup': round(barrier / wall, 2) if wall else 0.0,
+    }
+
+
+class Runner:
+    def __init__(self, file_path: Path, agent: str, slots: int, timeout: float = None,
+                 max_fixes: int = 1, avoid_conflicts: bool = False, checker: BackgroundChecker = None,
+                 log_dir: Path = None):
+        self.file_path = file_path
+        self.agent = agent
+        self.slots = slots
+        self.timeout = timeout
+        self.max_fixes = max_fixes
+        self.avoid_conflicts = avoid_conflicts
+        self.checker = checker
+        self.log_dir = log_dir
+        self.sessions = [generate_session_id() for _ in range(slots)]
+        self.events = queue.Queue()
+        self.running = {}      # slot -> {task, dependencies, start, proc}
+        self.runs = []
+        self.attempts = {}     # task_id -> 执行次数
+        self.fixes = {}        # 原任务 ID -> 已插入的修复任务数
+        self.fix_root = {}     # 修复任务 ID -> 原任务 ID（修复任务失败时计入原任务的次数）
+        self.started = None
+
+    def _command(self, task_id: str, slot: int) -> str:
+        values = {'task': task_id, 'session': self.sessions[slot], 'file': str(self.file_path),
+                  'slot': str(slot)}
+        return render_command(self.agent, values)
+
+    def _execute(self, slot: int, task_id: str):
+        """工作线程：执行命令并把结果放入事件队列"""
+        entry = self.running[slot]
+        try:
+            env = dict(os.environ, **{SESSION_ENV: self.sessions[slot], TASK_ENV: task_id})
+            proc = subprocess.Popen(self._command(task_id, slot), shell=True, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, start_new_session=os.name == 'posix',
+                                    env=env)
+            entry['proc'] = proc
+            try:
+                output, _ = proc.communicate(timeout=self.timeout)
+                ok = proc.returncode == 0
+            except subprocess.TimeoutExpired:
+                kill_process(proc)
+                output, _ = proc.communicate()
+                output = (output or b'') + f"\n执行超时（{self.timeout}s）".encode('utf-8')
+                ok = False
+            text = output.decode('utf-8', errors='replace') if output else ''
+        except OSError as e:
+            ok, text = False, str(e)
+        except Exception:
+            ok, text = False, traceback.format_exc()   # 保证事件一定入队，主循环不会一直等待
+        self.events.put((slot, ok, text))
+
+    def _fill(self):
+        """为所有空闲槽位认领任务"""
+        for slot in range(self.slots):
+            if slot in self.running:
+                continue
+            claimed = claim_next(self.file_path, self.sessions[slot], self.avoid_conflicts)
+            if claimed is None:
+                return
+            task_id, dependencies, tokens = claimed
+            self.attempts[task_id] = self.attempts.get(task_id, 0) + 1
+            self.running[slot] = {'task': task_id, 'dependencies': dependencies, 'resources': tokens,
+                                  'start': time.monotonic(), 'proc': None}
+            print(f"▶ [槽位 {slot}] {task_id} 开始", flush=True)
+            threading.Thread(target=self._execute, args=(slot, task_id), daemon=True).start()
+
+    def _finish(self, slot: int, ok: bool, output: str):
+        entry = self.running.pop(slot)
+        task_id = entry['task']
+        duration = time.monotonic() - entry['start']
+        if self.log_dir:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            (self.log_dir / f"{task_id}-{self.attempts[task_id]}.log").write_text(output, encoding='utf-8')
+        root = self.fix_root.get(task_id, task_id)
+        allow_fix = self.fixes.get(root, 0) < self.max_fixes
+        try:
+            status, fix_id = finish_task(self.file_path, task_id, self.sessions[slot], ok, output, allow_fix)
+        except TaskError as e:
+            print(f"⚠️ [槽位 {slot}] {task_id} 无法更新状态: {e}", flush=True)
+            status, fix_id = None, None
+        self.runs.append({'task': task_id, 'slot': slot, 'ok': status == 'completed',
+                          'status': status or 'skipped', 'dependencies': entry['dependencies'],
+                          'resources': entry['resources'],
+                          'start': round(entry['start'] - self.started, 3),
+                          'duration': round(duration, 3), 'fix': fix_id})
+        if status == 'completed':
+            print(f"✓ [槽位 {slot}] {task_id} 完成（{duration:.1f}s）", flush=True)
+            if self.checker:
+                self.checker.submit(task_id)
+        elif status is None:
+            print(f"⚠️ [槽位 {slot}] {task_id} 结束（{duration:.1f}s），任务已被重置或重新认领，不修改状态",
+                  flush=True)
+        elif fix_id:
+            self.fixes[root] = self.fixes.get(root, 0) + 1
+            self.fix_root[fix_id] = root
+            print(f"✗ [槽位 {slot}] {task_id} 失败（{duration:.1f}s），已插入修复任务 {fix_id}", flush=True)
+        else:
+            print(f"✗ [槽位 {slot}] {task_id} 失败（{duration:.1f}s），已达修复次数上限，保持 failed",
+                  flush=True)
+
+    def run(self) -> dict:
+        self.started = time.monotonic()
+        try:
+            self._fill()
+            while self.running:
+                slot, ok, output = self.events.get()
+                self._finish(slot, ok, output)
+                self._fill()
+        except KeyboardInterrupt:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)    # 清理期间忽略重复的中断
+            for entry in self.running.values():
+                if entry['proc'] and entry['proc'].poll() is None:
+                    kill_process(entry['proc'])
+            reset_tasks(self.file_path, [entry['task'] for entry in self.running.values()])
+            print(f"\n已中止，{len(self.running)} 个进行中的任务已重置为 pending")
+            self.running.clear()
+        wall = time.monotonic() - self.started
+        limits = TaskGraph.load(self.file_path).resource_limits
+        return {'runs': self.runs, 'utilization': utilization_report(self.runs, self.slots, wall, limits)}
+
+
+def print_summary(report: dict, graph: TaskGraph):
+    u = report['utilization']
+    counts = graph.status_counts()
+    print()
+    print("执行汇总")
+    print("=" * 60)
+    print(f"任务进度: {counts['completed']}/{graph.total} 完成, {counts['failed']} 失败, "
+          f"{counts['pending']} 待执行")
+    skipped = f"，跳过 {u['skipped_runs']}" if u['skipped_runs'] else ''
+    print(f"执行次数: {u['runs']}（失败 {u['failed_runs']}{skipped}），槽位忙碌合计 {u['busy_seconds']}s")
+    print(f"流水线: 总耗时 {u['pipelined']['makespan']}s，利用率 {u['pipelined']['utilization']:.0%}")
+    print(f"轮次模型（按实际耗时回放）: 总耗时 {u['barrier']['makespan']}s，"
+          f"利用率 {u['barrier']['utilization']:.0%}")
+    print(f"加速比: {u['speedup']}x")
+    checks = report.get('checks')
+    if checks is not None:
+        failed = [c['task'] for c in checks if not c['ok']]
+        print(f"后台检查: {len(checks)} 个任务" + (f"，未通过 {', '.join(failed)}" if failed else "，全部通过"))
+    if counts['pending'] and not counts['in_progress'] and not graph.query():
+        print("⚠️ 仍有 pending 任务但没有可执行任务（依赖失败或未完成）")
+
+
+def main():
+    agent = get_option('--agent')
+    if len(sys.argv) < 2 or not agent:
+        print("用法: python run_plan.py <任务文档路径> --agent \"命令模板\" [--slots K] [--timeout 秒] "
+              "[--max-fixes N] [--avoid-conflicts] [--project-root 目录] [--skip-lint] "
+              "[--log-dir 目录] [--report 路径]")
+        sys.exit(1)
+
+    file_path = Path(sys.argv[1])
+    if not file_path.exists():
+        print(f"✗ 文件不存在: {file_path}")
+        sys.exit(1)
+    try:
+        render_command(agent, {k: k for k in PLACEHOLDERS})
+    except ValueError as e:
+        print(f"✗ 命令模板无效: {e}（字面量花括号请写成 {{{{ }}}}）")
+        sys.exit(1)
+
+    project_root = get_option('--project-root')
+    checker = BackgroundChecker(file_path, Path(project_root), '--skip-lint' in sys.argv) \
+        if project_root else None
+    timeout = get_option('--timeout')
+    log_dir = get_option('--log-dir')
+    runner = Runner(
+        file_path, agent,
+        slots=int(get_option('--slots') or TaskGraph.load(file_path).resource_limits[AGENT_RESOURCE]),
+        timeout=float(timeout) if timeout else None,
+        max_fixes=int(get_option('--max-fixes', 1)),
+        avoid_conflicts='--avoid-conflicts' in sys.argv,
+        checker=checker,
+        log_dir=Path(log_dir) if log_dir else None,
+    )
+    report = runner.run()
+    if checker:
+        report['checks'] = checker.close()
+
+    print_summary(report, TaskGraph.load(file_path))
+    report_path = get_option('--report')
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
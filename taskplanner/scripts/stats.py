@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+执行统计与完成时间预测
+
+用法：python stats.py <任务文档路径> [选项]
+
+选项：
+  --agents <N>          预测时的并行 agent 数（默认 4）
+  --trials <N>          蒙特卡洛模拟次数（默认 500）
+  --seed <N>            随机种子（默认 42）
+  --json                输出 JSON
+  --write-estimates     把每个未完成任务的预估耗时（中位数，分钟）写入 预估耗时 字段
+
+统计内容：
+1. 耗时分布：已完成任务的 完成时间 - 认领时间，按模块和任务粒度（相关文件数：
+   1 个为小，2-3 个为中，更多为大）给出 样本数 / 均值 / p50 / p90 / 最大值
+2. 吞吐：观察窗口（首次认领到最后一次完成）内每小时完成的任务数，以及各执行者的完成数
+3. 完成时间预测：对剩余 DAG 做蒙特卡洛模拟——每个未完成任务的耗时从同模块
+   （样本不足时同粒度，再不足时全部）历史耗时中有放回抽样，进行中的任务只抽取
+   超过已用时长的样本；按优先级和关键路径把可执行任务分配给空闲 agent，
+   得到剩余工期的 p50 / p80 / p95
+
+预估耗时写回任务文档后，next_task.py --session 的关键路径按预估耗时累计。
+"""
+
+import sys
+import json
+import heapq
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from taskgraph import TaskGraph, archive_path, parse_time
+
+
+DEFAULT_AGENTS = 4
+DEFAULT_TRIALS = 500
+MIN_SAMPLES = 3          # 同模块样本少于此数时退回同粒度 / 全部样本
+GRANULARITIES = ('小', '中', '大')
+
+
+def get_option(name: str, default=None):
+    """读取命令行选项值（--name value）"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def granularity(task) -> str:
+    """任务粒度（SKILL.md 阶段 4）：按相关文件数近似"""
+    n = len(task.related_files)
+    if n <= 1:
+        return '小'
+    if n <= 3:
+        return '中'
+    return '大'
+
+
+def task_records(graph: TaskGraph) -> list:
+    """已完成且有认领/完成时间的任务耗时记录"""
+    records = []
+    for task in graph:
+        if task.status != 'completed':
+            continue
+        claimed = parse_time(task.get('认领时间'))
+        completed = parse_time(task.get('完成时间'))
+        if not claimed or not completed or completed < claimed:
+            continue
+        records.append({
+            'id': task.id,
+            'module': task.module,
+            'granularity': granularity(task),
+            'executor': task.get('执行者', '-'),
+            'claimed': claimed,
+            'completed': completed,
+            'minutes': (completed - claimed).total_seconds() / 60,
+        })
+    return records
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize(values: list) -> dict:
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 1) if values else 0.0,
+        'p50': round(percentile(values, 50), 1),
+        'p90': round(percentile(values, 90), 1),
+        'max': round(max(values), 1) if values else 0.0,
+    }
+
+
+def distributions(records: list) -> dict:
+    by_module, by_granularity = {}, {}
+    for r in records:
+        by_module.setdefault(r['module'] or '-', []).append(r['minutes'])
+        by_granularity.setdefault(r['granularity'], []).append(r['minutes'])
+    return {
+        'all': summarize([r['minutes'] for r in records]),
+        'module': {k: summarize(v) for k, v in sorted(by_module.items())},
+        'granularity': {g: summarize(by_granularity[g]) for g in GRANULARITIES
+                        if g in by_granularity},
+    }
+
+
+def throughput(records: list) -> dict:
+    if not records:
+        return {'window_hours': 0.0, 'per_hour': 0.0, 'executors': {}}
+    start = min(r['claimed'] for r in records)
+    end = max(r['completed'] for r in records)
+    hours = max((end - start).total_seconds() / 3600, 1 / 60)
+    executors = {}
+    for r in records:
+        executors[r['executor']] = executors.get(r['executor'], 0) + 1
+    return {
+        'window_hours': round(hours, 2),
+        'per_hour': round(len(records) / hours, 2),
+        'executors': dict(sorted(executors.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def sample_pools(records: list) -> dict:
+    """按模块 / 粒度分组的历史耗时样本"""
+    pools = {'module': {}, 'granularity': {}, 'all': [r['minutes'] for r in records]}
+    for r in records:
+        pools['module'].setdefault(r['module'], []).append(r['minutes'])
+        pools['granularity'].setdefault(r['granularity'], []).append(r['minutes'])
+    return pools
+
+
+def duration_samples(task, pools: dict) -> list:
+    """任务耗时的经验样本：同模块 → 同粒度 → 全部"""
+    same_module = pools['module'].get(task.module, [])
+    if len(same_module) >= MIN_SAMPLES:
+        return same_module
+    same_size = pools['granularity'].get(granularity(task), [])
+    if len(same_size) >= MIN_SAMPLES:
+        return same_size
+    return pools['all']
+
+
+def estimates(graph: TaskGraph, records: list) -> dict:
+    """未完成任务的预估耗时（经验样本中位数，分钟）"""
+    pools = sample_pools(records)
+    medians = {}
+    result = {}
+    for task in graph:
+        if task.status == 'completed':
+            continue
+        samples = duration_samples(task, pools)
+        if samples:
+            if id(samples) not in medians:
+                medians[id(samples)] = round(percentile(samples, 50), 1)
+            result[task.id] = medians[id(samples)]
+    return result
+
+
+def simulate(graph: TaskGraph, records: list, agents: int = DEFAULT_AGENTS,
+             trials: int = DEFAULT_TRIALS, seed: int = 42, now: datetime = None) -> list:
+    """蒙特卡洛模拟剩余工期，返回每次模拟的剩余分钟数"""
+    if not records:
+        return []
+    now = now or datetime.now()
+    rng = random.Random(seed)
+    open_ids = [tid for tid, task in graph.tasks.items() if task.status != 'completed']
+    open_set = set(open_ids)
+    pools = sample_pools(records)
+    samples = {tid: duration_samples(graph.tasks[tid], pools) for tid in open_ids}
+    elapsed = {}
+    for tid in open_ids:
+        task = graph.tasks[tid]
+        claimed = parse_time(task.get('认领时间')) if task.status == 'in_progress' else None
+        if claimed:
+            elapsed[tid] = max((now - claimed).total_seconds() / 60, 0.0)
+            longer = [m for m in samples[tid] if m > elapsed[tid]]
+            # 已超过所有历史样本时，假设还需要一个中位数耗时的 10%
+            samples[tid] = [m - elapsed[tid] for m in longer] or [percentile(samples[tid], 50) * 0.1]
+
+    depths = graph.remaining_depths()
+    dependents = graph.dependents
+    waiting = {tid: sum(1 for d in graph.tasks[tid].dependencies if d in open_set) for tid in open_ids}
+    rank = {tid: (graph.tasks[tid].priority, -depths.get(tid, 1), i) for i, tid in enumerate(open_ids)}
+
+    results = []
+    for _ in range(trials):
+        remaining = dict(waiting)
+        ready = [(rank[tid], tid) for tid in open_ids
+                 if remaining[tid] == 0 and tid not in elapsed]
+        heapq.heapify(ready)
+        running = [(rng.choice(samples[tid]), tid) for tid in elapsed]
+        heapq.heapify(running)
+        clock = 0.0
+        while ready or running:
+            while ready and len(running) < agents:
+                _, tid = heapq.heappop(ready)
+                heapq.heappush(running, (clock + rng.choice(samples[tid]), tid))
+            if not running:
+                break  # 剩余任务存在环或缺失依赖，无法继续调度
+            clock, tid = heapq.heappop(running)
+            for child in dependents.get(tid, ()):
+                if child in remaining:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        heapq.heappush(ready, (rank[child], child))
+        results.append(clock)
+    return results
+
+
+def forecast(makespans: list, now: datetime = None) -> dict:
+    if not makespans:
+        return {}
+    now = now or datetime.now()
+    result = {}
+    for p in (50, 80, 95):
+        minutes = percentile(makespans, p)
+        result[f"p{p}"] = {
+            'minutes': round(minutes, 1),
+            'finish': (now + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M"),
+        }
+    return result
+
+
+def write_estimates(file_path: Path, values: dict) -> int:
+    """把预估耗时写入任务文档（在 认领时间/完成时间 之后），返回写入的任务数"""
+    with TaskGraph.transaction(file_path) as graph:
+        count = 0
+        for tid, minutes in values.items():
+            task = graph.tasks.get(tid)
+            if task is None or task.status == 'completed':
+                continue
+            graph.set_estimate(tid, minutes)
+            count += 1
+        return count
+
+
+def format_summary(s: dict) -> str:
+    return (f"{s['count']:>4} 个  均值 {s['mean']:>7.1f}  p50 {s['p50']:>7.1f}  "
+            f"p90 {s['p90']:>7.1f}  最大 {s['max']:>7.1f}")
+
+
+def print_report(report: dict):
+    print("执行统计")
+    print("=" * 60)
+    progress = report['progress']
+    print(f"任务进度: {progress['completed']}/{progress['total']} 完成, "
+          f"{progress['in_progress']} 进行中, {progress['remaining']} 未完成")
+
+    dist = report['durations']
+    if not dist['all']['count']:
+        print("\n⚠ 尚无带 认领时间 / 完成时间 的已完成任务，无法统计耗时")
+        return
+
+    print("\n⏱ 耗时分布（分钟）")
+    print(f"  全部      {format_summary(dist['all'])}")
+    print("  按模块:")
+    for name, s in dist['module'].items():
+        print(f"    {name:<8}{format_summary(s)}")
+    print("  按粒度:")
+    for name, s in dist['granularity'].items():
+        print(f"    {name:<8}{format_summary(s)}")
+
+    tp = report['throughput']
+    print(f"\n📈 吞吐: {tp['per_hour']} 任务/小时（观察窗口 {tp['window_hours']} 小时）")
+    executors = tp['executors']
+    print(f"    {len(executors)} 个执行者，人均完成 {dist['all']['count'] / len(executors):.1f} 个")
+    for executor, count in list(executors.items())[:5]:
+        print(f"    {executor}: {count}")
+
+    fc = report['forecast']
+    if fc:
+        print(f"\n🔮 完成时间预测（{report['agents']} 个 agent，{report['trials']} 次模拟）")
+        for p, value in fc.items():
+            print(f"    {p}: 剩余 {value['minutes']:.0f} 分钟，预计 {value['finish']} 完成")
+    elif progress['remaining']:
+        print("\n🔮 无法预测完成时间")
+    else:
+        print("\n✓ 所有任务已完成")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python stats.py <任务文档路径> [--agents N] [--trials N] [--seed N] "
+              "[--json] [--write-estimates]")
+        sys.exit(1)
+
+    file_path = Path(sys.argv[1])
+    if not file_path.exists():
+        print(f"✗ 文件不存在: {file_path}")
+        sys.exit(1)
+
+    agents = int(get_option('--agents', DEFAULT_AGENTS))
+    trials = int(get_option('--trials', DEFAULT_TRIALS))
+    seed = int(get_option('--seed', 42))
+
+    graph = TaskGraph.load(file_path)
+    now = datetime.now()
+    records = task_records(graph)
+    archive = archive_path(file_path)
+    if archive.exists():
+        records += task_records(TaskGraph.load(archive))    # 已归档任务的耗时同样计入样本
+    counts = graph.status_counts()
+    makespans = simulate(graph, records, agents, trials, seed, now)
+
+    report = {
+        'progress': {
+            'total': graph.total,
+            'completed': counts['completed'],
+            'in_progress': counts['in_progress'],
+            'remaining': graph.total - counts['completed'],
+        },
+        'durations': distributions(records),
+        'throughput': throughput(records),
+        'agents': agents,
+        'trials': trials,
+        'forecast': forecast(makespans, now),
+        'estimates': estimates(graph, records),
+    }
+
+    if '--json' in sys.argv:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+    if '--write-estimates' in sys.argv:
+        count = write_estimates(file_path, report['estimates'])
+        if '--json' not in sys.argv:
+            print(f"\n✓ 已写入 {count} 个任务的预估耗时")
+
+
+if __name__ == '__main__':
+    main()
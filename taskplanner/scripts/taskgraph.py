@@ -0,0 +1,936 @@
+#!/usr/bin/env python3
+"""
+任务图库 - taskplanner 脚本的可导入核心
+
+编排器可以在进程内直接使用，避免每次操作都启动解释器并重新解析文档：
+
+    import sys
+    sys.path.insert(0, 'taskplanner/scripts')
+    from taskgraph import TaskGraph, TaskError
+
+    graph = TaskGraph.load('TASKS.md')
+    for task in graph.ready():
+        print(task.id, task.priority)
+    session = graph.claim('TASK-001')
+    graph.complete('TASK-001')
+    graph.save()                      # 显式同步到磁盘
+
+    # 与其他进程并发修改时，在文档锁内 读取-修改-写入
+    with TaskGraph.transaction('TASKS.md') as graph:
+        graph.claim('TASK-002')
+
+文档模型：任务块之外的文本原样保留，任务块按行保存，修改字段只改动对应的行，
+未修改的文档 to_text() 与原文逐字节一致。
+"""
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from plan_lock import locked, atomic_write
+from path_index import PathTrie
+
+
+TASK_PATTERN = re.compile(r'### (TASK-\d+):\s*(.+?)(?=\n###|\n## |\Z)', re.DOTALL)
+FIELD_PATTERN = re.compile(r'- \*\*([^*\n]+)\*\*:[ \t]*(.*)')
+TASK_ID_PATTERN = re.compile(r'TASK-\d+')
+STATUS_PATTERN = re.compile(r'\w+')
+PRIORITY_PATTERN = re.compile(r'P\d+')
+ESTIMATE_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+ARCHIVE_PATTERN = re.compile(r'^- \*\*已归档\*\*:[ \t]*\[([^\]\n]*)\].*$', re.M)
+ARCHIVE_RANGE_PATTERN = re.compile(r'(TASK-(\d+))(?:\s*~\s*TASK-(\d+))?')
+ARCHIVE_HEADING = '## 已归档任务'
+RESOURCE_HEADING = '## 资源限制'
+RESOURCE_ROW_PATTERN = re.compile(r'^\|\s*([^|\s][^|]*?)\s*\|\s*(\d+)\s*\|', re.M)
+AGENT_RESOURCE = 'agent'     # 隐含资源：每个进行中任务占用一个
+DEFAULT_AGENT_LIMIT = 4
+AGING_FIELD = '优先级老化'   # 元信息：可执行任务每等待多少分钟提升一级优先级
+READY_FIELD = '就绪时间'     # 计划生成后加入或重新打开的任务记录的就绪时间
+GENERATED_FIELD = '生成时间'
+
+STATUSES = ('pending', 'in_progress', 'completed', 'failed')
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class TaskError(Exception):
+    """任务操作失败（任务不存在、状态不允许、文档格式错误等）"""
+
+
+def generate_session_id() -> str:
+    """生成会话 ID：session-{YYYYMMDD}-{HHMMSS}-{随机3字符}"""
+    import random  # 仅认领时需要，延迟导入以缩短只读命令的启动时间
+    import string
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=3))
+    return f"session-{timestamp}-{suffix}"
+
+
+def parse_id_list(value: str) -> list:
+    """解析依赖字段：无 / - / [TASK-001, TASK-002]"""
+    value = value.strip()
+    if value in ('无', '-', ''):
+        return []
+    return TASK_ID_PATTERN.findall(value)
+
+
+def parse_file_list(value: str) -> list:
+    """解析相关文件字段：- / a.ts, b/"""
+    value = value.strip()
+    if value in ('-', ''):
+        return []
+    return [f.strip() for f in value.split(',')]
+
+
+def parse_resource_limits(content: str) -> dict:
+    """解析 ## 资源限制 表格：| 资源 | 并行上限 |，未声明 agent 时上限为 DEFAULT_AGENT_LIMIT"""
+    limits = {AGENT_RESOURCE: DEFAULT_AGENT_LIMIT}
+    start = content.find(RESOURCE_HEADING)
+    if start < 0:
+        return limits
+    end = content.find('\n## ', start + len(RESOURCE_HEADING))
+    section = content[start:] if end < 0 else content[start:end]
+    for match in RESOURCE_ROW_PATTERN.finditer(section):
+        limits[match.group(1)] = int(match.group(2))
+    return limits
+
+
+def parse_meta(content: str, field: str):
+    """读取元信息字段值（- **字段**: 值），不存在时返回 None"""
+    match = re.search(rf'^- \*\*{field}\*\*:[ \t]*(.*)$', content, re.M)
+    return match.group(1).strip() if match else None
+
+
+def parse_aging(value: str):
+    """解析优先级老化间隔：60 分钟 -> 60.0；未配置、无、-、0 时返回 None（不老化），
+    不是数字时抛出 ValueError"""
+    value = (value or '').strip()
+    if value in ('', '无', '-'):
+        return None
+    match = ESTIMATE_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"优先级老化间隔应为分钟数: {value}")
+    minutes = float(match.group(0))
+    return minutes if minutes > 0 else None
+
+
+def parse_time(value: str):
+    """解析时间字段（精确到秒或分钟），- 或无法解析时返回 None"""
+    for fmt in (TIME_FORMAT, "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime((value or '').strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def aged_priority(level: int, waited: float, interval: float) -> float:
+    """老化后的优先级数值（越小越优先）：可执行后每等待 interval 分钟提升一级，不设下限，
+    等待足够久的低优先级任务最终会排到新插入的 P0 任务之前"""
+    return level - max(waited, 0) / interval
+
+
+def task_number(task_id: str) -> int:
+    return int(task_id.split('-', 1)[1])
+
+
+def archive_path(file_path) -> Path:
+    """任务文档对应的归档文件：TASKS.md -> TASKS.archive.md"""
+    file_path = Path(file_path)
+    return file_path.with_name(f"{file_path.stem}.archive{file_path.suffix}")
+
+
+def compress_ids(ids) -> str:
+    """任务 ID 集合压缩为区间列表：TASK-001~TASK-050, TASK-053"""
+    parts = []
+    run = []
+    for tid in sorted(ids, key=task_number):
+        if run:
+            width = len(run[0]) - len('TASK-')
+            n = task_number(run[-1]) + 1
+            if tid == f"TASK-{n:0{width}d}":
+                run.append(tid)
+                continue
+            parts.append(run[0] if len(run) == 1 else f"{run[0]}~{run[-1]}")
+        run = [tid]
+    if run:
+        parts.append(run[0] if len(run) == 1 else f"{run[0]}~{run[-1]}")
+    return ', '.join(parts)
+
+
+def expand_ids(text: str) -> set:
+    """区间列表展开为任务 ID 集合"""
+    ids = set()
+    for match in ARCHIVE_RANGE_PATTERN.finditer(text):
+        if match.group(3) is None:
+            ids.add(match.group(1))
+            continue
+        width = len(match.group(2))
+        ids.update(f"TASK-{n:0{width}d}" for n in range(int(match.group(2)), int(match.group(3)) + 1))
+    return ids
+
+
+class Task:
+    """
+    单个任务块
+
+    任务块原文在首次访问字段时才解析（按需解析，只改一个任务时不必解析整份文档）。
+    lines 保存任务块各行（首行为 ### 标题），fields 记录字段名到行号的映射；
+    通过 set() 修改字段会同步更新原文行和解析后的属性。
+    """
+
+    def __init__(self, task_id: str, name: str, block: str):
+        self.id = task_id
+        self.name = name
+        self._block = block
+        self._lines = None
+
+    @classmethod
+    def from_block(cls, block: str) -> 'Task':
+        header = block.split('\n', 1)[0]
+        match = re.match(r'### (TASK-\d+):\s*(.*)', header)
+        return cls(match.group(1), match.group(2).strip() or match.group(1), block)
+
+    @classmethod
+    def create(cls, task_id: str, name: str, fields: list) -> 'Task':
+        """按 SKILL.md 格式新建任务块，fields 为 [(字段名, 值)]"""
+        lines = [f"### {task_id}: {name}"] + [f"- **{k}**: {v}" for k, v in fields]
+        return cls(task_id, name, '\n'.join(lines))
+
+    def _load(self):
+        self._lines = self._block.split('\n')
+        self._fields = {}
+        self._status = 'pending'
+        self._priority = 'P2'
+        self._dependencies = []
+        self._related_files = []
+        self._resources = []
+        self._module = ''
+        self._description = ''
+        self._estimate = None
+        for i, line in enumerate(self._lines):
+            if i == 0 or not line.startswith('- **'):
+                continue
+            match = FIELD_PATTERN.match(line)
+            if match and match.group(1) not in self._fields:
+                self._fields[match.group(1)] = i
+                self._apply(match.group(1), match.group(2).strip())
+
+    def _apply(self, field: str, value: str):
+        """根据字段值更新解析后的属性"""
+        if field == '状态':
+            match = STATUS_PATTERN.match(value)
+            self._status = match.group(0) if match else 'pending'
+        elif field == '优先级':
+            match = PRIORITY_PATTERN.match(value)
+            self._priority = match.group(0) if match else 'P2'
+        elif field == '依赖':
+            self._dependencies = parse_id_list(value)
+        elif field == '相关文件':
+            self._related_files = parse_file_list(value)
+        elif field == '资源':
+            self._resources = parse_file_list(value)
+        elif field == '模块':
+            self._module = value
+        elif field == '描述':
+            self._description = value
+        elif field == '预估耗时':
+            match = ESTIMATE_PATTERN.match(value)
+            self._estimate = float(match.group(0)) if match else None
+
+    def _parsed(name: str):
+        def getter(self):
+            if self._lines is None:
+                self._load()
+            return getattr(self, name)
+        return property(getter)
+
+    lines = _parsed('_lines')
+    fields = _parsed('_fields')
+    status = _parsed('_status')
+    priority = _parsed('_priority')
+    dependencies = _parsed('_dependencies')
+    related_files = _parsed('_related_files')
+    resources = _parsed('_resources')    # 资源标签，进行中时各占用一个令牌（见 ## 资源限制）
+    module = _parsed('_module')
+    description = _parsed('_description')
+    estimate = _parsed('_estimate')      # 预估耗时（分钟），由 stats.py --write-estimates 写入
+    del _parsed
+
+    def get(self, field: str, default: str = None) -> str:
+        """读取字段原始值"""
+        idx = self.fields.get(field)
+        if idx is None:
+            return default
+        return FIELD_PATTERN.match(self.lines[idx]).group(2).strip()
+
+    def set(self, field: str, value: str, after: str = None):
+        """设置字段值；字段不存在时插入到 after 字段之后（默认追加到最后一个字段之后）"""
+        line = f"- **{field}**: {value}"
+        lines, fields = self.lines, self.fields
+        if field in fields:
+            lines[fields[field]] = line
+        else:
+            anchor = fields.get(after) if after else None
+            if anchor is None:
+                anchor = max(fields.values(), default=0)
+            pos = anchor + 1
+            lines.insert(pos, line)
+            for k, v in fields.items():
+                if v >= pos:
+                    fields[k] = v + 1
+            fields[field] = pos
+        self._apply(field, str(value).strip())
+        self._block = None
+
+    def rename(self, task_id: str):
+        """修改任务 ID（重写标题行）"""
+        self.lines[0] = f"### {task_id}: {self.name}"
+        self.id = task_id
+        self._block = None
+
+    def render(self) -> str:
+        if self._block is None:
+            self._block = '\n'.join(self._lines)
+        return self._block
+
+    def to_dict(self) -> dict:
+        """机器可读的任务摘要"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'priority': self.priority,
+            'module': self.module,
+            'description': self.description,
+            'dependencies': self.dependencies,
+            'related_files': self.related_files,
+            'resources': self.resources,
+            'estimate': self.estimate,
+        }
+
+    @property
+    def tokens(self) -> set:
+        """进行中时占用的资源令牌：隐含的 agent 加上资源标签"""
+        return {AGENT_RESOURCE, *self.resources}
+
+    def __repr__(self):
+        return f"<Task {self.id} {self.status} {self.priority}>"
+
+
+class TaskGraph:
+    """任务文档的内存模型：解析一次，多次查询和修改，显式 save() 写回"""
+
+    def __init__(self, content: str = '', path: Path = None):
+        self.path = Path(path) if path else None
+        self.segments = []   # 任务块之外的文本（str）与 Task 交替
+        self.tasks = {}      # task_id -> Task，保持文档顺序
+        self.archived = set()  # 已归档（移入归档文件）的已完成任务 ID，只保留索引
+        self.resource_limits = {}  # 资源类别 -> 并行上限，未列出的类别不限
+        self.aging = None          # 优先级老化间隔（分钟），None 表示按静态优先级排序
+        self.generated_at = None   # 元信息中的计划生成时间
+        self.dirty = False
+        self._dependents = None
+        self._index = None
+        self._core = None
+        self._usage = None
+        self._holders = None
+        self._stamp = None
+        self._parse(content)
+
+    # ---------- 加载与同步 ----------
+
+    @classmethod
+    def load(cls, path) -> 'TaskGraph':
+        path = Path(path)
+        graph = cls(path.read_text(encoding='utf-8'), path)
+        graph._stamp = graph._file_stamp()
+        return graph
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, path):
+        """在文档锁内加载，退出时如有修改则原子写回；块内抛出异常则不写入"""
+        path = Path(path)
+        with locked(path):
+            graph = cls.load(path)
+            yield graph
+            if graph.dirty:
+                graph.save()
+
+    def _file_stamp(self):
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _parse(self, content: str):
+        self.segments = []
+        self.tasks = {}
+        pos = 0
+        for match in TASK_PATTERN.finditer(content):
+            self.segments.append(content[pos:match.start()])
+            task = Task.from_block(match.group(0))
+            self.segments.append(task)
+            self.tasks.setdefault(task.id, task)
+            pos = match.end()
+        self.segments.append(content[pos:])
+        self.archived = set()
+        for segment in self.segments[::2]:
+            match = ARCHIVE_PATTERN.search(segment)
+            if match:
+                self.archived = expand_ids(match.group(1))
+                break
+        self.resource_limits = parse_resource_limits(
+            next((s for s in self.segments[::2] if RESOURCE_HEADING in s), ''))
+        try:
+            self.aging = parse_aging(parse_meta(self.segments[0], AGING_FIELD))
+        except ValueError:
+            self.aging = None       # validate() 报告无法解析的配置
+        self.generated_at = parse_time(parse_meta(self.segments[0], GENERATED_FIELD))
+        self._dependents = None
+        self._index = None
+        self._core = None
+        self._usage = None
+
+    def refresh(self) -> bool:
+        """文件在磁盘上被其他进程修改过时重新加载，返回是否重新加载"""
+        if self.path is None:
+            return False
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        self._parse(self.path.read_text(encoding='utf-8'))
+        self._stamp = stamp
+        self.dirty = False
+        return True
+
+    def to_text(self) -> str:
+        return ''.join(s if isinstance(s, str) else s.render() for s in self.segments)
+
+    def save(self, path=None):
+        """写回磁盘（原子替换）"""
+        path = Path(path) if path else self.path
+        atomic_write(path, self.to_text())
+        if path == self.path:
+            self._stamp = self._file_stamp()
+        self.dirty = False
+
+    def _touch(self, structural: bool = False, task: 'Task' = None):
+        """标记已修改；结构变化时丢弃派生索引，task 的状态 / 优先级变化时原地更新图核心和资源计数"""
+        self.dirty = True
+        if structural:
+            self._dependents = None
+            self._index = None
+            self._core = None
+            self._usage = None
+        elif task is not None:
+            if self._core is not None:
+                self._core.update(self._core.index(task.id), task.status, task.priority)
+            if self._usage is not None:
+                holding = task.status == 'in_progress'
+                if holding and task.id not in self._holders:
+                    self._usage.update(task.tokens)
+                    self._holders.add(task.id)
+                elif not holding and task.id in self._holders:
+                    self._usage.subtract(task.tokens)
+                    self._holders.discard(task.id)
+
+    # ---------- 查询 ----------
+
+    def get(self, task_id: str) -> Task:
+        task = self.tasks.get(task_id)
+        if task is None:
+            raise TaskError(f"任务 {task_id} 不存在")
+        return task
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.tasks
+
+    def __iter__(self):
+        return iter(self.tasks.values())
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @property
+    def total(self) -> int:
+        """任务总数（含已归档）"""
+        return len(self.tasks) + len(self.archived)
+
+    def status_counts(self) -> Counter:
+        """各状态任务数，已归档的任务计入 completed"""
+        counts = Counter(task.status for task in self.tasks.values())
+        if self.archived:
+            counts['completed'] += len(self.archived)
+        return counts
+
+    def completed_ids(self) -> set:
+        return {tid for tid, task in self.tasks.items() if task.status == 'completed'} | self.archived
+
+    def is_completed(self, task_id: str) -> bool:
+        """任务已完成（含已归档）；不存在的任务视为未完成"""
+        task = self.tasks.get(task_id)
+        return task.status == 'completed' if task is not None else task_id in self.archived
+
+    @property
+    def core(self):
+        """整数编号的数组化图核心（graph_core.GraphCore），验证与调度计算在其上进行"""
+        if self._core is None:
+            from graph_core import GraphCore
+            self._core = GraphCore.from_graph(self)
+        return self._core
+
+    @property
+    def resource_usage(self) -> Counter:
+        """进行中任务占用的资源令牌数（按类别）：首次访问时统计一次，之后随认领 / 完成 / 重置增量维护"""
+        if self._usage is None:
+            usage, holders = Counter(), set()
+            for task in self.tasks.values():
+                if task.status == 'in_progress':
+                    usage.update(task.tokens)
+                    holders.add(task.id)
+            self._usage, self._holders = usage, holders
+        return self._usage
+
+    def exhausted(self, task: Task, usage: Counter = None) -> list:
+        """任务需要但已用尽的资源类别"""
+        usage = self.resource_usage if usage is None else usage
+        limits = self.resource_limits
+        return [r for r in sorted(task.tokens) if r in limits and usage[r] >= limits[r]]
+
+    def split_admissible(self, tasks: list) -> tuple:
+        """按顺序试探性占用资源令牌，拆分为 (可同时认领的任务列表, {暂缓任务 ID: 已满的资源类别})"""
+        usage = Counter(self.resource_usage)
+        admitted, withheld = [], {}
+        for task in tasks:
+            full = self.exhausted(task, usage)
+            if full:
+                withheld[task.id] = full
+            else:
+                usage.update(task.tokens)
+                admitted.append(task)
+        return admitted, withheld
+
+    @property
+    def dependents(self) -> dict:
+        """反向依赖：task_id -> 依赖它的任务 ID 列表"""
+        if self._dependents is None:
+            dependents = {tid: [] for tid in self.tasks}
+            for task in self.tasks.values():
+                for dep in task.dependencies:
+                    dependents.setdefault(dep, []).append(task.id)
+            self._dependents = dependents
+        return self._dependents
+
+    def remaining_depths(self, weighted: bool = False) -> dict:
+        """未完成任务到终点的最长链长度（含自身）：值最大的任务位于剩余工作的关键路径上。
+        weighted 时按预估耗时（分钟）累计，没有预估的任务取已有预估的中位数"""
+        open_ids = [tid for tid, task in self.tasks.items() if task.status != 'completed']
+        open_set = set(open_ids)
+        dependents = self.dependents
+        weights = dict.fromkeys(open_ids, 1)
+        if weighted:
+            known = sorted(self.tasks[tid].estimate for tid in open_ids
+                           if self.tasks[tid].estimate is not None)
+            default = known[len(known) // 2] if known else 1
+            weights = {tid: self.tasks[tid].estimate or default for tid in open_ids}
+        # Kahn 拓扑排序（依赖 -> 被依赖），再逆序累计；环上的任务只计自身
+        indegree = {tid: 0 for tid in open_ids}
+        for tid in open_ids:
+            for dep in self.tasks[tid].dependencies:
+                if dep in open_set:
+                    indegree[tid] += 1
+        order = [tid for tid in open_ids if indegree[tid] == 0]
+        for tid in order:
+            for child in dependents.get(tid, ()):
+                if child in indegree:
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        order.append(child)
+        depths = dict(weights)
+        for tid in reversed(order):
+            children = [depths[c] for c in dependents.get(tid, ()) if c in open_set]
+            if children:
+                depths[tid] = weights[tid] + max(children)
+        return depths
+
+    def is_ready(self, task: Task, completed: set = None) -> bool:
+        if task.status != 'pending':
+            return False
+        if completed is None:
+            return all(self.is_completed(dep) for dep in task.dependencies)
+        return all(dep in completed for dep in task.dependencies)
+
+    def ready(self) -> list:
+        """可执行任务：pending 且依赖全部完成，按优先级排序（P0 > P1 > P2，配置了老化时按有效优先级）"""
+        tasks = list(self.tasks.values())
+        executable = [tasks[i] for i in self.core.ready()]
+        executable.sort(key=self.priority_key())
+        return executable
+
+    def ready_since(self, task: Task):
+        """任务进入可执行状态的时间：依赖中最晚的完成时间与就绪时间字段取较晚者；
+        都没有（无依赖，或依赖已归档）时取计划生成时间，仍无法确定时返回 None。
+        add_task / reopen 会写入就绪时间，计划生成后加入或重新打开的任务不会被视为从生成时就在等待"""
+        times = [parse_time(task.get(READY_FIELD))]
+        times += [parse_time(self.tasks[dep].get('完成时间')) for dep in task.dependencies
+                  if dep in self.tasks]
+        times = [t for t in times if t is not None]
+        return max(times) if times else self.generated_at
+
+    def effective_priority(self, task: Task, now: datetime = None) -> float:
+        """有效优先级数值（越小越优先）：未配置老化时即 P 后的数字，配置后按等待时间逐级提升"""
+        level = int(task.priority[1:])
+        since = self.ready_since(task) if self.aging else None
+        if since is None:
+            return float(level)
+        return aged_priority(level, ((now or datetime.now()) - since).total_seconds() / 60, self.aging)
+
+    def priority_key(self, now: datetime = None):
+        """可执行任务的排序键：未配置老化时为静态优先级，配置后在查询时按同一时刻计算有效优先级"""
+        if not self.aging:
+            return lambda task: task.priority
+        now = now or datetime.now()
+        return lambda task: self.effective_priority(task, now)
+
+    @property
+    def index(self) -> dict:
+        """二级索引：文档顺序、模块 / 优先级 -> 任务 ID 集合、相关文件路径前缀树"""
+        if self._index is None:
+            order, by_module, by_priority, files = {}, {}, {}, PathTrie()
+            for i, task in enumerate(self.tasks.values()):
+                order[task.id] = i
+                by_module.setdefault(task.module, set()).add(task.id)
+                by_priority.setdefault(task.priority, set()).add(task.id)
+                for path in task.related_files:
+                    files.insert(path, task.id)
+            self._index = {'order': order, 'module': by_module, 'priority': by_priority,
+                           'files': files}
+        return self._index
+
+    def touching(self, pattern: str) -> set:
+        """相关文件与通配模式有交集的任务 ID（声明的上级目录也算有交集）"""
+        return self.index['files'].glob(pattern)
+
+    def busy_files(self) -> PathTrie:
+        """进行中任务的相关文件前缀树（状态随认领/完成变化，每次调用重新构建）"""
+        trie = PathTrie()
+        for task in self.tasks.values():
+            if task.status == 'in_progress':
+                for path in task.related_files:
+                    trie.insert(path, task.id)
+        return trie
+
+    def conflicts(self, task: Task, busy: PathTrie = None) -> set:
+        """与任务相关文件重叠（同一路径或目录包含关系）的进行中任务 ID"""
+        if busy is None:
+            busy = self.busy_files()
+        ids = set()
+        for path in task.related_files:
+            ids |= busy.overlapping(path)
+        ids.discard(task.id)
+        return ids
+
+    def split_conflicts(self, tasks: list) -> tuple:
+        """拆分为 (无冲突任务列表, {暂缓任务 ID: 冲突的进行中任务 ID 列表})"""
+        busy = self.busy_files()
+        safe, withheld = [], {}
+        for task in tasks:
+            ids = self.conflicts(task, busy)
+            if ids:
+                withheld[task.id] = sorted(ids, key=task_number)
+            else:
+                safe.append(task)
+        return safe, withheld
+
+    def query(self, module: str = None, priorities: list = None, touches: str = None,
+              limit: int = None, avoid_conflicts: bool = False, admit: bool = False) -> list:
+        """按模块 / 优先级 / 相关文件过滤可执行任务，排序与 ready() 一致；
+        avoid_conflicts 时排除与进行中任务相关文件重叠的任务，
+        admit 时只保留按顺序占用资源令牌后仍可同时认领的任务"""
+        index = self.index
+        selected = None
+        if module is not None:
+            selected = set(index['module'].get(module, ()))
+        if priorities:
+            ids = set().union(*(index['priority'].get(p, ()) for p in priorities))
+            selected = ids if selected is None else selected & ids
+        if touches:
+            ids = self.touching(touches)
+            selected = ids if selected is None else selected & ids
+        core = self.core
+        if selected is None:
+            tasks = list(self.tasks.values())
+            executable = [tasks[i] for i in core.ready()]
+        else:
+            executable = [self.tasks[t] for t in selected if core.is_ready(core.index(t))]
+        key = self.priority_key()
+        executable.sort(key=lambda t: (key(t), index['order'][t.id]))
+        if avoid_conflicts:
+            executable = self.split_conflicts(executable)[0]
+        if admit:
+            executable = self.split_admissible(executable)[0]
+        return executable[:limit] if limit else executable
+
+    def next_task_id(self) -> str:
+        """下一个可用的任务 ID"""
+        max_num = max((task_number(tid) for tid in (*self.tasks, *self.archived)), default=0)
+        return f"TASK-{max_num + 1:03d}"
+
+    # ---------- 状态变更 ----------
+
+    def can_claim(self, task_id: str) -> tuple:
+        """检查任务是否可认领，返回 (是否可认领, 原因)"""
+        if task_id not in self.tasks:
+            return False, f"任务 {task_id} 不存在"
+        task = self.tasks[task_id]
+        if task.status != 'pending':
+            return False, f"任务状态为 {task.status}，不可认领"
+        unmet_deps = [dep for dep in task.dependencies if not self.is_completed(dep)]
+        if unmet_deps:
+            return False, f"依赖未完成: {', '.join(unmet_deps)}"
+        return True, "可以认领"
+
+    def claim(self, task_id: str, session_id: str = None, avoid_conflicts: bool = False) -> str:
+        """认领任务，返回会话 ID；avoid_conflicts 时拒绝与进行中任务相关文件重叠的任务"""
+        ok, reason = self.can_claim(task_id)
+        if not ok:
+            raise TaskError(reason)
+        task = self.tasks[task_id]
+        if avoid_conflicts:
+            ids = self.conflicts(task)
+            if ids:
+                raise TaskError(f"相关文件与进行中任务冲突: {', '.join(sorted(ids, key=task_number))}")
+        full = self.exhausted(task)
+        if full:
+            usage = self.resource_usage
+            raise TaskError("资源已满: " + ', '.join(
+                f"{r} ({usage[r]}/{self.resource_limits[r]})" for r in full))
+        if task.get('执行者', '-') != '-' or task.get('认领时间', '-') != '-':
+            raise TaskError("无法更新任务状态，请检查文档格式")
+
+        session_id = session_id or generate_session_id()
+        task.set('状态', 'in_progress')
+        task.set('执行者', session_id, after='状态')
+        task.set('认领时间', datetime.now().strftime(TIME_FORMAT), after='执行者')
+        self._touch(task=task)
+        return session_id
+
+    def complete(self, task_id: str, failed: bool = False) -> str:
+        """将 in_progress 任务标记为 completed 或 failed，返回新状态"""
+        task = self.get(task_id)
+        if task.status != 'in_progress':
+            raise TaskError(f"任务状态为 {task.status}，只能完成 in_progress 状态的任务")
+        new_status = 'failed' if failed else 'completed'
+        task.set('状态', new_status)
+        task.set('完成时间', datetime.now().strftime(TIME_FORMAT), after='认领时间')
+        self._touch(task=task)
+        return new_status
+
+    def reset(self, task_id: str):
+        """将 in_progress 或 failed 任务重置为 pending，清空执行者、认领时间和完成时间"""
+        task = self.get(task_id)
+        if task.status not in ('in_progress', 'failed'):
+            raise TaskError(f"任务状态为 {task.status}，只能重置 in_progress 或 failed 状态")
+        self._reset_fields(task)
+
+    def reopen(self, task_id: str):
+        """把已完成或失败的任务重新打开为 pending（需求变更后需要返工），就绪时间记为当前时间"""
+        task = self.get(task_id)
+        if task.status not in ('completed', 'failed'):
+            raise TaskError(f"任务状态为 {task.status}，只能重新打开 completed 或 failed 状态")
+        self._reset_fields(task)
+        task.set(READY_FIELD, datetime.now().strftime(TIME_FORMAT))
+
+    def _reset_fields(self, task: Task):
+        task.set('状态', 'pending')
+        task.set('执行者', '-', after='状态')
+        task.set('认领时间', '-', after='执行者')
+        if '完成时间' in task.fields:
+            task.set('完成时间', '-', after='认领时间')
+        self._touch(task=task)
+
+    def add_task(self, task: Task):
+        """在最后一个任务块之后追加任务；没有就绪时间字段时记为当前时间（优先级老化从加入时开始计算）"""
+        if task.id in self.tasks or task.id in self.archived:
+            raise TaskError(f"任务 {task.id} 已存在")
+        if READY_FIELD not in task.fields:
+            task.set(READY_FIELD, datetime.now().strftime(TIME_FORMAT))
+        last = max((i for i, s in enumerate(self.segments) if isinstance(s, Task)), default=None)
+        if last is None and self.archived:
+            # 所有任务都已归档：插入到归档索引之前
+            text = self.segments[0]
+            pos = text.find(ARCHIVE_HEADING)
+            pos = len(text) if pos < 0 else pos
+            head = text[:pos].rstrip('\n') + '\n\n'
+            self.segments[:1] = [head, Task(task.id, task.name, task.render().rstrip('\n')),
+                                 '\n\n' + text[pos:]]
+            self.tasks[task.id] = self.segments[1]
+            self._touch(structural=True)
+            return
+        if last is None:
+            raise TaskError("无法找到插入位置")
+        # 新任务与上一个任务之间保持一个空行，并以换行结尾
+        if not task.render().endswith('\n'):
+            task.lines.append('')
+            task._block = None
+        prev = self.segments[last]
+        separator = '\n' if prev.render().endswith('\n') else '\n\n'
+        self.segments[last + 1:last + 1] = [separator, task]
+        self.tasks[task.id] = task
+        self._touch(structural=True)
+
+    def remove_task(self, task_id: str):
+        """删除任务块（连同它与相邻任务之间的分隔）"""
+        task = self.get(task_id)
+        i = next(i for i, s in enumerate(self.segments) if s is task)
+        if i + 2 < len(self.segments) and isinstance(self.segments[i + 2], Task):
+            del self.segments[i:i + 2]
+        elif i >= 2 and isinstance(self.segments[i - 2], Task):
+            del self.segments[i - 1:i + 1]
+        else:
+            del self.segments[i]
+        del self.tasks[task_id]
+        self._touch(structural=True)
+
+    def archive_completed(self, keep: int = 0) -> list:
+        """把已完成任务移出文档，只在归档索引中保留其 ID，返回移出的任务（文档顺序）。
+        keep 为保留在文档中的最后几个已完成任务（检查点的产出物检查窗口）"""
+        completed = [t for t in self.tasks.values() if t.status == 'completed']
+        removed = completed[:len(completed) - keep] if keep else completed
+        if not removed:
+            return []
+        removed_ids = {t.id for t in removed}
+        # 一次遍历重建片段，分隔规则与 remove_task 相同
+        out = [self.segments[0]]
+        for i in range(1, len(self.segments), 2):
+            task, after = self.segments[i], self.segments[i + 1]
+            if task.id not in removed_ids or self.tasks.get(task.id) is not task:
+                out += [task, after]
+            elif i + 2 < len(self.segments):
+                continue
+            elif len(out) > 1:
+                out[-1] = after
+            else:
+                out[-1] += after
+        self.segments = out
+        for tid in removed_ids:
+            del self.tasks[tid]
+        self.set_archived(self.archived | removed_ids)
+        self._touch(structural=True)
+        return removed
+
+    def set_archived(self, ids: set):
+        """写入归档索引（文档末尾的“已归档任务”一节）"""
+        self.archived = set(ids)
+        name = archive_path(self.path).name if self.path else 'TASKS.archive.md'
+        line = f"- **已归档**: [{compress_ids(self.archived)}]（正文见 {name}）"
+        for k in range(0, len(self.segments), 2):
+            if ARCHIVE_PATTERN.search(self.segments[k]):
+                self.segments[k] = ARCHIVE_PATTERN.sub(lambda _: line, self.segments[k], count=1)
+                break
+        else:
+            tail = self.segments[-1].rstrip('\n')
+            # 最后一个任务块可能自带结尾换行（文档以任务块结束时）
+            if not tail and len(self.segments) > 1 and self.segments[-2].render().endswith('\n'):
+                separator = '\n'
+            else:
+                separator = '\n\n'
+            self.segments[-1] = f"{tail}{separator}{ARCHIVE_HEADING}\n\n{line}\n"
+        self._touch()
+
+    def insert_fix(self, failed_task_id: str, description: str) -> str:
+        """为失败任务插入修复任务：失败任务重置为 pending 并依赖修复任务，返回新任务 ID"""
+        failed_task = self.get(failed_task_id)
+        new_task_id = self.next_task_id()
+        fix = Task.create(new_task_id, f"修复 {failed_task_id}", [
+            ('状态', 'pending'),
+            ('执行者', '-'),
+            ('认领时间', '-'),
+            ('优先级', 'P0'),
+            ('依赖', '无'),
+            ('模块', '修复'),
+            ('描述', description),
+            ('验收标准', f"{failed_task_id} 可以重新执行"),
+            ('相关文件', '-'),
+        ])
+        self.add_task(fix)
+
+        failed_task.set('依赖', f"[{', '.join(failed_task.dependencies + [new_task_id])}]")
+        if failed_task.status == 'failed':
+            self._reset_fields(failed_task)
+        self._touch(structural=True)
+        return new_task_id
+
+    def set_priority(self, task_id: str, priority: str):
+        task = self.get(task_id)
+        old = task.priority
+        task.set('优先级', priority)
+        self._touch(task=task)
+        if self._index is not None:
+            # 增量维护优先级索引，避免重建整个索引
+            self._index['priority'].get(old, set()).discard(task_id)
+            self._index['priority'].setdefault(task.priority, set()).add(task_id)
+
+    def renumber(self, mapping: dict):
+        """按 {旧 ID: 新 ID} 重新编号任务，并改写所有引用这些 ID 的依赖"""
+        for task in self.tasks.values():
+            if any(dep in mapping for dep in task.dependencies):
+                deps = [mapping.get(dep, dep) for dep in task.dependencies]
+                task.set('依赖', f"[{', '.join(deps)}]")
+        tasks = {}
+        for tid, task in self.tasks.items():
+            if tid in mapping:
+                task.rename(mapping[tid])
+            tasks[task.id] = task
+        self.tasks = tasks
+        self._touch(structural=True)
+
+    def set_estimate(self, task_id: str, minutes: float):
+        """写入预估耗时（分钟）字段，位于认领/完成时间之后"""
+        task = self.get(task_id)
+        after = '完成时间' if '完成时间' in task.fields else '认领时间'
+        task.set('预估耗时', f"{minutes:g} 分钟", after=after)
+        self._touch()
+
+    def reprioritize(self) -> list:
+        """按被依赖次数重新评估 pending 任务的优先级，返回 [(task_id, 旧, 新)]"""
+        changes = []
+        # 被依赖越多，优先级越高
+        for i, _, new in self.core.suggested_priorities():
+            task = self.tasks[self.core.ids[i]]
+            new_priority = f"P{new}"
+            if new_priority != task.priority:
+                changes.append((task.id, task.priority, new_priority))
+                self.set_priority(task.id, new_priority)
+        return changes
+
+    # ---------- 验证 ----------
+
+    def detect_cycle(self) -> list:
+        """检测循环依赖，返回循环路径"""
+        return [self.core.ids[i] for i in self.core.detect_cycle()]
+
+    def find_missing_dependencies(self) -> list:
+        """查找引用了不存在任务的依赖，返回 [(task_id, dep)]"""
+        return [(self.core.ids[i], dep) for i, dep in self.core.missing]
+
+    def find_orphans(self) -> list:
+        """孤立任务：既没有依赖，也没有被依赖"""
+        return [self.core.ids[i] for i in self.core.orphans()]
+
+    def validate(self) -> tuple:
+        """验证 DAG，返回 (错误列表, 警告列表)"""
+        errors, warnings = self.core.validate()
+        undeclared = {r for task in self.tasks.values() for r in task.resources} - set(self.resource_limits)
+        if undeclared:
+            warnings.append(f"资源未在资源限制表中声明（不限并行）: {', '.join(sorted(undeclared))}")
+        try:
+            parse_aging(parse_meta(self.segments[0], AGING_FIELD))
+        except ValueError as e:
+            warnings.append(f"{e}，已按静态优先级排序")
+        return errors, warnings
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+tp - taskplanner 统一命令行入口
+
+用法：python tp.py <命令> [参数...]
+
+命令：
+  next <任务文档路径>                       获取可执行任务（同 next_task.py）
+  claim <任务文档路径> <任务ID>             认领任务（同 claim_task.py）
+  complete <任务文档路径> <任务ID> [--failed] 完成/失败任务（同 complete_task.py）
+  reset <任务文档路径> <任务ID>             重置任务（同 reset_task.py）
+  validate <任务文档路径>                   验证 DAG（同 validate_dag.py）
+  checkpoint <任务文档路径> <项目根目录> [选项] 执行检查点（同 checkpoint.py）
+  replan <任务文档路径> [选项]              动态调整（同 replan.py）
+  batch <任务文档路径>                      从 stdin 读取 JSONL 命令批量执行
+
+各子命令的参数、输出和退出码与对应脚本一致；子命令模块按需导入，
+`tp next` 不会加载检查点、lint 等用不到的模块。
+
+batch 模式：
+  每行一个 JSON 命令，全部读入后在文档锁内加载一次任务文档、依次执行，最后只写回一次。
+  每条命令输出一行 JSON 结果 {"cmd", "ok", "result" | "error"}，任一命令失败时退出码为 1。
+  参数类型在执行前检查（如 "task" 必须是字符串、"limit" 必须是整数）；
+  失败的命令不会修改文档，后续命令继续执行。
+
+  {"cmd": "next", "module": "前端", "priority": "P0,P1", "touches": "src/**", "limit": 5}
+                                                     → 可执行任务列表（过滤条件均可选）
+  {"cmd": "claim", "task": "TASK-001", "session": "可选会话ID"} → 会话 ID
+  next / claim 可加 "avoid_conflicts": true，排除与进行中任务相关文件重叠的任务；
+  next 可加 "session"，按与该会话近期工作的亲和度排序；
+  next 可加 "admit": true，只返回按顺序占用资源令牌后仍可同时认领的任务（claim 始终检查资源限制）
+  {"cmd": "complete", "task": "TASK-001", "failed": false}       → 新状态
+  {"cmd": "reset", "task": "TASK-001"}
+  {"cmd": "validate"}                                → {"errors": [...], "warnings": [...]}
+  {"cmd": "insert_fix", "task": "TASK-005", "description": "修复描述"} → 新任务 ID
+  {"cmd": "reprioritize"}                            → [[任务ID, 旧优先级, 新优先级], ...]
+
+打包为单文件 zipapp：
+  python -m zipapp taskplanner/scripts -m "tp:main" -p "/usr/bin/env python3" -o tp.pyz
+  ./tp.pyz next TASKS.md
+"""
+
+import sys
+
+
+# 子命令 -> 脚本模块名（按需导入）
+COMMANDS = {
+    'next': 'next_task',
+    'claim': 'claim_task',
+    'complete': 'complete_task',
+    'reset': 'reset_task',
+    'validate': 'validate_dag',
+    'checkpoint': 'checkpoint',
+    'replan': 'replan',
+}
+
+
+def _batch_next(graph, command: dict):
+    priorities = command.get('priority')
+    if isinstance(priorities, str):
+        priorities = priorities.split(',')
+    session_id = command.get('session')
+    tasks = graph.query(module=command.get('module'), priorities=priorities,
+                        touches=command.get('touches'),
+                        limit=None if session_id else command.get('limit'),
+                        avoid_conflicts=bool(command.get('avoid_conflicts')),
+                        admit=bool(command.get('admit')) and not session_id)
+    if not session_id:
+        return [task.to_dict() for task in tasks]
+    from affinity import SessionHistory, rank_for_session
+    entries = SessionHistory.load(graph.path).entries(session_id)
+    ranked = rank_for_session(graph, tasks, entries)
+    if command.get('admit'):
+        admitted = {task.id for task in graph.split_admissible([task for task, _ in ranked])[0]}
+        ranked = [item for item in ranked if item[0].id in admitted]
+    ranked = ranked[:command.get('limit')]
+    return [dict(task.to_dict(), affinity=score) for task, score in ranked]
+
+
+def _batch_claim(graph, command: dict):
+    from affinity import SessionHistory
+    task_id = command['task'].upper()
+    session_id = graph.claim(task_id, command.get('session'),
+                             avoid_conflicts=bool(command.get('avoid_conflicts')))
+    history = SessionHistory.load(graph.path)
+    history.record(session_id, graph.get(task_id))
+    history.save(graph.path)
+    return session_id
+
+
+def _batch_complete(graph, command: dict):
+    return graph.complete(command['task'].upper(), bool(command.get('failed')))
+
+
+def _batch_reset(graph, command: dict):
+    graph.reset(command['task'].upper())
+    return 'pending'
+
+
+def _batch_validate(graph, command: dict):
+    errors, warnings = graph.validate()
+    return {'errors': errors, 'warnings': warnings}
+
+
+def _batch_insert_fix(graph, command: dict):
+    return graph.insert_fix(command['task'].upper(), command['description'])
+
+
+def _batch_reprioritize(graph, command: dict):
+    return [list(change) for change in graph.reprioritize()]
+
+
+# batch 命令 -> 处理函数(graph, command) -> 结果
+BATCH_COMMANDS = {
+    'next': _batch_next,
+    'claim': _batch_claim,
+    'complete': _batch_complete,
+    'reset': _batch_reset,
+    'validate': _batch_validate,
+    'insert_fix': _batch_insert_fix,
+    'reprioritize': _batch_reprioritize,
+}
+
+
+# batch 参数 -> 允许的 JSON 类型（null 视为未提供）
+BATCH_ARG_TYPES = {
+    'task': (str,),
+    'session': (str,),
+    'description': (str,),
+    'module': (str,),
+    'touches': (str,),
+    'priority': (str, list),
+    'limit': (int,),
+    'failed': (bool,),
+    'avoid_conflicts': (bool,),
+    'admit': (bool,),
+}
+
+
+def check_batch_args(command: dict):
+    """执行前检查参数类型，避免命令执行到一半才因类型错误中断"""
+    for key, types in BATCH_ARG_TYPES.items():
+        value = command.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, types) or (key == 'limit' and isinstance(value, bool)):
+            expected = ' 或 '.join({str: '字符串', list: '数组', int: '整数', bool: '布尔值'}[t] for t in types)
+            raise TypeError(f"参数 {key} 应为{expected}，实际为{json_type(value)}")
+        if key == 'priority' and isinstance(value, list) and not all(isinstance(v, str) for v in value):
+            raise TypeError("参数 priority 应为字符串或字符串数组")
+
+
+def json_type(value) -> str:
+    return {bool: '布尔值', int: '整数', float: '数字', str: '字符串', list: '数组', dict: '对象'}.get(
+        type(value), type(value).__name__)
+
+
+def run_batch(file_path, lines) -> list:
+    """在一次加载的任务文档上依次执行 JSONL 命令，返回每条命令的结果记录"""
+    import json
+    from taskgraph import TaskGraph, TaskError
+
+    commands = []
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise ValueError("命令必须是 JSON 对象")
+        except ValueError as e:
+            command = {'error': f"第 {lineno} 行不是合法的 JSON 命令: {e}"}
+        commands.append(command)
+
+    results = []
+    with TaskGraph.transaction(file_path) as graph:
+        for command in commands:
+            name = command.get('cmd')
+            record = {'cmd': name, 'ok': False}
+            if 'error' in command:
+                record['error'] = command['error']
+            elif name not in BATCH_COMMANDS:
+                record['error'] = f"未知命令: {name}（可选: {', '.join(BATCH_COMMANDS)}）"
+            else:
+                try:
+                    check_batch_args(command)
+                    record['result'] = BATCH_COMMANDS[name](graph, command)
+                    record['ok'] = True
+                except TaskError as e:
+                    record['error'] = str(e)
+                except KeyError as e:
+                    record['error'] = f"缺少参数: {e.args[0]}"
+                except (TypeError, ValueError, AttributeError) as e:
+                    record['error'] = f"参数错误: {e}"
+            if command.get('task'):
+                record['task'] = command['task']
+            results.append(record)
+    return results
+
+
+def batch_main(args: list):
+    if not args:
+        print("用法: python tp.py batch <任务文档路径> < commands.jsonl")
+        sys.exit(1)
+
+    import json
+    from pathlib import Path
+
+    file_path = Path(args[0])
+    if not file_path.exists():
+        print(f"✗ 文件不存在: {file_path}")
+        sys.exit(1)
+
+    # 先读完 stdin 再加锁，避免等待输入时长时间持有文档锁
+    results = run_batch(file_path, sys.stdin.read().splitlines())
+    for record in results:
+        print(json.dumps(record, ensure_ascii=False))
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+
+def usage():
+    print("用法: python tp.py <命令> [参数...]")
+    print(f"命令: {', '.join(COMMANDS)}, batch")
+    print("详见 python tp.py --help")
+
+
+def main():
+    if len(sys.argv) < 2:
+        usage()
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    if command in ('-h', '--help'):
+        print(__doc__)
+        return
+    if command == 'batch':
+        batch_main(args)
+        return
+    if command not in COMMANDS:
+        print(f"✗ 未知命令: {command}")
+        usage()
+        sys.exit(1)
+
+    import importlib
+    module = importlib.import_module(COMMANDS[command])
+    # 各脚本从 sys.argv 读取参数，按脚本直接运行时的形式改写
+    sys.argv = [f"{COMMANDS[command]}.py"] + args
+    module.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+需求追溯索引 - PRD / Spec 章节与任务的对应关系，用于需求变更时的增量重新规划
+
+用法：python trace_index.py <任务文档路径> [--save] [--json]
+
+选项：
+  --save    把当前章节哈希保存为基线（replan.py --spec-changed 与之比较）
+  --json    输出 JSON
+
+- 任务文档元信息中的 **PRD** / **Spec** 字段指定需求文档路径（依次相对任务文档所在目录及其
+  上级目录查找，都找不到时才使用当前目录，避免当前目录中的同名文档遮蔽计划自己的需求文档）
+- 需求文档按标题切分为章节，章节编号取标题开头的数字（"### 3.1 认证 API" -> 3.1），
+  没有编号时取标题文字；代码块中的 # 行不视为标题
+- 每个章节的哈希覆盖标题到下一个同级或更高级标题之间的全部内容（含子章节），
+  忽略行尾空白和空行，引用 "Spec 3" 的任务在 3.x 任一小节变化时都会受影响
+- 任务通过 **需求来源** 字段引用章节：`Spec 3.1, PRD 2.1`（也可写章节标题：`Spec 认证 API`）
+- 基线保存在任务文档旁的 .<文件名>.trace.json 中
+"""
+
+import re
+import sys
+import json
+import hashlib
+from pathlib import Path
+
+from taskgraph import TaskGraph
+
+
+SOURCE_LABELS = ('PRD', 'Spec')
+REFERENCE_FIELD = '需求来源'
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+NUMBER_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)\.?\s+(.*)$')
+REFERENCE_PATTERN = re.compile(r'^(PRD|Spec)\s*§?\s*(.+)$', re.I)
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+
+def index_path(file_path: Path) -> Path:
+    """任务文档对应的追溯索引基线文件路径"""
+    file_path = Path(file_path)
+    return file_path.with_name(f".{file_path.name}.trace.json")
+
+
+def split_sections(text: str) -> dict:
+    """按标题切分章节，返回 {章节键: {'title', 'level', 'parent', 'hash'}}（按文档顺序）"""
+    lines = text.split('\n')
+    headings = []     # (行号, 级别, 标题)
+    in_fence = False
+    for i, line in enumerate(lines):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else HEADING_PATTERN.match(line)
+        if match:
+            headings.append((i, len(match.group(1)), match.group(2)))
+
+    sections = {}
+    stack = []        # (级别, 章节键)：当前标题的祖先
+    for n, (start, level, title) in enumerate(headings):
+        end = next((i for i, lv, _ in headings[n + 1:] if lv <= level), len(lines))
+        body = '\n'.join(line.rstrip() for line in lines[start:end] if line.strip())
+        match = NUMBER_PATTERN.match(title)
+        key = match.group(1) if match else title
+        if key in sections:
+            key = f"{key}#{sum(1 for k in sections if k.split('#')[0] == key) + 1}"
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        sections[key] = {'title': title, 'level': level, 'parent': stack[-1][1] if stack else None,
+                         'hash': hashlib.sha1(body.encode('utf-8')).hexdigest()[:12]}
+        stack.append((level, key))
+    return sections
+
+
+def resolve_source(file_path: Path, value: str):
+    """解析元信息中的文档路径：依次尝试任务文档所在目录及其上级目录，最后尝试当前目录"""
+    path = Path(value)
+    if path.is_absolute():
+        return path if path.exists() else None
+    base = Path(file_path).resolve().parent
+    for directory in (base, *base.parents, Path.cwd()):
+        if (directory / path).is_file():
+            return directory / path
+    return None
+
+
+def source_documents(graph: TaskGraph) -> dict:
+    """元信息中声明的需求文档：{标签: 路径字符串}"""
+    sources = {}
+    for segment in graph.segments[::2]:
+        for label in SOURCE_LABELS:
+            match = re.search(rf'^- \*\*{label}\*\*:[ \t]*(.+)$', segment, re.M)
+            if match and label not in sources and match.group(1).strip() not in ('-', ''):
+                sources[label] = match.group(1).strip()
+    return sources
+
+
+def parse_references(value: str) -> list:
+    """解析需求来源字段：Spec 3.1, PRD 2.1 -> [('Spec', '3.1'), ('PRD', '2.1')]"""
+    if value is None or value.strip() in ('无', '-', ''):
+        return []
+    refs = []
+    for item in re.split(r'[,，;；]', value):
+        match = REFERENCE_PATTERN.match(item.strip())
+        if match:
+            label = next(l for l in SOURCE_LABELS if l.lower() == match.group(1).lower())
+            refs.append((label, match.group(2).strip()))
+    return refs
+
+
+def resolve_reference(sections: dict, ref: str):
+    """章节引用 -> 章节键：先按编号，再按完整标题或去掉编号的标题"""
+    ref = ref.rstrip('.')
+    if ref in sections:
+        return ref
+    lowered = ref.lower()
+    for key, section in sections.items():
+        title = section['title']
+        match = NUMBER_PATTERN.match(title)
+        if lowered in (title.lower(), (match.group(2) if match else title).lower()):
+            return key
+    return None
+
+
+def build_index(graph: TaskGraph) -> dict:
+    """
+    构建追溯索引
+
+    Returns:
+        dict: {'documents': {标签: {'path', 'sections'}},
+               'tasks': {任务ID: ['Spec 3.1', ...]},
+               'dangling': {任务ID: [无法解析的引用]},
+               'missing': {标签: 路径}}（元信息声明但找不到的文档）
+    """
+    documents, missing = {}, {}
+    for label, value in source_documents(graph).items():
+        path = resolve_source(graph.path or Path.cwd() / 'TASKS.md', value)
+        if path is None:
+            missing[label] = value
+            continue
+        documents[label] = {'path': value,
+                            'sections': split_sections(path.read_text(encoding='utf-8'))}
+    tasks, dangling = {}, {}
+    for task in graph:
+        for label, ref in parse_references(task.get(REFERENCE_FIELD)):
+            key = resolve_reference(documents[label]['sections'], ref) if label in documents else None
+            if key is None:
+                dangling.setdefault(task.id, []).append(f"{label} {ref}")
+            else:
+                tasks.setdefault(task.id, []).append(f"{label} {key}")
+    return {'documents': documents, 'tasks': tasks, 'dangling': dangling, 'missing': missing}
+
+
+def load_baseline(file_path: Path):
+    try:
+        return json.loads(index_path(file_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(file_path: Path, index: dict):
+    """只保存章节哈希；任务引用每次从任务文档重新解析"""
+    from plan_lock import atomic_write
+    baseline = {'documents': {label: {'path': doc['path'],
+                                      'sections': {k: {'title': s['title'], 'hash': s['hash']}
+                                                   for k, s in doc['sections'].items()}}
+                              for label, doc in index['documents'].items()}}
+    atomic_write(index_path(file_path), json.dumps(baseline, ensure_ascii=False, indent=1))
+
+
+def diff_sections(baseline: dict, index: dict) -> dict:
+    """比较章节哈希，返回 {'changed': [...], 'removed': [...], 'added': [...]}，元素为 'Spec 3.1'"""
+    changed, removed, added = [], [], []
+    for label, doc in index['documents'].items():
+        old = baseline.get('documents', {}).get(label, {}).get('sections', {})
+        new = doc['sections']
+        changed += [f"{label} {k}" for k in new if k in old and old[k]['hash'] != new[k]['hash']]
+        removed += [f"{label} {k}" for k in old if k not in new]
+        added += [f"{label} {k}" for k in new if k not in old]
+    return {'changed': changed, 'removed': removed, 'added': added}
+
+
+def innermost(index: dict, sections: list) -> list:
+    """去掉因子章节变化而变化的祖先章节，只保留实际修改的位置"""
+    parents = set()
+    for ref in sections:
+        label, key = ref.split(' ', 1)
+        parent = index['documents'].get(label, {}).get('sections', {}).get(key, {}).get('parent')
+        if parent is not None:
+            parents.add(f"{label} {parent}")
+    return [ref for ref in sections if ref not in parents]
+
+
+def affected_tasks(graph: TaskGraph, index: dict, sections: list, baseline: dict = None) -> dict:
+    """引用了变化章节的任务及其传递的后续任务：{任务ID: 原因}，按文档顺序。
+    按标题引用、而标题本身被修改的章节在当前文档中无法解析，改用基线中的标题解析"""
+    sections = set(sections)
+    refs_by_task = {tid: list(refs) for tid, refs in index['tasks'].items()}
+    for tid, refs in index['dangling'].items():
+        for ref in refs:
+            label, text = ref.split(' ', 1)
+            old = (baseline or {}).get('documents', {}).get(label, {}).get('sections', {})
+            key = resolve_reference(old, text)
+            if key is not None:
+                refs_by_task.setdefault(tid, []).append(f"{label} {key}")
+    reasons, origins = {}, {}
+    for tid, refs in refs_by_task.items():
+        hit = [ref for ref in refs if ref in sections]
+        if hit:
+            origins[tid] = ', '.join(hit)
+            reasons[tid] = f"{origins[tid]} 已修改"
+    queue = list(reasons)
+    dependents = graph.dependents
+    for tid in queue:
+        for child in dependents.get(tid, ()):
+            if child not in reasons:
+                origins[child] = origins[tid]
+                reasons[child] = f"依赖 {tid}，源于 {origins[tid]} 的修改"
+                queue.append(child)
+    order = graph.index['order']
+    return dict(sorted(((t, r) for t, r in reasons.items() if t in order), key=lambda item: order[item[0]]))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python trace_index.py <任务文档路径> [--save] [--json]")
+        sys.exit(1)
+
+    file_path = Path(sys.argv[1])
+    if not file_path.exists():
+        print(f"✗ 文件不存在: {file_path}")
+        sys.exit(1)
+
+    graph = TaskGraph.load(file_path)
+    index = build_index(graph)
+    if not index['documents'] and not index['missing']:
+        print("✗ 任务文档元信息中没有 PRD / Spec 路径")
+        sys.exit(1)
+    if '--save' in sys.argv:
+        save_baseline(file_path, index)
+
+    referenced = {ref for refs in index['tasks'].values() for ref in refs}
+    if '--json' in sys.argv:
+        print(json.dumps(dict(index, unreferenced=[
+            f"{label} {k}" for label, doc in index['documents'].items() for k in doc['sections']
+            if f"{label} {k}" not in referenced]), ensure_ascii=False, indent=2))
+        return
+
+    for label, value in index['missing'].items():
+        print(f"⚠️ 找不到 {label} 文档: {value}")
+    for label, doc in index['documents'].items():
+        print(f"{label}（{doc['path']}）: {len(doc['sections'])} 个章节")
+        by_section = {}
+        for tid, refs in index['tasks'].items():
+            for ref in refs:
+                by_section.setdefault(ref, []).append(tid)
+        for key, section in doc['sections'].items():
+            tids = by_section.get(f"{label} {key}", [])
+            indent = '  ' * (section['level'] - 1)
+            print(f"  {indent}{section['title']}  [{section['hash']}]"
+                  + (f" ← {', '.join(tids)}" if tids else ''))
+    untraced = [task.id for task in graph if task.id not in index['tasks']]
+    print()
+    print(f"有需求来源的任务: {len(index['tasks'])}/{len(graph)}")
+    if untraced:
+        print(f"未标注需求来源: {', '.join(untraced[:20])}{' ...' if len(untraced) > 20 else ''}")
+    for tid, refs in index['dangling'].items():
+        print(f"⚠️ {tid} 引用了不存在的章节: {', '.join(refs)}")
+    if '--save' in sys.argv:
+        print(f"✓ 已保存章节哈希基线: {index_path(file_path).name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+文件变更监听模块 - 供 checkpoint.py --watch 使用
+
+Linux 下使用 inotify（通过 ctypes 调用，无第三方依赖），
+其他平台或 inotify 不可用（如监听数超限）时退回到轮询。
+
+监听对象为 (路径, 是否递归) 列表：
+- 目录 + 递归：监听整个子树（跳过 node_modules 等目录）
+- 文件：只监听该文件
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+from check_runner import IGNORED_DIRS
+
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_DEBOUNCE = 0.3
+
+# inotify 常量（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """轮询监听：基于 os.scandir 的 (mtime, size) 快照比较"""
+
+    def __init__(self, roots: list, interval: float = DEFAULT_INTERVAL):
+        self.roots = [(Path(p), recursive) for p, recursive in roots]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan_dir(self, path: str, recursive: bool, snapshot: dict):
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and entry.name not in IGNORED_DIRS:
+                            self._scan_dir(entry.path, True, snapshot)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for root, recursive in self.roots:
+            if root.is_dir():
+                self._scan_dir(str(root), recursive, snapshot)
+            else:
+                try:
+                    st = root.stat()
+                    snapshot[str(root)] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
+        return snapshot
+
+    def read(self, timeout: float = None) -> set:
+        """等待至多 timeout 秒，返回变更的路径集合（None 表示一直等待）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {p for p in current.keys() | self.snapshot.keys()
+                       if current.get(p) != self.snapshot.get(p)}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """inotify 监听（仅 Linux）"""
+
+    def __init__(self, roots: list):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), '无法初始化 inotify')
+        self.watches = {}        # wd -> 目录路径
+        self.file_filters = {}   # wd -> 只关心的文件名集合（监听单个文件时）
+        self.recursive = set()   # 递归监听的 wd
+        self.whole_dirs = set()  # 整体监听（不过滤文件名）的 wd
+        try:
+            for path, recursive in roots:
+                path = Path(path)
+                if path.is_dir():
+                    self._watch_tree(str(path), recursive)
+                else:
+                    wd = self._watch(str(path.parent))
+                    if wd not in self.whole_dirs:
+                        self.file_filters.setdefault(wd, set()).add(path.name)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch 失败: {path} ({os.strerror(err)})")
+        self.watches[wd] = path
+        return wd
+
+    def _watch_tree(self, root: str, recursive: bool):
+        wd = self._watch(root)
+        # 同一目录既被整体监听又被单文件监听时，以整体监听为准
+        self.file_filters.pop(wd, None)
+        self.whole_dirs.add(wd)
+        if not recursive:
+            return
+        self.recursive.add(wd)
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            for d in dirnames:
+                sub = self._watch(os.path.join(dirpath, d))
+                self.recursive.add(sub)
+                self.whole_dirs.add(sub)
+
+    def read(self, timeout: float = None) -> set:
+        """等待至多 timeout 秒，返回变更的路径集合（None 表示一直等待）"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+                self._handle_event(wd, mask, name, changed)
+        return changed
+
+    def _handle_event(self, wd: int, mask: int, name: str, changed: set):
+        if mask & IN_Q_OVERFLOW:
+            # 事件队列溢出：报告所有监听目录，由调用方全量复查
+            changed.update(self.watches.values())
+            return
+        if mask & IN_IGNORED:
+            self.watches.pop(wd, None)
+            self.recursive.discard(wd)
+            self.whole_dirs.discard(wd)
+            return
+        directory = self.watches.get(wd)
+        if directory is None:
+            return
+        if wd in self.file_filters and name not in self.file_filters[wd]:
+            return
+        if name in IGNORED_DIRS:
+            return
+        path = os.path.join(directory, name) if name else directory
+        changed.add(path)
+        # 新建的子目录需要补充监听
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.recursive:
+            try:
+                self._watch_tree(path, True)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(roots: list, interval: float = DEFAULT_INTERVAL, polling: bool = False):
+    """创建监听器：优先 inotify，不可用时退回轮询"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            if getattr(e, 'errno', None) == errno.ENOSPC:
+                print("⚠️ inotify 监听数已达上限，改用轮询", file=sys.stderr)
+    return PollingWatcher(roots, interval)
+
+
+def wait_for_changes(watcher, debounce: float = DEFAULT_DEBOUNCE, timeout: float = None) -> set:
+    """
+    等待一批变更：收到第一个变更后继续收集，直到安静 debounce 秒
+
+    Returns:
+        set: 变更路径；timeout 内无变更时返回空集合
+    """
+    changed = watcher.read(timeout)
+    if not changed:
+        return changed
+    while True:
+        more = watcher.read(debounce)
+        if not more:
+            return changed
+        changed |= more